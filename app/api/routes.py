@@ -19,6 +19,8 @@ from app.services.recon_proc_visualization_service import ReconProcVisualization
 from app.models.point_cloud import PointCloud
 from app.models.threed_model import ThreeDModel
 from app.api.task_manager import TaskManager
+from app.reconstruction.stage_store import StageStore
+from app.services.thread_budget import ThreadBudget
 
 api_bp = Blueprint('api', __name__)
 
@@ -53,12 +55,29 @@ def process_in_background(task_id: str, visual_data_id: str):
         TaskManager.update_task_status(task_id, 'PROCESSING')
 
         # Your existing processing logic here
-        result = preprocess_service.process_ply(visual_data_id)
+        with ThreadBudget.allocate(task_id, 'preprocess'):
+            result = preprocess_service.process_ply(visual_data_id)
 
         TaskManager.update_task_status(task_id, 'SUCCESS', result=result)
     except Exception as e:
         TaskManager.update_task_status(task_id, 'ERROR', error=str(e))
 
+def reconstruct_in_background(app, task_id: str, point_cloud_id: str, model_id: str, options: Dict[str, Any]):
+    """Run the full reconstruction that replaces the fast preview model saved under model_id."""
+    with app.app_context():
+        try:
+            TaskManager.update_task_status(task_id, 'PROCESSING', result={'model_id': model_id})
+            with ThreadBudget.allocate(task_id, 'reconstruct'):
+                model_id = reconstruction_service.start_reconstruction(point_cloud_id, model_id=model_id, **options)
+            TaskManager.update_task_status(task_id, 'SUCCESS', result={'model_id': model_id})
+        except Exception as e:
+            app.logger.error(f"Background reconstruction error: {str(e)}", exc_info=True)
+            TaskManager.update_task_status(task_id, 'ERROR', result={'model_id': model_id}, error=str(e))
+            try:
+                reconstruction_service.mark_fast_preview_failed(model_id, str(e))
+            except Exception as mark_error:
+                app.logger.error(f"Could not mark preview model {model_id} as failed: {str(mark_error)}")
+
 ##################################################
 # Upload visual data API
 ##################################################
@@ -168,6 +187,7 @@ def process_visual_data(visual_data_id):
 
 
 @api_bp.route('/api/preprocess/status/<task_id>', methods=['GET'])
+@api_bp.route('/api/reconstruct/status/<task_id>', methods=['GET'])
 def get_task_status(task_id):
     """
     Get the status of a processing task
@@ -187,6 +207,9 @@ def get_task_status(task_id):
         response['result'] = task['result']
     elif task['status'] == 'ERROR':
         response['error'] = task['error']
+    # Background reconstructions report their model while it is still the fast preview
+    if task['result'] and task['status'] != 'SUCCESS':
+        response['result'] = task['result']
 
     return jsonify(response)
 
@@ -251,6 +274,7 @@ def get_point_cloud(point_cloud_id: str):
             'name': pc.name,
             'num_points': len(pc.points),
             'has_colors': pc.colors is not None,
+            'has_normals': pc.normals is not None,
             'timestamp': pc.timestamp.isoformat()
         }), 200
     else:
@@ -265,6 +289,7 @@ def list_point_clouds():
         'name': pc['name'],
         'num_points': len(pc['points']),
         'has_colors': 'colors' in pc,
+        'has_normals': 'normals' in pc,
         'timestamp': pc['timestamp'].isoformat()
     } for pc in point_clouds]), 200
 
@@ -311,6 +336,54 @@ def download_point_cloud(point_cloud_id):
 ########################################################################
 
 
+class InvalidOptionError(ValueError):
+    """A request option whose value cannot be parsed."""
+
+def parse_flag(value):
+    """Parse a boolean option given as a JSON boolean or as 1/0, true/false or yes/no."""
+    flag = str(value).lower()
+    if flag not in ('1', 'true', 'yes', '0', 'false', 'no'):
+        raise ValueError(f"not a boolean: {value}")
+    return flag in ('1', 'true', 'yes')
+
+# Reconstruction options accepted in the query string or JSON body, with their parsers
+RECONSTRUCTION_OPTIONS = {
+    'resume': parse_flag,
+    'force': parse_flag,
+    'fast_preview': parse_flag,
+    'engine': str,
+    'candidates': str,
+    'candidate_points': int,
+    'point_budget': int,
+    'tile_size': float,
+    'tile_workers': int,
+    'target_faces': int,
+    'max_error': float,
+    'preview_faces': int,
+    'texture_resolution': int,
+}
+
+def get_reconstruction_options(names=None):
+    """
+    Read the reconstruction options given in the request; absent options keep the service defaults.
+
+    Args:
+        names (iterable, optional): Options to read, all of RECONSTRUCTION_OPTIONS by default.
+
+    Raises:
+        InvalidOptionError: If an option's value cannot be parsed.
+    """
+    body = request.get_json(silent=True) or {}
+    options = {}
+    for name in names or RECONSTRUCTION_OPTIONS:
+        value = request.args.get(name, body.get(name))
+        if value is not None:
+            try:
+                options[name] = RECONSTRUCTION_OPTIONS[name](value)
+            except (TypeError, ValueError):
+                raise InvalidOptionError(f"Invalid value for option '{name}': {value}")
+    return options
+
 @api_bp.route('/api/reconstruct/<point_cloud_id>', methods=['POST'])
 def reconstruct(point_cloud_id):
     """
@@ -319,17 +392,61 @@ def reconstruct(point_cloud_id):
     Args:
         point_cloud_id (str): Point Cloud ID
 
+    Query/JSON options:
+        resume (bool): Resume from the checkpoints of a previous attempt.
+        force (bool): Run the pipeline even if a cached result of the same request exists.
+        fast_preview (bool): Save a coarse vertex-colored preview model and return it at once
+                             with status 202; the full reconstruction runs in the background
+                             and replaces it. Poll /api/reconstruct/status/<task_id>.
+        engine (str): Surface reconstruction engine, or 'auto' to pick one by shape.
+        candidates (str): Comma separated engines or 'delaunay:<alpha scale>' candidates; the one
+                          meshing a downsampled proxy best is used instead of engine.
+        candidate_points (int): Points kept for the candidates' proxy.
+        point_budget (int): Number of points kept for meshing, 0 for all.
+        tile_size (float): Mesh overlapping tiles of this size in parallel, 0 to mesh the cloud whole.
+        tile_workers (int): Worker processes for tiled meshing, 0 for the job's cores.
+        target_faces (int): Decimate the refined mesh to this many faces, 0 for all.
+        max_error (float): Quadric error bound of the decimation.
+        preview_faces (int): Also export a lightweight preview model with this many faces.
+        texture_resolution (int): Texture image size in texels.
+
     Returns:
-        JSON response with reconstruction status and model ID.
+        JSON response with reconstruction status and model ID, and the skipped
+        stages when resuming; with fast_preview, the preview model ID and the
+        background task ID.
     """
     try:
-        model_id = reconstruction_service.start_reconstruction(point_cloud_id)
-
-        return jsonify({
+        options = get_reconstruction_options()
+
+        if options.pop('fast_preview', False):
+            model_id = reconstruction_service.start_fast_preview(point_cloud_id)
+            task_id = TaskManager.create_task(point_cloud_id)
+            thread = Thread(target=reconstruct_in_background,
+                            args=(current_app._get_current_object(), task_id, point_cloud_id, model_id, options))
+            thread.daemon = True
+            thread.start()
+            return jsonify({
+                "message": "Preview ready, reconstruction started",
+                "model_id": model_id,
+                "task_id": task_id,
+                "status": 'PENDING'
+            }), 202
+
+        with ThreadBudget.allocate(f"reconstruct-{uuid.uuid4()}", 'reconstruct'):
+            model_id = reconstruction_service.start_reconstruction(point_cloud_id, **options)
+
+        response = {
             "message": "Reconstruction completed successfully",
             "model_id": model_id
-        }), 200
+        }
+        if options.get('resume'):
+            model = ThreeDModel.get_by_id(model_id)
+            response["skipped_stages"] = model.report.get('skipped_stages', []) if model else []
+        return jsonify(response), 200
 
+    except InvalidOptionError as e:
+        current_app.logger.error(f"Reconstruction error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
     except ValueError as e:
         current_app.logger.error(f"Reconstruction error: {str(e)}")
         return jsonify({"error": str(e)}), 404
@@ -345,14 +462,22 @@ def get_reconstruction_stages(point_cloud_id):
     Args:
         point_cloud_id: Point Cloud ID
 
+    Query options:
+        target_faces (int): Decimation budget of a recomputed stage 2, defaults to the stored model's.
+        max_error (float): Quadric error bound of that decimation, defaults to the stored model's.
+
     Returns:
         JSON response with reconstruction stages data.
     """
     current_app.logger.info(f"Received request for reconstruction stages of point cloud: {point_cloud_id}")
     try:
-        stages = ReconstructionService.get_reconstruction_stages(point_cloud_id)
+        options = get_reconstruction_options(('target_faces', 'max_error'))
+        stages = ReconstructionService.get_reconstruction_stages(point_cloud_id, **options)
         current_app.logger.info(f"Successfully retrieved reconstruction stages for point cloud: {point_cloud_id}")
         return jsonify(stages), 200
+    except InvalidOptionError as e:
+        current_app.logger.error(f"Value error in reconstruction stages: {str(e)}")
+        return jsonify({"error": str(e), "point_cloud_id": point_cloud_id}), 400
     except ValueError as e:
         current_app.logger.error(f"Value error in reconstruction stages: {str(e)}")
         return jsonify({"error": str(e), "point_cloud_id": point_cloud_id}), 404
@@ -378,6 +503,8 @@ def list_models():
         'obj_file': model.obj_file,
         'mtl_file': model.mtl_file,
         'texture_file': model.texture_file,
+        'glb_file': model.glb_file,
+        'status': model.report.get('status', 'complete'),
         'created_at': model.created_at.isoformat()
     } for model in models]), 200
 
@@ -395,6 +522,8 @@ def get_model(model_id):
             'obj_file': model.obj_file,
             'mtl_file': model.mtl_file,
             'texture_file': model.texture_file,
+            'glb_file': model.glb_file,
+            'status': model.report.get('status', 'complete'),
             'created_at': model.created_at.isoformat()
         }), 200
     else:
@@ -407,7 +536,9 @@ def delete_model(model_id):
     if model:
         # Delete associated files
         current_app.logger.info(f"DELETE -> Model found: {model.name}")
-        for file_path in [model.obj_file, model.mtl_file, model.texture_file]:
+        stage_files = StageStore(model.folder_path, model.name).paths()
+        preview_files = list(model.get_files('preview')) if model.report.get('preview') else []
+        for file_path in [model.obj_file, model.mtl_file, model.texture_file, model.glb_file] + preview_files + stage_files:
             if file_path and os.path.exists(file_path):
                 os.remove(file_path)
 
@@ -462,11 +593,12 @@ def download_material(model_id):
 
 @api_bp.route('/api/models/<model_id>/obj', methods=['GET'])
 def get_model_obj(model_id):
-    """Serve the OBJ file for a specific 3D model."""
+    """Serve the OBJ file for a specific 3D model; ?detail=preview serves the preview mesh if one was exported."""
     try:
         model = ThreeDModel.get_by_id(model_id)
-        if model and model.obj_file:
-            file_path = os.path.join(model.folder_path, model.obj_file)
+        obj_file = model.get_files(request.args.get('detail', 'full'))[0] if model else None
+        if obj_file:
+            file_path = os.path.join(model.folder_path, obj_file)
             if os.path.exists(file_path):
                 return send_file(file_path)
         return jsonify({"error": "3D model or OBJ file not found"}), 404
@@ -474,6 +606,20 @@ def get_model_obj(model_id):
         current_app.logger.error(f"An error occurred while serving OBJ file: {str(e)}")
         return jsonify({"error": "An internal error occurred"}), 500
 
+@api_bp.route('/api/models/<model_id>/glb', methods=['GET'])
+def get_model_glb(model_id):
+    """Serve the binary glTF file for a specific 3D model: mesh, UVs and texture in one response."""
+    try:
+        model = ThreeDModel.get_by_id(model_id)
+        if model and model.glb_file:
+            file_path = os.path.join(model.folder_path, model.glb_file)
+            if os.path.exists(file_path):
+                return send_file(file_path, mimetype='model/gltf-binary')
+        return jsonify({"error": "3D model or GLB file not found"}), 404
+    except Exception as e:
+        current_app.logger.error(f"An error occurred while serving GLB file: {str(e)}")
+        return jsonify({"error": "An internal error occurred"}), 500
+
 ########################################################################
 # 3D Model with plotly API
 ########################################################################
@@ -481,7 +627,8 @@ def get_model_obj(model_id):
 @api_bp.route('/api/reconstruction/point_cloud/<model_id>')
 def get_point_cloud_data(model_id):
     current_app.logger.info(f"Getting point cloud data for model: {model_id}")
-    data = visualization_service.get_point_cloud_data(model_id)
+    max_points = request.args.get('max_points', type=int)
+    data = visualization_service.get_point_cloud_data(model_id, max_points=max_points)
     if data is None:
         return jsonify({"error": "Model or point cloud not found"}), 404
     return jsonify([data])
@@ -490,9 +637,10 @@ def get_point_cloud_data(model_id):
 def get_initial_mesh_data(model_id):
     try:
         current_app.logger.info(f"Getting initial mesh data for model: {model_id}")
-        data = visualization_service.get_mesh_data(model_id, mesh_type='initial')
+        data = visualization_service.get_mesh_data(model_id, mesh_type='initial',
+                                                   detail=request.args.get('detail', 'full'))
         if data is None:
-            return jsonify({"error": "Model not found"}), 404
+            return jsonify({"error": "Model or mesh not found"}), 404
         return jsonify(data)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
@@ -500,17 +648,17 @@ def get_initial_mesh_data(model_id):
 @api_bp.route('/api/reconstruction/refined_mesh/<model_id>')
 def get_refined_mesh_data(model_id):
     current_app.logger.info(f"Getting refined mesh data for model: {model_id}")
-    data = visualization_service.get_mesh_data(model_id, mesh_type='refined')
+    data = visualization_service.get_mesh_data(model_id, mesh_type='refined', detail=request.args.get('detail', 'full'))
     if data is None:
-        return jsonify({"error": "Model not found"}), 404
+        return jsonify({"error": "Model or mesh not found"}), 404
     return jsonify(data)
 
 @api_bp.route('/api/reconstruction/textured_mesh/<model_id>')
 def get_textured_mesh_data(model_id):
     current_app.logger.info(f"Getting textured mesh data for model: {model_id}")
-    data = visualization_service.get_textured_mesh_data(model_id)
+    data = visualization_service.get_textured_mesh_data(model_id, detail=request.args.get('detail', 'full'))
     if data is None:
-        return jsonify({"error": "Model not found"}), 404
+        return jsonify({"error": "Model or mesh not found"}), 404
     return jsonify(data)
 
 ########################################################################
@@ -519,8 +667,18 @@ def get_textured_mesh_data(model_id):
 @api_bp.route('/api/preprocess/<param>/<ply_id>')
 def get_preprocess_process_ply(param, ply_id):
     current_app.logger.info(f"Getting {param} ply data for preprocess visuals: {ply_id}")
-    data = preprocess_service.get_ply(ply_id, param)
+    max_points = request.args.get('max_points', type=int)
+    data = preprocess_service.get_ply(ply_id, param, max_points=max_points)
     if data is None:
         return jsonify({"error": f"{param} ply not found"}), 404
     return jsonify([data])
 
+
+
+########################################################################
+# Metrics
+########################################################################
+@api_bp.route('/api/metrics/thread_budget', methods=['GET'])
+def get_thread_budget_metrics():
+    """Core allotments of the running preprocess/reconstruct jobs."""
+    return jsonify(ThreadBudget.snapshot()), 200
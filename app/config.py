@@ -14,6 +14,42 @@ class Config:
     MAX_CONTENT_LENGTH = 64 * 1024 * 1024  # 64 MB max upload size
     MODELS_FOLDER = '/app/outputs'
 
+    # Out-of-core preprocessing: PLY files above the threshold are streamed in tiles
+    PREPROCESS_STREAMING_THRESHOLD_MB = float(os.environ.get('PREPROCESS_STREAMING_THRESHOLD_MB', 1024))
+    PREPROCESS_MEMORY_BUDGET_MB = float(os.environ.get('PREPROCESS_MEMORY_BUDGET_MB', 512))
+    # Bottom completion: 'hull' (convex hull sampling) or 'raster' (footprint grid fill)
+    BOTTOM_COMPLETION_METHOD = os.environ.get('BOTTOM_COMPLETION_METHOD', 'hull')
+
+    # Upper bound on the cores a single preprocess/reconstruct job receives (0 = even share only)
+    THREAD_BUDGET_MAX_CORES_PER_JOB = int(os.environ.get('THREAD_BUDGET_MAX_CORES_PER_JOB', 0))
+
+    # Surface reconstruction engine: 'delaunay', 'poisson', 'ball_pivoting', 'tsdf' or 'auto' (picked by shape class)
+    RECONSTRUCTION_ENGINE = os.environ.get('RECONSTRUCTION_ENGINE', 'auto')
+    RECONSTRUCTION_SHAPE_ENGINES = {
+        'cube_like': os.environ.get('RECONSTRUCTION_ENGINE_CUBE_LIKE', 'delaunay'),
+        'flat': os.environ.get('RECONSTRUCTION_ENGINE_FLAT', 'delaunay'),
+        'elongated': os.environ.get('RECONSTRUCTION_ENGINE_ELONGATED', 'delaunay'),
+    }
+    # Meshing candidates scored on a downsampled proxy before the full-resolution run, e.g.
+    # 'delaunay:2.2,delaunay:25.2,tsdf' (empty = mesh with RECONSTRUCTION_ENGINE), and the proxy's points
+    RECONSTRUCTION_CANDIDATES = os.environ.get('RECONSTRUCTION_CANDIDATES', '')
+    RECONSTRUCTION_CANDIDATE_POINTS = int(os.environ.get('RECONSTRUCTION_CANDIDATE_POINTS', 20000))
+    # Points kept for meshing (0 = all); texture colors always come from the full cloud
+    RECONSTRUCTION_POINT_BUDGET = int(os.environ.get('RECONSTRUCTION_POINT_BUDGET', 0))
+    # Tiled parallel meshing: tile edge length in cloud units (0 = mesh the cloud whole)
+    # and worker processes (0 = the cores allotted to the job)
+    RECONSTRUCTION_TILE_SIZE = float(os.environ.get('RECONSTRUCTION_TILE_SIZE', 0))
+    RECONSTRUCTION_TILE_WORKERS = int(os.environ.get('RECONSTRUCTION_TILE_WORKERS', 0))
+    # Quadric decimation of the refined mesh (0 = keep every face) and of the preview mesh (0 = no preview)
+    RECONSTRUCTION_TARGET_FACES = int(os.environ.get('RECONSTRUCTION_TARGET_FACES', 0))
+    RECONSTRUCTION_PREVIEW_FACES = int(os.environ.get('RECONSTRUCTION_PREVIEW_FACES', 0))
+    # Points kept for the vertex-colored fast preview shown while the full reconstruction runs
+    RECONSTRUCTION_FAST_PREVIEW_POINTS = int(os.environ.get('RECONSTRUCTION_FAST_PREVIEW_POINTS', 5000))
+    # 'production' skips computations done only for logs (e.g. mesh cell quality), 'debug' keeps them
+    DIAGNOSTICS_LEVEL = os.environ.get('DIAGNOSTICS_LEVEL', 'production')
+    # Width and height of the baked texture image in texels
+    TEXTURE_RESOLUTION = int(os.environ.get('TEXTURE_RESOLUTION', 1024))
+
     # YOLO specific configurations
     YOLO_WEIGHTS = os.getenv('YOLO_WEIGHTS', '/app/yolov3/yolov3.weights')
     YOLO_CONFIG = os.getenv('YOLO_CONFIG', '/app/yolov3/yolov3.cfg')
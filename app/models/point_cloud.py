@@ -6,7 +6,10 @@ import numpy as np
 class PointCloud:
     """Represents a point cloud in the system."""
 
-    def __init__(self, name, points, colors=None):
+    # Stored normals are unit vectors quantized to one signed byte per component
+    NORMAL_SCALE = 127
+
+    def __init__(self, name, points, colors=None, lod_offsets=None, normals=None):
         """
         Initialize a new PointCloud instance.
 
@@ -14,10 +17,15 @@ class PointCloud:
             name (str): The name of the point cloud.
             points (np.ndarray): Array of shape (N, 3) containing the x, y, z coordinates.
             colors (np.ndarray, optional): Array of shape (N, 3) containing the r, g, b values.
+            lod_offsets (list, optional): Cumulative point count per level when the points are
+                stored in level-of-detail order, so any prefix is a uniform subsample.
+            normals (np.ndarray, optional): Array of shape (N, 3) containing the point normals.
         """
         self.name = name
         self.points = np.array(points)
         self.colors = np.array(colors) if colors is not None else None
+        self.lod_offsets = lod_offsets
+        self.normals = np.asarray(normals, dtype=np.float32) if normals is not None else None
         self.timestamp = datetime.utcnow()
 
     @classmethod
@@ -57,34 +65,92 @@ class PointCloud:
         }
         if self.colors is not None:
             data['colors'] = self.colors.tolist()  # Convert numpy array to list
+        if self.lod_offsets is not None:
+            data['lod_offsets'] = [int(offset) for offset in self.lod_offsets]
+        if self.normals is not None:
+            data['normals'] = PointCloud.pack_normals(self.normals)
 
         result = db.point_clouds.insert_one(data)
         return str(result.inserted_id)
 
     @staticmethod
-    def get_by_id(point_cloud_id):
+    def get_by_id(point_cloud_id, max_points=None):
         """
         Retrieve a point cloud by its ID.
 
         Args:
             point_cloud_id (str): The ID of the point cloud to retrieve.
+            max_points (int, optional): Point budget. Clouds stored in level-of-detail
+                order are truncated in the query itself; older clouds are strided.
 
         Returns:
             PointCloud: The PointCloud instance if found, None otherwise.
         """
         db = get_db()
         try:
-            data = db.point_clouds.find_one({'_id': ObjectId(point_cloud_id)})
+            query = {'_id': ObjectId(point_cloud_id)}
+            step = 1
+            if max_points is None:
+                data = db.point_clouds.find_one(query)
+            else:
+                max_points = max(int(max_points), 1)
+                data = db.point_clouds.find_one(
+                    query, {'points': {'$slice': max_points}, 'colors': {'$slice': max_points}})
+                if data and 'lod_offsets' not in data:
+                    # Not in LOD order, a prefix would be spatially biased
+                    data = db.point_clouds.find_one(query)
+                    step = -(-len(data['points']) // max_points)
+                    data['points'] = data['points'][::step]
+                    if 'colors' in data:
+                        data['colors'] = data['colors'][::step]
             if data:
                 points = np.array(data['points'])
                 colors = np.array(data['colors']) if 'colors' in data else None
-                pc = PointCloud(data['name'], points, colors)
+                normals = None
+                if 'normals' in data:
+                    # Packed normals cannot be sliced in the query, so they are cut like the points here
+                    normals = PointCloud.unpack_normals(data['normals'])[::step][:len(points)]
+                pc = PointCloud(data['name'], points, colors, data.get('lod_offsets'), normals)
                 pc.timestamp = data['timestamp']
                 return pc
         except:
             return None
         return None
 
+    @staticmethod
+    def pack_normals(normals):
+        """
+        Pack normals into the compact form stored in the database.
+
+        Each normal is scaled to unit length and quantized to three signed bytes,
+        3 bytes per normal instead of 24 for float64 components.
+
+        Args:
+            normals (np.ndarray): Array of shape (N, 3) containing the normals.
+
+        Returns:
+            bytes: 3 * N bytes.
+        """
+        normals = np.asarray(normals, dtype=np.float32).reshape(-1, 3)
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+        return np.rint(normals * PointCloud.NORMAL_SCALE).astype(np.int8).tobytes()
+
+    @staticmethod
+    def unpack_normals(data):
+        """
+        Unpack normals stored by pack_normals.
+
+        Args:
+            data (bytes): Packed normals.
+
+        Returns:
+            np.ndarray: Array of shape (N, 3) containing float32 unit normals.
+        """
+        normals = np.frombuffer(bytes(data), dtype=np.int8).reshape(-1, 3).astype(np.float32)
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
     def to_string(self):
         """
         Convert the point cloud to a string representation.
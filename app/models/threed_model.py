@@ -3,7 +3,7 @@ from bson import ObjectId
 from datetime import datetime
 
 class ThreeDModel:
-    def __init__(self, name, folder_path, point_cloud_id, obj_file, mtl_file, texture_file, id=None):
+    def __init__(self, name, folder_path, point_cloud_id, obj_file, mtl_file, texture_file, id=None, report=None, glb_file=None):
         self.id = id
         self.name = name
         self.folder_path = folder_path
@@ -11,8 +11,17 @@ class ThreeDModel:
         self.obj_file = obj_file
         self.mtl_file = mtl_file
         self.texture_file = texture_file
+        self.report = report or {}
+        self.glb_file = glb_file
         self.created_at = datetime.utcnow()
 
+    def get_files(self, detail='full'):
+        """Return (obj_file, mtl_file, texture_file) of the full-detail model, or of its preview if one was exported."""
+        preview = self.report.get('preview')
+        if detail == 'preview' and preview:
+            return preview['obj_file'], preview['mtl_file'], preview['texture_file']
+        return self.obj_file, self.mtl_file, self.texture_file
+
     def save(self):
         db = get_db()
         model_data = {
@@ -22,6 +31,8 @@ class ThreeDModel:
             "obj_file": self.obj_file,
             "mtl_file": self.mtl_file,
             "texture_file": self.texture_file,
+            "glb_file": self.glb_file,
+            "report": self.report,
             "created_at": self.created_at
         }
         if self.id:
@@ -43,7 +54,47 @@ class ThreeDModel:
                 point_cloud_id=model_data["point_cloud_id"],
                 obj_file=model_data["obj_file"],
                 mtl_file=model_data["mtl_file"],
-                texture_file=model_data["texture_file"]
+                texture_file=model_data["texture_file"],
+                report=model_data.get("report"),
+                glb_file=model_data.get("glb_file")
+            )
+        return None
+
+    @staticmethod
+    def get_by_name(name):
+        db = get_db()
+        model_data = db.threed_models.find_one({"name": name})
+        if model_data:
+            return ThreeDModel(
+                id=str(model_data["_id"]),
+                name=model_data["name"],
+                folder_path=model_data["folder_path"],
+                point_cloud_id=model_data["point_cloud_id"],
+                obj_file=model_data["obj_file"],
+                mtl_file=model_data["mtl_file"],
+                texture_file=model_data["texture_file"],
+                report=model_data.get("report"),
+                glb_file=model_data.get("glb_file")
+            )
+        return None
+
+    @staticmethod
+    def get_by_cache_key(cache_key, point_cloud_id):
+        """Get the most recent model of a point cloud whose report records the given reconstruction cache key."""
+        db = get_db()
+        model_data = db.threed_models.find_one({"report.cache_key": cache_key, "point_cloud_id": point_cloud_id},
+                                               sort=[("created_at", -1)])
+        if model_data:
+            return ThreeDModel(
+                id=str(model_data["_id"]),
+                name=model_data["name"],
+                folder_path=model_data["folder_path"],
+                point_cloud_id=model_data["point_cloud_id"],
+                obj_file=model_data["obj_file"],
+                mtl_file=model_data["mtl_file"],
+                texture_file=model_data["texture_file"],
+                report=model_data.get("report"),
+                glb_file=model_data.get("glb_file")
             )
         return None
 
@@ -59,7 +110,9 @@ class ThreeDModel:
                 point_cloud_id=model_data["point_cloud_id"],
                 obj_file=model_data["obj_file"],
                 mtl_file=model_data["mtl_file"],
-                texture_file=model_data["texture_file"]
+                texture_file=model_data["texture_file"],
+                report=model_data.get("report"),
+                glb_file=model_data.get("glb_file")
             ))
         return models
 
@@ -0,0 +1,128 @@
+import json
+import os
+
+import numpy as np
+
+
+# On-disk record of a level-of-detail point cloud
+LOD_RECORD_DTYPE = np.dtype([('xyz', '<f4', 3), ('rgb', 'u1', 3)])
+# Octree depth of the finest explicit level; remaining points form the last level
+LOD_MAX_LEVELS = 10
+
+
+def build_lod_order(points, max_levels=LOD_MAX_LEVELS):
+    """
+    Order points coarse-to-fine as an octree level-of-detail pyramid.
+
+    Level ``l`` adds one point (the one closest to the cell center) for every
+    octree cell at depth ``l`` that no coarser level already covers. Points that
+    are not selected by any level are appended as the final, full-resolution
+    level. Any prefix of the resulting order is therefore a spatially uniform
+    subsample, so a point budget is served by slicing instead of resampling.
+
+    Args:
+        points (np.ndarray): Array of shape (N, 3).
+        max_levels (int): Number of octree levels before the full-resolution level.
+
+    Returns:
+        tuple: (order, level_offsets) where order is a permutation of range(N) and
+               level_offsets[i] is the number of points in levels 0..i.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n_points = len(points)
+    if n_points == 0:
+        return np.arange(0), [0]
+
+    min_bound = points.min(axis=0)
+    extent = (points.max(axis=0) - min_bound).max()
+    normalized = (points - min_bound) / (extent if extent > 0 else 1.0)
+
+    selected = np.zeros(n_points, dtype=bool)
+    order_parts = []
+    level_offsets = []
+    total = 0
+    for level in range(max_levels):
+        cells = 2 ** level
+        scaled = normalized * cells
+        coords = np.minimum(scaled.astype(np.int64), cells - 1)
+        keys = (coords[:, 0] * cells + coords[:, 1]) * cells + coords[:, 2]
+        _, cell = np.unique(keys, return_inverse=True)
+        covered = np.zeros(cell.max() + 1, dtype=bool)
+        covered[cell[selected]] = True
+
+        candidates = np.where(~covered[cell])[0]
+        if len(candidates):
+            # Closest point to the center of each uncovered cell
+            center_distance = ((scaled[candidates] - coords[candidates] - 0.5) ** 2).sum(axis=1)
+            by_cell = candidates[np.lexsort((center_distance, cell[candidates]))]
+            first = np.r_[True, cell[by_cell][1:] != cell[by_cell][:-1]]
+            level_points = by_cell[first]
+            selected[level_points] = True
+            order_parts.append(level_points)
+            total += len(level_points)
+        level_offsets.append(total)
+        if total == n_points:
+            break
+
+    if total < n_points:
+        order_parts.append(np.where(~selected)[0])
+        level_offsets.append(n_points)
+    return np.concatenate(order_parts), level_offsets
+
+
+def lod_paths(ply_path):
+    """Paths of the LOD records and metadata files stored next to a PLY file."""
+    base = os.path.splitext(ply_path)[0]
+    return base + '.lod.npy', base + '.lod.json'
+
+
+def save_lod(ply_path, points, colors):
+    """
+    Save a point cloud as an LOD pyramid next to its PLY file.
+
+    Args:
+        ply_path (str): Path of the PLY file the pyramid belongs to.
+        points (np.ndarray): Array of shape (N, 3).
+        colors (np.ndarray): Array of shape (N, 3) with values in [0, 1].
+
+    Returns:
+        list: Cumulative point count per level.
+    """
+    order, level_offsets = build_lod_order(points)
+    records = np.empty(len(order), dtype=LOD_RECORD_DTYPE)
+    records['xyz'] = np.asarray(points)[order]
+    records['rgb'] = np.clip(np.asarray(colors)[order] * 255, 0, 255).astype(np.uint8)
+
+    records_path, meta_path = lod_paths(ply_path)
+    np.save(records_path, records)
+    with open(meta_path, 'w') as f:
+        json.dump({'num_points': len(records), 'level_offsets': level_offsets}, f)
+    return level_offsets
+
+
+def load_lod(ply_path, max_points=None):
+    """
+    Load up to ``max_points`` points of a saved LOD pyramid.
+
+    The records are memory mapped, so only the requested prefix is read.
+
+    Returns:
+        tuple: (points, colors) with colors in [0, 255], or None if no pyramid exists.
+    """
+    records_path, _ = lod_paths(ply_path)
+    if not os.path.exists(records_path):
+        return None
+    records = np.load(records_path, mmap_mode='r')
+    if max_points is not None:
+        records = records[:max(int(max_points), 0)]
+    return np.array(records['xyz'], dtype=np.float64), np.array(records['rgb'])
+
+
+def delete_lod(ply_path):
+    """Delete the LOD files stored next to a PLY file, returning the removed paths."""
+    removed = []
+    for path in lod_paths(ply_path):
+        if os.path.exists(path):
+            os.remove(path)
+            removed.append(path)
+    return removed
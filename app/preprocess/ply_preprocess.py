@@ -1,11 +1,28 @@
 import logging
+import tempfile
+import time
 
 import open3d as o3d
 import numpy as np
 import os
+from scipy import ndimage
 
 from app.models.point_cloud import PointCloud
+from app.preprocess.preprocess_context import PreprocessContext
+from app.preprocess.lod import build_lod_order, delete_lod, load_lod, save_lod
+from app.preprocess.ply_streaming import PLYVertexReader, file_size_mb
 from app.services.recon_proc_visualization_service import ReconProcVisualizationService
+from app.services.thread_budget import ThreadBudget
+
+# On-disk record for points spilled into streaming tiles
+STREAMING_TILE_DTYPE = np.dtype([('xyz', '<f8', 3), ('rgb', 'u1', 3)])
+# Approximate peak memory per point while a tile is filtered (raw record,
+# Open3D points/colors, KD-tree and neighbor distances)
+STREAMING_BYTES_PER_POINT = 160
+# How many times a dense tile may be split in four before it is processed anyway
+STREAMING_MAX_SPLIT_DEPTH = 4
+# Bottom completion algorithms accepted by PLYProcessor.complete_bottom
+BOTTOM_COMPLETION_METHODS = ('hull', 'raster')
 
 
 class PLYProcessor:
@@ -15,6 +32,9 @@ class PLYProcessor:
         self.ply_file = ply_file
         self.main_object = None
         self.ply_id = ply_id
+        self.context = PreprocessContext(workers=ThreadBudget.threads())
+        self.support_plane = None
+        self.bottom_completion = None
 
     def preprocess(self, distance_threshold=0.015, ransac_n=3, num_iterations=1000, cluster_eps=0.02,
                           min_points=50):
@@ -55,10 +75,192 @@ class PLYProcessor:
         pcd = o3d.io.read_point_cloud(self.ply_file)
         logging.info("Point cloud loaded successfully.")
         return pcd
+
+    def should_stream(self, threshold_mb):
+        """Whether the PLY file is large enough to be loaded out-of-core."""
+        return threshold_mb is not None and file_size_mb(self.ply_file) > threshold_mb
+
+    def load_point_cloud_streaming(self, memory_budget_mb=512, tile_overlap=0.02, voxel_size=0.002,
+                                   nn=16, std_multiplier=10):
+        """
+        Load a PLY file larger than RAM as an already reduced point cloud.
+
+        The vertex block is read in chunks through a memory map and spilled into
+        spatial tiles (with overlap) on disk. Each tile is then loaded on its own,
+        outlier-filtered and voxel-downsampled, and only its core region is kept,
+        so the in-memory working set stays within the given budget. The reduced
+        tiles are merged into a single point cloud.
+
+        Every tile is downsampled on one voxel grid anchored at the cloud's
+        minimum bound, like the in-memory downsampling, and a voxel is kept by
+        the tile whose core contains its center, so voxels along tile seams are
+        neither split nor duplicated.
+
+        :param memory_budget_mb: Maximum working set for one chunk or tile, in megabytes.
+        :param tile_overlap: Overlap added around every tile so the outlier statistics near
+                             tile borders see their full neighborhood.
+        :param voxel_size: Voxel size for the per-tile downsampling.
+        :param nn: Number of nearest neighbors for the outlier filter.
+        :param std_multiplier: Standard deviation multiplier for the outlier filter.
+        :return: Reduced, merged point cloud.
+        """
+        reader = PLYVertexReader(self.ply_file)
+        budget_points = max(int(memory_budget_mb * 1024 * 1024 / STREAMING_BYTES_PER_POINT), 1000)
+        chunk_size = max(budget_points // 2, 1000)
+        logging.info(f"Streaming {reader.vertex_count:,} points from {self.ply_file} "
+                     f"with a {memory_budget_mb}MB budget.")
+
+        min_bound, max_bound = reader.bounds(chunk_size)
+        # Tile the two widest axes; the third axis is kept whole inside every tile
+        extent = max_bound - min_bound
+        tile_axes = np.argsort(extent)[::-1][:2]
+        tiles_needed = max(1, int(np.ceil(reader.vertex_count / budget_points)))
+        tiles_per_axis = int(np.ceil(np.sqrt(tiles_needed)))
+        tile_edges = [np.linspace(min_bound[axis], max_bound[axis], tiles_per_axis + 1) for axis in tile_axes]
+
+        with tempfile.TemporaryDirectory(prefix='ply_tiles_') as spill_dir:
+            tiles = self._make_tiles(tile_edges[0], tile_edges[1], spill_dir, 'tile')
+            self._spill_to_tiles(reader.iter_chunks(chunk_size), tiles, tile_axes, tile_overlap)
+
+            merged_points, merged_colors = [], []
+            pending = list(tiles)
+            while pending:
+                tile = pending.pop()
+                if tile['count'] == 0:
+                    continue
+                if tile['count'] > budget_points and tile['depth'] < STREAMING_MAX_SPLIT_DEPTH:
+                    # Dense tile: split it in four, streaming its spill file through the memory map
+                    pending.extend(self._split_tile(tile, tile_axes, tile_overlap, chunk_size))
+                    os.remove(tile['path'])
+                    continue
+                tile_points, tile_colors = self._reduce_tile(tile, tile_axes, (min_bound, max_bound), voxel_size,
+                                                             nn, std_multiplier)
+                os.remove(tile['path'])
+                merged_points.append(tile_points)
+                merged_colors.append(tile_colors)
+                logging.info(f"Tile reduced from {tile['count']:,} to {len(tile_points):,} points.")
+
+        pcd = o3d.geometry.PointCloud()
+        if merged_points:
+            pcd.points = o3d.utility.Vector3dVector(np.concatenate(merged_points))
+            if reader.has_colors:
+                pcd.colors = o3d.utility.Vector3dVector(np.concatenate(merged_colors))
+        logging.info(f"Streamed point cloud reduced from {reader.vertex_count:,} to {len(pcd.points):,} points.")
+        return pcd
+
+    @staticmethod
+    def _make_tiles(edges_a, edges_b, spill_dir, prefix, depth=0):
+        """Create tile descriptors for a grid given by its edges along the two tiled axes."""
+        tiles = []
+        for i in range(len(edges_a) - 1):
+            for j in range(len(edges_b) - 1):
+                core_min = np.array([edges_a[i], edges_b[j]])
+                core_max = np.array([edges_a[i + 1], edges_b[j + 1]])
+                # The last tile on each axis includes its upper edge
+                core_max[0] = np.nextafter(core_max[0], np.inf) if i == len(edges_a) - 2 else core_max[0]
+                core_max[1] = np.nextafter(core_max[1], np.inf) if j == len(edges_b) - 2 else core_max[1]
+                tiles.append({
+                    'core_min': core_min,
+                    'core_max': core_max,
+                    'path': os.path.join(spill_dir, f"{prefix}_{i}_{j}.bin"),
+                    'count': 0,
+                    'depth': depth,
+                })
+        return tiles
+
+    @staticmethod
+    def _spill_to_tiles(chunks, tiles, tile_axes, tile_overlap):
+        """Append every chunk's points to the spill file of each tile they overlap."""
+        for points, colors in chunks:
+            if colors is None:
+                colors = np.zeros((len(points), 3), dtype=np.uint8)
+            records = np.empty(len(points), dtype=STREAMING_TILE_DTYPE)
+            records['xyz'] = points
+            records['rgb'] = colors
+            planar = points[:, tile_axes]
+            for tile in tiles:
+                mask = np.all((planar >= tile['core_min'] - tile_overlap) &
+                              (planar < tile['core_max'] + tile_overlap), axis=1)
+                if mask.any():
+                    with open(tile['path'], 'ab') as f:
+                        records[mask].tofile(f)
+                    tile['count'] += int(mask.sum())
+
+    def _split_tile(self, tile, tile_axes, tile_overlap, chunk_size):
+        """Split an over-budget tile into four sub-tiles, re-spilling its points chunk by chunk."""
+        mid = (tile['core_min'] + tile['core_max']) / 2
+        edges_a = [tile['core_min'][0], mid[0], tile['core_max'][0]]
+        edges_b = [tile['core_min'][1], mid[1], tile['core_max'][1]]
+        prefix = os.path.splitext(os.path.basename(tile['path']))[0]
+        sub_tiles = self._make_tiles(edges_a, edges_b, os.path.dirname(tile['path']), prefix, tile['depth'] + 1)
+        # Sub-tile edges are already exact, so no extra upper-edge widening
+        for sub_tile, (i, j) in zip(sub_tiles, [(0, 0), (0, 1), (1, 0), (1, 1)]):
+            sub_tile['core_max'][0] = edges_a[i + 1]
+            sub_tile['core_max'][1] = edges_b[j + 1]
+
+        records = np.memmap(tile['path'], dtype=STREAMING_TILE_DTYPE, mode='r')
+        chunks = ((np.asarray(records['xyz'][start:start + chunk_size]),
+                   np.asarray(records['rgb'][start:start + chunk_size]))
+                  for start in range(0, len(records), chunk_size))
+        self._spill_to_tiles(chunks, sub_tiles, tile_axes, tile_overlap)
+        del records
+        return sub_tiles
+
+    def _reduce_tile(self, tile, tile_axes, bounds, voxel_size, nn, std_multiplier):
+        """Outlier-filter and downsample one spilled tile, keeping only the voxels centered in its core region."""
+        min_bound, max_bound = bounds
+        records = np.fromfile(tile['path'], dtype=STREAMING_TILE_DTYPE)
+        tile_pcd = o3d.geometry.PointCloud()
+        tile_pcd.points = o3d.utility.Vector3dVector(records['xyz'])
+        tile_pcd.colors = o3d.utility.Vector3dVector(records['rgb'] / 255.0)
+        del records
+
+        if len(tile_pcd.points) > nn:
+            tile_pcd, _ = tile_pcd.remove_statistical_outlier(nn, std_multiplier)
+        # Open3D anchors its voxel grid half a voxel below the minimum bound
+        points, colors, centers = self.voxel_average(np.asarray(tile_pcd.points), np.asarray(tile_pcd.colors),
+                                                     min_bound - voxel_size / 2, voxel_size)
+
+        # Centers of the outermost voxels may lie past the bounds; they belong to the border tiles
+        planar = np.clip(centers[:, tile_axes], min_bound[tile_axes], max_bound[tile_axes])
+        core = np.all((planar >= tile['core_min']) & (planar < tile['core_max']), axis=1)
+        return points[core], colors[core]
+
+    @staticmethod
+    def voxel_average(points, colors, grid_origin, voxel_size):
+        """
+        Average points and colors per voxel of a grid anchored at a fixed origin.
+
+        :param points: Nx3 point coordinates.
+        :param colors: Nx3 colors.
+        :param grid_origin: Corner of the voxel grid, shared by every tile of a cloud.
+        :param voxel_size: Voxel edge length.
+        :return: (points, colors, voxel centers), one row per occupied voxel.
+        """
+        if len(points) == 0:
+            return points, colors, points
+        keys = np.floor((points - grid_origin) / voxel_size).astype(np.int64)
+        low = keys.min(axis=0)
+        shape = keys.max(axis=0) - low + 1
+        voxels, inverse, counts = np.unique(np.ravel_multi_index((keys - low).T, shape),
+                                            return_inverse=True, return_counts=True)
+        inverse = inverse.ravel()
+
+        def average(values):
+            return np.stack([np.bincount(inverse, values[:, axis], len(voxels)) for axis in range(3)],
+                            axis=1) / counts[:, None]
+
+        centers = grid_origin + (np.stack(np.unravel_index(voxels, shape), axis=1) + low + 0.5) * voxel_size
+        return average(points), average(colors), centers
+
     def center_point_cloud(self, pcd):
         pcd_center = pcd.get_center()
-        pcd.translate(-pcd_center)
-        return pcd
+        if self.support_plane is not None:
+            # The support plane follows the object into the centered frame
+            self.support_plane = np.append(self.support_plane[:3],
+                                           self.support_plane[3] + self.support_plane[:3] @ pcd_center)
+        # Translating through the context keeps the neighbor index of the cloud
+        return self.context.translate(pcd, -pcd_center)
     def remove_statistical_outliers(self, pcd, nn=16, std_multiplier=10):
         """
         Remove statistical outliers from the point cloud.
@@ -67,11 +269,14 @@ class PLYProcessor:
         :param std_multiplier: Standard deviation multiplier.
         :return: Filtered point cloud and outlier indices.
         """
-        filtered_pcd, inlier_indices = pcd.remove_statistical_outlier(nn, std_multiplier)
-        outliers = pcd.select_by_index(inlier_indices, invert=True)
+        with self.context.stage('remove_statistical_outliers'):
+            inlier_indices = self.context.statistical_outlier_inliers(pcd, nn, std_multiplier)
+            n_outliers = len(pcd.points) - len(inlier_indices)
+            # Keep the same cloud (and its neighbor index) when nothing was removed
+            filtered_pcd = pcd.select_by_index(inlier_indices) if n_outliers else pcd
 
         # Log the number of outliers removed
-        logging.info(f"Removed {len(outliers.points)} outliers from the point cloud.")
+        logging.info(f"Removed {n_outliers} outliers from the point cloud.")
 
         return filtered_pcd
 
@@ -82,7 +287,8 @@ class PLYProcessor:
         :param voxel_size: Size of the voxel grid.
         :return: Downsampled point cloud.
         """
-        downsampled_pcd = pcd.voxel_down_sample(voxel_size=voxel_size)
+        with self.context.stage('voxel_downsample'):
+            downsampled_pcd = pcd.voxel_down_sample(voxel_size=voxel_size)
         logging.info(f"Downsampled point cloud from {len(pcd.points)} to {len(downsampled_pcd.points)} points.")
 
         return downsampled_pcd
@@ -93,12 +299,13 @@ class PLYProcessor:
         :param pcd: Input point cloud.
         :return: Point cloud with estimated normals.
         """
-        nn_distance = np.mean(pcd.compute_nearest_neighbor_distance())
-        radius_normals = nn_distance * 10
-        pcd.estimate_normals(
-            search_param=o3d.geometry.KDTreeSearchParamHybrid(radius=radius_normals, max_nn=max_nn),
-            fast_normal_computation=True
-        )
+        with self.context.stage('estimate_normals'):
+            # The radius and the normals both come from one shared KNN query
+            self.context.knn(pcd, max(max_nn, 2))
+            nn_distance = np.mean(self.context.nearest_neighbor_distances(pcd))
+            radius_normals = nn_distance * 10
+            normals = self.context.estimate_normals(pcd, radius=radius_normals, max_nn=max_nn)
+            pcd.normals = o3d.utility.Vector3dVector(normals)
         logging.info("Normals estimated for the point cloud.")
 
         return pcd
@@ -113,11 +320,14 @@ class PLYProcessor:
         distance_threshold = np.interp(object_height, [min_height, max_height], [0.006, 0.03])
 
         logging.info("Segmenting the largest plane from the point cloud.")
-        plane_model, inliers = pcd.segment_plane(distance_threshold=distance_threshold,
-                                                 ransac_n=ransac_n,
-                                                 num_iterations=num_iterations)
+        with self.context.stage('segment_plane'):
+            plane_model, inliers = pcd.segment_plane(distance_threshold=distance_threshold,
+                                                     ransac_n=ransac_n,
+                                                     num_iterations=num_iterations)
+            remaining_cloud = pcd.select_by_index(inliers, invert=True)
+            self.support_plane = self.orient_plane_towards(plane_model, remaining_cloud)
         logging.info("Plane segmentation completed.")
-        return pcd.select_by_index(inliers, invert=True)
+        return remaining_cloud
 
     def get_remaining_cloud(self):
         """Return the remaining cloud (non-plane points) after plane segmentation."""
@@ -127,9 +337,12 @@ class PLYProcessor:
     def cluster_points(self, remaining_cloud, cluster_eps, min_points):
         """Cluster remaining points to find the main object."""
         logging.info("Clustering remaining points.")
-        labels = np.array(remaining_cloud.cluster_dbscan(eps=cluster_eps, min_points=min_points))
+        # Clustering runs on the cloud left after plane segmentation, which no other
+        # stage indexes, so Open3D's DBSCAN is used instead of the shared index
+        with self.context.stage('cluster_points', shares_index=False):
+            labels = np.array(remaining_cloud.cluster_dbscan(eps=cluster_eps, min_points=min_points))
 
-        if len(labels) == 0:
+        if len(labels) == 0 or labels.max() < 0:
             logging.warning("Clustering failed. Returning all non-plane points.")
             return remaining_cloud
 
@@ -137,7 +350,7 @@ class PLYProcessor:
         # Find the largest cluster (assumed to be the main object)
         max_label = labels.max()
         logging.info(f"Point cloud has {max_label + 1} clusters")
-        cluster_sizes = [len(labels[labels == i]) for i in range(max_label + 1)]
+        cluster_sizes = np.bincount(labels[labels >= 0], minlength=max_label + 1)
         largest_cluster = np.argmax(cluster_sizes)
 
         # Extract the largest cluster
@@ -145,17 +358,138 @@ class PLYProcessor:
         logging.info("Largest cluster extracted successfully.")
         return main_object
 
-    def complete_bottom(self, pcd, resolution=0.005, depth=0.005):
-        """Complete the bottom of the object."""
-        logging.info("Completing the bottom of the object.")
-        hull = self.compute_convex_hull(pcd)
-        outer_shape_pcd = self.sample_hull_surface(hull)
-        bottom_surface_points = self.extract_bottom_surface(outer_shape_pcd, depth)
-        bottom_surface_pcd = self.create_bottom_surface_pcd(bottom_surface_points)
+    @staticmethod
+    def orient_plane_towards(plane_model, pcd):
+        """
+        Orient a plane so that its normal points towards the given cloud.
 
-        logging.info("Bottom surface completed successfully.")
+        :param plane_model: Plane coefficients (a, b, c, d) of ax + by + cz + d = 0.
+        :param pcd: Point cloud that should lie on the positive side.
+        :return: Plane coefficients as a numpy array with a unit normal.
+        """
+        plane = np.asarray(plane_model, dtype=np.float64)
+        plane = plane / np.linalg.norm(plane[:3])
+        if pcd.has_points() and np.mean(np.asarray(pcd.points) @ plane[:3] + plane[3]) < 0:
+            plane = -plane
+        return plane
+
+    def complete_bottom(self, pcd, resolution=0.005, depth=0.005, method='hull'):
+        """
+        Complete the bottom of the object.
+
+        :param pcd: Object point cloud.
+        :param resolution: Grid spacing of the raster fill.
+        :param depth: RANSAC distance threshold of the hull method.
+        :param method: 'hull' samples the convex hull and keeps its bottom plane,
+                       'raster' fills the object footprint on the support plane.
+        :return: (completed cloud, bottom surface cloud).
+        """
+        if method not in BOTTOM_COMPLETION_METHODS:
+            raise ValueError(f"Unknown bottom completion method: {method}")
+        if method == 'raster' and self.support_plane is None:
+            logging.warning("No support plane detected. Falling back to hull bottom completion.")
+            method = 'hull'
+
+        logging.info(f"Completing the bottom of the object ({method}).")
+        start = time.perf_counter()
+        with self.context.stage('complete_bottom'):
+            if method == 'raster':
+                bottom_surface_points = self.rasterize_bottom_surface(pcd, self.support_plane, resolution)
+            else:
+                hull = self.compute_convex_hull(pcd)
+                outer_shape_pcd = self.sample_hull_surface(hull)
+                bottom_surface_points = self.extract_bottom_surface(outer_shape_pcd, depth)
+            bottom_surface_pcd = self.create_bottom_surface_pcd(bottom_surface_points)
+            if pcd.has_normals() and bottom_surface_pcd.has_points():
+                # Open3D drops the normals of a sum unless both clouds have them
+                normal = self.bottom_surface_normal(pcd, bottom_surface_pcd)
+                bottom_surface_pcd.normals = o3d.utility.Vector3dVector(
+                    np.tile(normal, (len(bottom_surface_pcd.points), 1)))
+
+        self.bottom_completion = {
+            'method': method,
+            'seconds': round(time.perf_counter() - start, 4),
+            'points': len(bottom_surface_pcd.points),
+        }
+        logging.info(f"Bottom surface completed successfully: {self.bottom_completion}")
         return pcd + bottom_surface_pcd, bottom_surface_pcd
 
+    @staticmethod
+    def bottom_surface_normal(pcd, bottom_surface_pcd):
+        """
+        Normal of the plane fitted to the bottom surface, pointing away from the object.
+
+        :param pcd: Object point cloud.
+        :param bottom_surface_pcd: Bottom surface point cloud.
+        :return: Unit normal as a numpy array.
+        """
+        bottom_points = np.asarray(bottom_surface_pcd.points)
+        bottom_center = bottom_points.mean(axis=0)
+        _, eigenvectors = np.linalg.eigh(np.cov((bottom_points - bottom_center).T))
+        normal = eigenvectors[:, 0]
+        if np.dot(bottom_center - pcd.get_center(), normal) < 0:
+            normal = -normal
+        return normal
+
+    def compare_bottom_methods(self, pcd, resolution=0.005, depth=0.005):
+        """
+        Run every bottom completion method on the same object.
+
+        :return: Dict of method name to its timing and bottom point count.
+        """
+        comparison = {}
+        for method in BOTTOM_COMPLETION_METHODS:
+            self.complete_bottom(pcd, resolution=resolution, depth=depth, method=method)
+            comparison[self.bottom_completion['method']] = self.bottom_completion
+        logging.info(f"Bottom completion comparison: {comparison}")
+        return comparison
+
+    def rasterize_bottom_surface(self, pcd, plane, resolution):
+        """
+        Fill the object footprint on the support plane with a regular grid of points.
+
+        The object is projected along the plane normal onto a grid with
+        ``resolution`` spacing, holes inside the footprint are filled, and one
+        point per covered cell is placed on the support plane.
+
+        :param pcd: Object point cloud.
+        :param plane: Support plane coefficients (a, b, c, d) of ax + by + cz + d = 0 in the
+                      frame of the object, with a unit normal pointing towards the object.
+        :param resolution: Grid spacing.
+        :return: Point cloud with the bottom surface points.
+        """
+        logging.info("Rasterizing the object footprint on the support plane.")
+        points = np.asarray(pcd.points)
+        plane = np.asarray(plane, dtype=np.float64)
+        normal, offset = plane[:3], plane[3]
+
+        # Orthonormal basis of the plane
+        helper = np.array([1.0, 0.0, 0.0]) if abs(normal[0]) < 0.9 else np.array([0.0, 1.0, 0.0])
+        axis_u = np.cross(normal, helper)
+        axis_u /= np.linalg.norm(axis_u)
+        axis_v = np.cross(normal, axis_u)
+
+        footprint = np.stack([points @ axis_u, points @ axis_v], axis=1)
+        origin = footprint.min(axis=0)
+        cells = np.floor((footprint - origin) / resolution).astype(np.int64)
+        occupancy = np.zeros(cells.max(axis=0) + 1, dtype=bool)
+        occupancy[cells[:, 0], cells[:, 1]] = True
+        # Close one-cell gaps between scanned points before filling the interior
+        occupancy = ndimage.binary_closing(np.pad(occupancy, 1))[1:-1, 1:-1]
+        occupancy = ndimage.binary_fill_holes(occupancy)
+
+        grid_u, grid_v = np.nonzero(occupancy)
+        coords_u = origin[0] + (grid_u + 0.5) * resolution
+        coords_v = origin[1] + (grid_v + 0.5) * resolution
+        # Points of the plane satisfy normal . p = -offset
+        bottom_points = (coords_u[:, None] * axis_u + coords_v[:, None] * axis_v
+                         - offset * normal)
+
+        bottom_surface_points = o3d.geometry.PointCloud()
+        bottom_surface_points.points = o3d.utility.Vector3dVector(bottom_points)
+        logging.info("Bottom surface points rasterized.")
+        return bottom_surface_points
+
     def compute_convex_hull(self, pcd):
         """Compute the convex hull of the point cloud."""
         logging.info("Computing convex hull.")
@@ -190,13 +524,14 @@ class PLYProcessor:
 
         return bottom_surface_pcd
 
-    def calculate_bson_size(self, points, colors):
+    def calculate_bson_size(self, points, colors, normals=None):
         """
-        Estimate BSON document size for points and colors arrays.
+        Estimate BSON document size for points, colors and normals arrays.
 
         Args:
             points: numpy array of points
             colors: numpy array of colors
+            normals: numpy array of normals, if they are stored
 
         Returns:
             int: Estimated size in bytes
@@ -207,10 +542,13 @@ class PLYProcessor:
         # Estimate size of colors array (each color has 3 uint8 values)
         colors_size = len(colors) * 3
 
+        # Normals are packed to 3 bytes each
+        normals_size = len(normals) * 3 if normals is not None else 0
+
         # Add overhead for BSON structure (approximate)
         overhead = 1000  # Base document overhead
 
-        return (points_size + colors_size + overhead)*5
+        return (points_size + colors_size + overhead)*5 + normals_size
 
     def save_to_db(self, name='point_cloud', max_size_bytes=16 * 1024 * 1024):
         """
@@ -229,6 +567,8 @@ class PLYProcessor:
         # Convert point cloud to numpy arrays
         points = np.asarray(self.main_object.points)
         colors = np.asarray(self.main_object.colors)
+        # Normals are kept so reconstruction does not estimate them again
+        normals = np.asarray(self.main_object.normals) if self.main_object.has_normals() else None
 
         if len(colors) == 0:
             logging.warning("No colors found in the main object. Defaulting to black color.")
@@ -239,7 +579,7 @@ class PLYProcessor:
         colors = (colors * 255).astype(np.uint8)
 
         # Initial size check
-        current_size = self.calculate_bson_size(points, colors)
+        current_size = self.calculate_bson_size(points, colors, normals)
         print(f"point cloud size: {current_size / (1024 * 1024):.2f} MB")
 
         # If size is too large, progressively downsample until it fits
@@ -255,6 +595,7 @@ class PLYProcessor:
             # Update arrays
             points = np.asarray(current_pcd.points)
             colors = np.asarray(current_pcd.colors)
+            normals = np.asarray(current_pcd.normals) if current_pcd.has_normals() else None
             if len(colors) == 0:
                 colors = np.zeros((len(points), 3))
                 colors[:, 1] = 1
@@ -262,17 +603,23 @@ class PLYProcessor:
             colors = (colors * 255).astype(np.uint8)
 
             # Recalculate size
-            current_size = self.calculate_bson_size(points, colors)
+            current_size = self.calculate_bson_size(points, colors, normals)
 
             # Increase voxel size for next iteration if needed
             voxel_size *= 1.5
 
+        # Store points coarse-to-fine so viewers can fetch any prefix as a uniform subsample
+        lod_order, lod_offsets = build_lod_order(points)
+        points, colors = points[lod_order], colors[lod_order]
+        if normals is not None:
+            normals = normals[lod_order]
+
         # Convert the points and colors to the correct format
         formatted_points = np.array([[float(p[0]), float(p[1]), float(p[2])] for p in points])
         formatted_colors = np.array([[float(p[0]), float(p[1]), float(p[2])] for p in colors])
 
         # Save PointCloud
-        point_cloud = PointCloud(name, formatted_points, formatted_colors)
+        point_cloud = PointCloud(name, formatted_points, formatted_colors, lod_offsets, normals)
         point_cloud_id = point_cloud.save()
 
         print(
@@ -288,6 +635,9 @@ class PLYProcessor:
         """
         Save a PLY file to the file system with automatic downsampling if the file size exceeds the limit.
 
+        The saved cloud is also stored as a level-of-detail pyramid next to the PLY
+        file, so visuals can be served at any point budget by reading a prefix.
+
         Args:
             main_object (open3d.geometry.PointCloud): The 3D object to be saved as PLY.
             title (str): The title of the PLY file.
@@ -372,6 +722,11 @@ class PLYProcessor:
                 f"({reduction_percent:.1f}% reduction)"
             )
 
+            # The pyramid serves the points of the PLY file, after any size capping
+            colors = np.asarray(current_pcd.colors) if current_pcd.has_colors() else \
+                np.tile([0.0, 1.0, 0.0], (len(current_pcd.points), 1))
+            save_lod(file_path, np.asarray(current_pcd.points), colors)
+
             # Return filepath only if save was successful
             return file_path
 
@@ -380,6 +735,7 @@ class PLYProcessor:
             # Clean up any partially written file
             if os.path.exists(file_path):
                 os.remove(file_path)
+            delete_lod(file_path)
             return None
 
 
@@ -433,9 +789,26 @@ class PLYProcessor:
             }
         }
 
-    def get_ply(self, param):
+    def get_ply(self, param, max_points=None):
+        """
+        Load a saved preprocessing visual.
+
+        :param param: Visual folder name (e.g. filtered_ply).
+        :param max_points: Optional point budget, served as a prefix of the LOD pyramid.
+        :return: Open3D point cloud or None.
+        """
         try:
-            pcd = o3d.io.read_point_cloud("/app/app/ply_preprocess_visuals/"+param+"/" + self.ply_id + ".ply")
+            ply_path = "/app/app/ply_preprocess_visuals/"+param+"/" + self.ply_id + ".ply"
+            lod = load_lod(ply_path, max_points) if max_points is not None else None
+            if lod is not None:
+                points, colors = lod
+                pcd = o3d.geometry.PointCloud()
+                pcd.points = o3d.utility.Vector3dVector(points)
+                pcd.colors = o3d.utility.Vector3dVector(colors / 255.0)
+            else:
+                pcd = o3d.io.read_point_cloud(ply_path)
+                if max_points is not None and len(pcd.points) > max_points:
+                    pcd = pcd.uniform_down_sample(-(-len(pcd.points) // max(int(max_points), 1)))
             if not pcd.has_points():
                 pcd = None
             return pcd
@@ -0,0 +1,162 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# PLY scalar property types mapped to numpy type codes
+PLY_DTYPES = {
+    'char': 'i1', 'int8': 'i1',
+    'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2',
+    'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4',
+    'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4',
+    'double': 'f8', 'float64': 'f8',
+}
+
+
+class PLYVertexReader:
+    """
+    Reads the vertex block of a PLY file in chunks without loading the whole file.
+
+    Binary files are memory mapped, so only the chunk currently being converted
+    is resident in memory. ASCII files are read with a chunked CSV reader.
+
+    Attributes:
+        ply_file (str): Path to the PLY file.
+        file_format (str): 'ascii', 'binary_little_endian' or 'binary_big_endian'.
+        vertex_count (int): Number of vertices declared in the header.
+        vertex_dtype (np.dtype): Structured dtype of one vertex record.
+        data_offset (int): Byte offset of the vertex block (binary) or header line count (ascii).
+    """
+
+    def __init__(self, ply_file):
+        self.ply_file = ply_file
+        self.file_format = None
+        self.vertex_count = 0
+        self.vertex_dtype = None
+        self.data_offset = 0
+        self._header_lines = 0
+        self._read_header()
+
+    def _read_header(self):
+        """Parse the PLY header and locate the vertex block."""
+        elements = []
+        with open(self.ply_file, 'rb') as f:
+            if f.readline().strip() != b'ply':
+                raise ValueError(f"{self.ply_file} is not a PLY file")
+            self._header_lines = 1
+            while True:
+                line = f.readline()
+                if not line:
+                    raise ValueError("Unexpected end of file while reading PLY header")
+                self._header_lines += 1
+                tokens = line.decode('ascii', errors='replace').split()
+                if not tokens or tokens[0] in ('comment', 'obj_info'):
+                    continue
+                if tokens[0] == 'format':
+                    self.file_format = tokens[1]
+                elif tokens[0] == 'element':
+                    elements.append({'name': tokens[1], 'count': int(tokens[2]), 'properties': []})
+                elif tokens[0] == 'property':
+                    if tokens[1] == 'list':
+                        elements[-1]['properties'].append((tokens[4], None))
+                    else:
+                        elements[-1]['properties'].append((tokens[2], PLY_DTYPES[tokens[1]]))
+                elif tokens[0] == 'end_header':
+                    self.data_offset = f.tell()
+                    break
+
+        byte_order = '>' if self.file_format == 'binary_big_endian' else '<'
+        for element in elements:
+            has_lists = any(dtype is None for _, dtype in element['properties'])
+            if element['name'] == 'vertex':
+                if has_lists:
+                    raise ValueError("List properties in the vertex element are not supported")
+                self.vertex_count = element['count']
+                self.vertex_dtype = np.dtype([(name, byte_order + dtype) for name, dtype in element['properties']])
+                break
+            # Elements stored before the vertex block must have a fixed record size
+            if has_lists:
+                raise ValueError("Cannot locate the vertex block after an element with list properties")
+            record = np.dtype([(name, byte_order + dtype) for name, dtype in element['properties']])
+            if self.file_format == 'ascii':
+                self._header_lines += element['count']
+            else:
+                self.data_offset += record.itemsize * element['count']
+        else:
+            raise ValueError("PLY file has no vertex element")
+
+        for axis in ('x', 'y', 'z'):
+            if axis not in self.vertex_dtype.names:
+                raise ValueError(f"PLY vertex element has no '{axis}' property")
+
+    @property
+    def has_colors(self):
+        """Whether the vertex element carries red/green/blue properties."""
+        return all(c in self.vertex_dtype.names for c in ('red', 'green', 'blue'))
+
+    @property
+    def record_size(self):
+        """Size in bytes of one vertex record."""
+        return self.vertex_dtype.itemsize
+
+    def _records(self, chunk_size):
+        """Yield raw structured vertex records in chunks."""
+        if self.file_format == 'ascii':
+            reader = pd.read_csv(self.ply_file, sep=r'\s+', header=None, skiprows=self._header_lines,
+                                 nrows=self.vertex_count, chunksize=chunk_size, engine='c')
+            for frame in reader:
+                values = frame.values[:, :len(self.vertex_dtype.names)]
+                records = np.empty(len(values), dtype=self.vertex_dtype.newbyteorder('='))
+                for i, name in enumerate(self.vertex_dtype.names):
+                    records[name] = values[:, i]
+                yield records
+        else:
+            vertices = np.memmap(self.ply_file, dtype=self.vertex_dtype, mode='r',
+                                 offset=self.data_offset, shape=(self.vertex_count,))
+            try:
+                for start in range(0, self.vertex_count, chunk_size):
+                    yield vertices[start:start + chunk_size]
+            finally:
+                del vertices
+
+    def iter_chunks(self, chunk_size=1_000_000):
+        """
+        Iterate over the vertex block in chunks.
+
+        :param chunk_size: Number of vertices per chunk.
+        :return: Generator of (points, colors) tuples, with points as float64 (N, 3) and
+                 colors as uint8 (N, 3) or None if the file has no colors.
+        """
+        for records in self._records(chunk_size):
+            points = np.column_stack([records['x'], records['y'], records['z']]).astype(np.float64)
+            colors = None
+            if self.has_colors:
+                colors = np.column_stack([records['red'], records['green'], records['blue']])
+                if colors.dtype.kind == 'f':
+                    colors = np.clip(colors * 255, 0, 255)
+                colors = colors.astype(np.uint8)
+            yield points, colors
+
+    def bounds(self, chunk_size=1_000_000):
+        """
+        Compute the axis-aligned bounding box of all vertices with one streaming pass.
+
+        :return: (min_bound, max_bound) as float64 arrays of shape (3,).
+        """
+        min_bound = np.full(3, np.inf)
+        max_bound = np.full(3, -np.inf)
+        for points, _ in self.iter_chunks(chunk_size):
+            if len(points):
+                min_bound = np.minimum(min_bound, points.min(axis=0))
+                max_bound = np.maximum(max_bound, points.max(axis=0))
+        return min_bound, max_bound
+
+
+def file_size_mb(path):
+    """Size of a file on disk in megabytes."""
+    return os.path.getsize(path) / (1024 * 1024)
+
@@ -0,0 +1,270 @@
+import hashlib
+import logging
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class PreprocessContext:
+    """
+    Shares one neighbor index per point cloud state across preprocessing stages.
+
+    The KD-tree and the k-nearest-neighbor graph are built the first time a stage
+    needs them and reused by every later stage that works on the same cloud.
+    They are invalidated when the cloud is replaced by another Open3D object or
+    its points change, detected by a cheap fingerprint: the point count, the
+    bounds and a strided sample of the points. A translation done through
+    ``translate`` keeps the index, since neighbor relations and distances do
+    not change; other in-place transforms rebuild it.
+
+    Attributes:
+        timings (dict): Accumulated wall time per preprocessing stage, in seconds.
+        index_builds (int): Number of KD-tree / KNN builds.
+        index_reuses (int): Number of times a stage reused an existing index.
+        index_build_time (float): Total time spent building indices, in seconds.
+        unshared_stages (set): Names of the timed stages that do not use the shared index.
+    """
+
+    # Points per batch for vectorized neighborhood computations
+    BATCH_SIZE = 65536
+    # Points sampled into the fingerprint of a cloud state
+    FINGERPRINT_SAMPLES = 1024
+
+    def __init__(self, workers=-1):
+        self.workers = workers
+        self.timings = {}
+        self.index_builds = 0
+        self.index_reuses = 0
+        self.index_build_time = 0.0
+        self.unshared_stages = set()
+        self._pcd = None
+        self._fingerprint = None
+        self._n_points = 0
+        self._points = None
+        self._tree = None
+        self._knn_distances = None
+        self._knn_indices = None
+
+    def invalidate(self):
+        """Drop the cached index."""
+        self._pcd = None
+        self._fingerprint = None
+        self._n_points = 0
+        self._points = None
+        self._tree = None
+        self._knn_distances = None
+        self._knn_indices = None
+
+    @classmethod
+    def fingerprint(cls, pcd):
+        """Point count, bounds and a strided sample of the points, hashed."""
+        points = np.asarray(pcd.points)
+        if len(points) == 0:
+            return 0, None
+        sample = np.ascontiguousarray(points[::max(1, len(points) // cls.FINGERPRINT_SAMPLES)])
+        digest = hashlib.blake2b(points.min(axis=0).tobytes() + points.max(axis=0).tobytes(), digest_size=16)
+        digest.update(sample.tobytes())
+        return len(points), digest.hexdigest()
+
+    def _bind(self, pcd):
+        """Attach the context to a cloud state, invalidating the index if the points changed."""
+        fingerprint = self.fingerprint(pcd)
+        if pcd is not self._pcd or fingerprint != self._fingerprint:
+            self.invalidate()
+            self._pcd = pcd
+            self._fingerprint = fingerprint
+            self._n_points = len(pcd.points)
+
+    def translate(self, pcd, offset):
+        """
+        Translate a cloud in place, keeping its index if it has one.
+
+        The index stays in the frame it was built in, which gives the same
+        neighbors and distances.
+
+        :param pcd: Open3D point cloud.
+        :param offset: Translation vector.
+        :return: The translated cloud.
+        """
+        indexed = pcd is self._pcd and self.fingerprint(pcd) == self._fingerprint
+        pcd.translate(offset)
+        if indexed:
+            self._fingerprint = self.fingerprint(pcd)
+        return pcd
+
+    def tree(self, pcd):
+        """KD-tree over the cloud, built once per cloud state."""
+        self._bind(pcd)
+        if self._tree is None:
+            start = time.perf_counter()
+            self._points = np.array(pcd.points)
+            self._tree = cKDTree(self._points)
+            self._record_build(time.perf_counter() - start)
+        else:
+            self.index_reuses += 1
+        return self._tree
+
+    def knn(self, pcd, k):
+        """
+        k nearest neighbors of every point, the point itself included.
+
+        The graph is computed for the largest k requested so far; smaller
+        requests are served as column slices of the cached graph.
+
+        :param pcd: Open3D point cloud.
+        :param k: Number of neighbors (including the point itself).
+        :return: (distances, indices), each of shape (N, k).
+        """
+        self._bind(pcd)
+        k = min(k, self._n_points)
+        if self._knn_indices is None or self._knn_indices.shape[1] < k:
+            tree = self.tree(pcd)
+            start = time.perf_counter()
+            distances, indices = tree.query(self._points, k=k, workers=self.workers)
+            if k == 1:
+                distances, indices = distances[:, None], indices[:, None]
+            self._knn_distances, self._knn_indices = distances, indices
+            self._record_build(time.perf_counter() - start, count=False)
+        else:
+            self.index_reuses += 1
+        return self._knn_distances[:, :k], self._knn_indices[:, :k]
+
+    def statistical_outlier_inliers(self, pcd, nn, std_multiplier):
+        """
+        Indices of the points kept by a statistical outlier filter.
+
+        Mirrors Open3D's ``remove_statistical_outlier``: a point is an outlier when its
+        mean distance to its ``nn`` nearest neighbors is above the cloud mean plus
+        ``std_multiplier`` standard deviations.
+        """
+        distances, _ = self.knn(pcd, nn)
+        avg_distances = distances.mean(axis=1)
+        valid = avg_distances > 0
+        if valid.sum() < 2:
+            return np.arange(len(avg_distances))
+        cloud_mean = avg_distances[valid].mean()
+        std_dev = np.sqrt(((avg_distances[valid] - cloud_mean) ** 2).sum() / (valid.sum() - 1))
+        threshold = cloud_mean + std_multiplier * std_dev
+        return np.where(valid & (avg_distances < threshold))[0]
+
+    def nearest_neighbor_distances(self, pcd):
+        """Distance from every point to its nearest other point."""
+        distances, _ = self.knn(pcd, 2)
+        return distances[:, 1]
+
+    def estimate_normals(self, pcd, radius, max_nn):
+        """
+        Estimate normals from the shared KNN graph with a hybrid radius / max_nn neighborhood.
+
+        Each normal is the eigenvector of the smallest eigenvalue of the covariance of
+        the neighbors within ``radius`` among the ``max_nn`` nearest. Normals are
+        oriented to agree with existing normals when the cloud already has them.
+
+        :return: Array of unit normals, shape (N, 3).
+        """
+        distances, indices = self.knn(pcd, max_nn)
+        points = np.asarray(pcd.points)
+        previous = np.asarray(pcd.normals) if pcd.has_normals() else None
+        normals = np.empty_like(points)
+
+        for start in range(0, len(points), self.BATCH_SIZE):
+            end = start + self.BATCH_SIZE
+            weights = (distances[start:end] <= radius).astype(np.float64)
+            counts = weights.sum(axis=1)
+            # Neighbor offsets relative to the query point keep the covariance well conditioned
+            offsets = points[indices[start:end]] - points[start:end, None, :]
+            x, y, z = (offsets[..., axis] * weights for axis in range(3))
+            mx, my, mz = x.sum(axis=1) / counts, y.sum(axis=1) / counts, z.sum(axis=1) / counts
+            covariance = (
+                (x * x).sum(axis=1) / counts - mx * mx, (x * y).sum(axis=1) / counts - mx * my,
+                (x * z).sum(axis=1) / counts - mx * mz, (y * y).sum(axis=1) / counts - my * my,
+                (y * z).sum(axis=1) / counts - my * mz, (z * z).sum(axis=1) / counts - mz * mz,
+            )
+            batch_normals = smallest_eigenvectors(*covariance)
+            batch_normals[counts < 3] = (0.0, 0.0, 1.0)
+            if previous is not None:
+                flip = np.einsum('ij,ij->i', batch_normals, previous[start:end]) < 0
+                batch_normals[flip] *= -1
+            normals[start:end] = batch_normals
+        return normals
+
+    @contextmanager
+    def stage(self, name, shares_index=True):
+        """
+        Time a preprocessing stage and accumulate it under ``name``.
+
+        Stages that do their own neighbor search instead of using the shared
+        index are passed ``shares_index=False`` and listed as such in the report.
+        """
+        if not shares_index:
+            self.unshared_stages.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def _record_build(self, seconds, count=True):
+        if count:
+            self.index_builds += 1
+        self.index_build_time += seconds
+
+    def report(self):
+        """
+        Summarize stage timings and the time saved by reusing the neighbor index.
+
+        The saved time is estimated as the number of reuses times the average
+        cost of one index build. Stages that do not use the shared index are
+        listed under 'stages_without_index_reuse'.
+        """
+        average_build = self.index_build_time / self.index_builds if self.index_builds else 0.0
+        report = {
+            'stage_timings': {name: round(seconds, 4) for name, seconds in self.timings.items()},
+            'index_builds': self.index_builds,
+            'index_reuses': self.index_reuses,
+            'index_build_time': round(self.index_build_time, 4),
+            'estimated_time_saved': round(self.index_reuses * average_build, 4),
+            'stages_without_index_reuse': sorted(self.unshared_stages),
+        }
+        logging.info(f"Preprocessing timings: {report}")
+        return report
+
+
+def smallest_eigenvectors(xx, xy, xz, yy, yz, zz):
+    """
+    Unit eigenvectors of the smallest eigenvalue of many symmetric 3x3 matrices.
+
+    Closed-form and vectorized: the eigenvalue comes from the trigonometric
+    solution of the characteristic polynomial, and the eigenvector is the
+    longest cross product of two rows of (A - lambda I).
+
+    Args:
+        xx, xy, xz, yy, yz, zz (np.ndarray): Unique matrix entries, each of shape (N,).
+
+    Returns:
+        np.ndarray: Eigenvectors of shape (N, 3).
+    """
+    off_diagonal = xy ** 2 + xz ** 2 + yz ** 2
+    q = (xx + yy + zz) / 3
+    p = np.sqrt(((xx - q) ** 2 + (yy - q) ** 2 + (zz - q) ** 2 + 2 * off_diagonal) / 6)
+    p[p == 0] = np.finfo(np.float64).tiny
+    b11, b22, b33 = (xx - q) / p, (yy - q) / p, (zz - q) / p
+    b12, b13, b23 = xy / p, xz / p, yz / p
+    det_b = b11 * (b22 * b33 - b23 * b23) - b12 * (b12 * b33 - b23 * b13) + b13 * (b12 * b23 - b22 * b13)
+    phi = np.arccos(np.clip(det_b / 2, -1, 1)) / 3
+    smallest = q + 2 * p * np.cos(phi + 2 * np.pi / 3)
+
+    row_0 = np.stack([xx - smallest, xy, xz], axis=1)
+    row_1 = np.stack([xy, yy - smallest, yz], axis=1)
+    row_2 = np.stack([xz, yz, zz - smallest], axis=1)
+    candidates = np.stack([np.cross(row_0, row_1), np.cross(row_0, row_2), np.cross(row_1, row_2)])
+    lengths = np.linalg.norm(candidates, axis=2)
+    best = np.argmax(lengths, axis=0)
+    rows = np.arange(len(xx))
+    vectors = candidates[best, rows]
+    norms = lengths[best, rows]
+    vectors[norms == 0] = (0.0, 0.0, 1.0)
+    norms[norms == 0] = 1.0
+    return vectors / norms[:, None]
@@ -0,0 +1,123 @@
+"""
+Benchmark of the point and color arrays passed through the reconstruction stages.
+
+Compares the float32 points / uint8 colors loaded once by
+``ReconstructionService.load_point_arrays`` with the float64 arrays the stages
+used to build, each stage copying its input. Each path runs in a fresh worker
+process on a point cloud document of Python lists, like the ones read from
+MongoDB, and is measured over loading, hashing, alpha estimation and color
+transfer to a sphere mesh. Usage::
+
+    python -m app.reconstruction.data_path_benchmark [--points N] [--mesh-resolution R]
+"""
+import argparse
+import json
+import logging
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyvista as pv
+
+from app.reconstruction.point_cloud_to_mesh import PointCloudToMesh
+from app.reconstruction.reconstruction_context import ReconstructionContext
+from app.reconstruction.reconstruction_utils import content_hash
+from app.reconstruction.texture_mapper import TextureMapper
+from app.services.reconstruction_service import ReconstructionService
+
+logger = logging.getLogger(__name__)
+
+PATHS = ('float32', 'float64')
+
+
+def _peak_rss_mb():
+    """Peak resident set size of the current process in MB (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def sample_document(n_points=2000000, seed=0):
+    """A point cloud document of a noisy unit sphere, with colors in [0, 255] stored as floats."""
+    rng = np.random.default_rng(seed)
+    points = rng.normal(size=(n_points, 3))
+    points /= np.linalg.norm(points, axis=1)[:, None]
+    points *= 1 + 0.003 * rng.normal(size=(n_points, 1))
+    colors = rng.integers(0, 256, size=(n_points, 3)).astype(np.float64)
+    return {'points': points.tolist(), 'colors': colors.tolist()}
+
+
+def _load_float64(document):
+    """The arrays the stages used before: float64 points and colors, the lists kept in the document."""
+    points = np.array(document['points'], dtype=np.float64)
+    colors = np.array(document['colors'], dtype=np.float64)
+    return points, colors
+
+
+def _run_path(path, n_points, mesh_resolution):
+    """Run the stages on one data path and measure them; runs inside a worker process."""
+    document = sample_document(n_points)
+    mesh = pv.Sphere(theta_resolution=mesh_resolution, phi_resolution=mesh_resolution)
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+
+    if path == 'float32':
+        points, colors = ReconstructionService.load_point_arrays(document)
+        context = ReconstructionContext(points)
+    else:
+        points, colors = _load_float64(document)
+        # Every stage made its own float64 copy of the points and colors
+        points, colors, context = np.array(points), np.array(colors), None
+    content_hash(points)
+
+    pc_to_mesh = PointCloudToMesh()
+    pc_to_mesh.set_point_cloud(points, context=context)
+    pc_to_mesh.calculate_optimal_alpha()
+
+    texture_mapper = TextureMapper()
+    texture_mapper.load_mesh(mesh)
+    texture_mapper.load_point_cloud_with_colors(
+        points if context is not None else np.array(points), colors, context=context)
+    texture_mapper.map_colors_to_mesh()
+
+    return {
+        'path': path,
+        'points': n_points,
+        'seconds': round(time.perf_counter() - start, 3),
+        'peak_memory_mb': round(_peak_rss_mb() - baseline, 1),
+        'peak_total_memory_mb': round(_peak_rss_mb(), 1),
+        'mesh_points': int(mesh.n_points),
+    }
+
+
+def benchmark_data_paths(n_points=2000000, mesh_resolution=200, paths=PATHS):
+    """
+    Compare runtime and peak memory of the reconstruction data paths.
+
+    Args:
+        n_points (int): Points of the sampled document.
+        mesh_resolution (int): Sphere resolution of the mesh the colors are transferred to.
+        paths (tuple): Data paths to compare, 'float32' and/or 'float64'.
+
+    Returns:
+        list: One result dict per path with 'path', 'points', 'seconds', 'peak_memory_mb'
+              (above the resident document lists), 'peak_total_memory_mb' and 'mesh_points'.
+    """
+    results = []
+    for path in paths:
+        # A fresh process per path keeps the peak memory of one path out of the next
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(_run_path, path, n_points, mesh_resolution).result()
+        logger.info(f"Benchmark result: {result}")
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--points', type=int, default=2000000, help='size of the sampled document')
+    parser.add_argument('--mesh-resolution', type=int, default=200,
+                        help='sphere resolution of the colored mesh (200 gives about 40k vertices)')
+    args = parser.parse_args()
+    json.dump(benchmark_data_paths(args.points, args.mesh_resolution), sys.stdout, indent=2)
+    print()
@@ -0,0 +1,106 @@
+"""
+Benchmark of the surface reconstruction engines of PointCloudToMesh.
+
+Each engine runs in a fresh worker process so its peak memory is measured in
+isolation. Usage::
+
+    python -m app.reconstruction.engine_benchmark [scan.ply] [engine ...]
+
+Without a point cloud, points sampled from a noisy sphere are used; compare
+``delaunay`` and ``tsdf`` with ``--points`` to see how each scales.
+"""
+import argparse
+import json
+import logging
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.reconstruction.point_cloud_to_mesh import PointCloudToMesh
+from app.reconstruction.reconstruction_utils import load_point_cloud_from_csv
+
+logger = logging.getLogger(__name__)
+
+
+def _peak_rss_mb():
+    """Peak resident set size of the current process in MB (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_engine(points, engine, params):
+    """Generate one mesh and measure it; runs inside a worker process."""
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    pc_to_mesh = PointCloudToMesh()
+    pc_to_mesh.set_point_cloud(points)
+    mesh = pc_to_mesh.generate_mesh(engine=engine, **params)
+    return {
+        'engine': engine,
+        'seconds': round(time.perf_counter() - start, 3),
+        'peak_memory_mb': round(_peak_rss_mb() - baseline, 1),
+        'faces': int(mesh.n_cells),
+        'points': int(mesh.n_points),
+    }
+
+
+def benchmark_engines(points, engines=None, engine_params=None):
+    """
+    Compare runtime, peak memory and face count of the reconstruction engines.
+
+    Args:
+        points (np.ndarray): Nx3 array of point coordinates.
+        engines (list, optional): Engine names, defaults to every registered engine.
+        engine_params (dict, optional): Engine name -> keyword arguments for generate_mesh.
+
+    Returns:
+        list: One result dict per engine with 'engine', 'seconds', 'peak_memory_mb',
+              'faces' and 'points', or 'error' if the engine failed.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    engines = engines or list(PointCloudToMesh.ENGINES)
+    engine_params = engine_params or {}
+    results = []
+    for engine in engines:
+        # A fresh process per engine keeps the peak memory of one engine out of the next
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            try:
+                result = executor.submit(_run_engine, points, engine, engine_params.get(engine, {})).result()
+            except Exception as e:
+                logger.error(f"Engine {engine} failed: {str(e)}")
+                result = {'engine': engine, 'error': str(e)}
+        logger.info(f"Benchmark result: {result}")
+        results.append(result)
+    return results
+
+
+def sample_points(n_points=200000, noise=0.003, seed=0):
+    """Points sampled from a unit sphere with radial noise."""
+    rng = np.random.default_rng(seed)
+    points = rng.normal(size=(n_points, 3))
+    points /= np.linalg.norm(points, axis=1)[:, None]
+    return points * (1 + noise * rng.normal(size=(n_points, 1)))
+
+
+def load_points(filename):
+    """Load the points of a .ply or .csv point cloud."""
+    if filename.endswith('.csv'):
+        points, _ = load_point_cloud_from_csv(filename)
+        return points
+    import open3d as o3d
+    return np.asarray(o3d.io.read_point_cloud(filename).points)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('point_cloud', nargs='?', help='.ply or .csv point cloud (default: sampled sphere)')
+    parser.add_argument('engines', nargs='*', help='engines to compare (default: all)')
+    parser.add_argument('--points', type=int, default=200000, help='size of the sampled sphere')
+    args = parser.parse_args()
+    if args.point_cloud in PointCloudToMesh.ENGINES:
+        args.engines, args.point_cloud = [args.point_cloud] + args.engines, None
+    points = load_points(args.point_cloud) if args.point_cloud else sample_points(args.points)
+    json.dump(benchmark_engines(points, args.engines), sys.stdout, indent=2)
+    print()
@@ -1,5 +1,9 @@
+import io
+import json
+import struct
 import numpy as np
 from PIL import Image
+from vtkmodules.util.numpy_support import vtk_to_numpy
 import os
 import logging
 
@@ -17,6 +21,19 @@ class MeshToOBJConverter:
         logger (logging.Logger): Logger for the class.
     """
 
+    # Lines formatted per bulk write, bounds the temporary strings
+    WRITE_CHUNK_SIZE = 1 << 16
+
+    # glTF 2.0 binary container constants
+    GLB_MAGIC = 0x46546C67  # 'glTF'
+    GLB_JSON_CHUNK = 0x4E4F534A  # 'JSON'
+    GLB_BIN_CHUNK = 0x004E4942  # 'BIN\0'
+    GLTF_FLOAT = 5126
+    GLTF_UNSIGNED_BYTE = 5121
+    GLTF_UNSIGNED_INT = 5125
+    GLTF_ARRAY_BUFFER = 34962
+    GLTF_ELEMENT_ARRAY_BUFFER = 34963
+
     def __init__(self, mesh, texture_mapper):
         """
         Initialize the MeshToOBJConverter.
@@ -93,46 +110,264 @@ class MeshToOBJConverter:
     def convert_to_obj(self, output_filename):
         """
         Convert the mesh to OBJ format with corrected texture coordinates.
+
+        Vertex, texture coordinate and face blocks are formatted with numpy in
+        chunks of WRITE_CHUNK_SIZE lines and written in bulk. Numbers are written
+        as Python's repr of the float64 value, the same text as formatting each
+        value with an f-string.
         """
         if 'UV' not in self.mesh.point_data:
             raise ValueError("Mesh does not have texture coordinates. Apply UV mapping before converting to OBJ.")
 
         try:
-            vertices = self.mesh.points
-            faces = self.mesh.faces
+            vertices = np.asarray(self.mesh.points)
+            # Don't flip V coordinate here since TextureMapper already handles it
+            texture_coords = np.asarray(self.mesh.point_data['UV'])
 
             with open(output_filename, 'w') as f:
                 f.write("# OBJ file\n")
                 f.write(f"mtllib {os.path.basename(output_filename.rsplit('.', 1)[0] + '.mtl')}\n")
 
-                # Write vertices
-                for v in vertices:
-                    f.write(f"v {v[0]} {v[1]} {v[2]}\n")
-
-                # Write texture coordinates (corrected UV mapping)
-                texture_coords = self.mesh.point_data['UV']
-                for vt in texture_coords:
-                    # Don't flip V coordinate here since TextureMapper already handles it
-                    f.write(f"vt {vt[0]} {vt[1]}\n")
+                self._write_float_block(f, "v", vertices)
+                self._write_float_block(f, "vt", texture_coords)
 
                 f.write("g TexturedMesh\n")
                 f.write("usemtl material0\n")
 
-                # Write faces
-                face_index = 0
-                while face_index < len(faces):
-                    n_vertices = faces[face_index]
-                    face_vertex_indices = faces[face_index + 1:face_index + 1 + n_vertices]
-                    face_str = " ".join([f"{vi + 1}/{vi + 1}" for vi in face_vertex_indices])
-                    f.write(f"f {face_str}\n")
-                    face_index += n_vertices + 1
+                sizes, connectivity, offsets = self._face_arrays()
+                for start in range(0, len(sizes), self.WRITE_CHUNK_SIZE):
+                    f.write(self._format_faces(sizes[start:start + self.WRITE_CHUNK_SIZE],
+                                               offsets[start:start + self.WRITE_CHUNK_SIZE], connectivity))
 
             self.logger.info(f"OBJ file saved as {output_filename}")
         except Exception as e:
             self.logger.error(f"Error saving OBJ file: {str(e)}", exc_info=True)
             raise
 
-    def convert_and_save(self, obj_filename, texture_filename):
+    def _write_float_block(self, f, keyword, values):
+        """Write one 'keyword x y ...' line per row of values."""
+        template = keyword + " %r" * values.shape[1] + "\n"
+        for start in range(0, len(values), self.WRITE_CHUNK_SIZE):
+            chunk = np.asarray(values[start:start + self.WRITE_CHUNK_SIZE], dtype=np.float64)
+            f.write((template * len(chunk)) % tuple(chunk.ravel().tolist()))
+
+    @staticmethod
+    def _format_faces(sizes, offsets, connectivity):
+        """Format 'f v/vt ...' lines, grouping faces by vertex count so each group is one reshape."""
+        if np.all(sizes == sizes[0]):
+            indices = connectivity[offsets[:, None] + np.arange(sizes[0])] + 1
+            template = "f" + " %d/%d" * sizes[0] + "\n"
+            return (template * len(sizes)) % tuple(np.repeat(indices, 2, axis=1).ravel().tolist())
+        lines = np.empty(len(sizes), dtype=object)
+        for size in np.unique(sizes):
+            rows = np.nonzero(sizes == size)[0]
+            indices = connectivity[offsets[rows, None] + np.arange(size)] + 1
+            template = "f" + " %d/%d" * size
+            lines[rows] = [template % tuple(row) for row in np.repeat(indices, 2, axis=1).tolist()]
+        return "\n".join(lines.tolist()) + "\n"
+
+    @staticmethod
+    def _all_triangles(faces):
+        """Check a VTK face array for triangles only, in one strided pass."""
+        faces = np.asarray(faces)
+        return len(faces) % 4 == 0 and bool(np.all(faces[::4] == 3))
+
+    def _face_arrays(self):
+        """
+        Get the polygon sizes, connectivity and offsets of the mesh without scanning the face array.
+
+        Returns:
+            tuple: (sizes, connectivity, offsets) as numpy arrays.
+        """
+        faces = np.asarray(self.mesh.faces)
+        if self._all_triangles(faces):
+            # All triangles: the face array reshapes directly
+            n_faces = len(faces) // 4
+            return np.full(n_faces, 3), faces.reshape(-1, 4)[:, 1:].ravel(), np.arange(n_faces) * 3
+        polys = self.mesh.GetPolys()
+        offsets = vtk_to_numpy(polys.GetOffsetsArray()).astype(np.int64)
+        connectivity = vtk_to_numpy(polys.GetConnectivityArray()).astype(np.int64)
+        return np.diff(offsets), connectivity, offsets[:-1]
+
+    def convert_to_glb(self, glb_filename, texture_filename=None):
+        """
+        Convert the mesh to a binary glTF (GLB) file with the texture embedded.
+
+        The file holds one binary buffer with three views: the vertices as
+        interleaved float32 position + UV records, the triangles as uint32
+        indices, and the PNG texture. Polygons are triangulated. glTF puts the
+        UV origin at the top-left of the image, so V is flipped relative to OBJ.
+
+        Args:
+            glb_filename (str): The name of the output GLB file.
+            texture_filename (str, optional): A PNG texture already saved for this mesh;
+                                              generated with the TextureMapper if omitted.
+
+        Raises:
+            ValueError: If the mesh has no texture coordinates.
+        """
+        if 'UV' not in self.mesh.point_data:
+            raise ValueError("Mesh does not have texture coordinates. Apply UV mapping before converting to GLB.")
+
+        try:
+            mesh = self.mesh if self._all_triangles(self.mesh.faces) else self.mesh.triangulate()
+            positions = np.asarray(mesh.points, dtype=np.float32)
+            texture_coords = np.asarray(mesh.point_data['UV'], dtype=np.float32)
+
+            vertices = np.empty((len(positions), 5), dtype=np.float32)
+            vertices[:, :3] = positions
+            vertices[:, 3] = texture_coords[:, 0]
+            vertices[:, 4] = 1 - texture_coords[:, 1]
+            indices = np.ascontiguousarray(np.asarray(mesh.faces).reshape(-1, 4)[:, 1:], dtype=np.uint32)
+            image_bytes = self._texture_png_bytes(texture_filename)
+
+            blobs = [vertices.tobytes(), indices.tobytes(), image_bytes]
+            buffer, offsets = self._pack_buffer(blobs)
+
+            gltf = {
+                'asset': {'version': '2.0', 'generator': 'DroMo MeshToOBJConverter'},
+                'scene': 0,
+                'scenes': [{'nodes': [0]}],
+                'nodes': [{'mesh': 0, 'name': 'TexturedMesh'}],
+                'meshes': [{'primitives': [{
+                    'attributes': {'POSITION': 0, 'TEXCOORD_0': 1},
+                    'indices': 2,
+                    'material': 0,
+                }]}],
+                'materials': [{
+                    'name': 'material0',
+                    'pbrMetallicRoughness': {'baseColorTexture': {'index': 0}, 'metallicFactor': 0.0, 'roughnessFactor': 1.0},
+                    'doubleSided': True,
+                }],
+                'textures': [{'source': 0, 'sampler': 0}],
+                'samplers': [{'magFilter': 9729, 'minFilter': 9987, 'wrapS': 33071, 'wrapT': 33071}],
+                'images': [{'bufferView': 2, 'mimeType': 'image/png'}],
+                'buffers': [{'byteLength': len(buffer)}],
+                'bufferViews': [
+                    {'buffer': 0, 'byteOffset': int(offsets[0]), 'byteLength': len(blobs[0]),
+                     'byteStride': vertices.itemsize * vertices.shape[1], 'target': self.GLTF_ARRAY_BUFFER},
+                    {'buffer': 0, 'byteOffset': int(offsets[1]), 'byteLength': len(blobs[1]),
+                     'target': self.GLTF_ELEMENT_ARRAY_BUFFER},
+                    {'buffer': 0, 'byteOffset': int(offsets[2]), 'byteLength': len(blobs[2])},
+                ],
+                'accessors': [
+                    {'bufferView': 0, 'byteOffset': 0, 'componentType': self.GLTF_FLOAT, 'count': len(vertices),
+                     'type': 'VEC3', 'min': positions.min(axis=0).tolist(), 'max': positions.max(axis=0).tolist()},
+                    {'bufferView': 0, 'byteOffset': 3 * vertices.itemsize, 'componentType': self.GLTF_FLOAT,
+                     'count': len(vertices), 'type': 'VEC2'},
+                    {'bufferView': 1, 'byteOffset': 0, 'componentType': self.GLTF_UNSIGNED_INT,
+                     'count': int(indices.size), 'type': 'SCALAR'},
+                ],
+            }
+            self._write_glb(glb_filename, gltf, buffer)
+            self.logger.info(f"GLB file saved as {glb_filename}")
+        except Exception as e:
+            self.logger.error(f"Error saving GLB file: {str(e)}", exc_info=True)
+            raise
+
+    def convert_to_vertex_color_glb(self, glb_filename):
+        """
+        Convert the mesh to a binary glTF (GLB) file colored per vertex.
+
+        Used for fast previews, which skip UV mapping and texture baking: the
+        'RGB' point data is stored as normalized uint8 COLOR_0 values, padded to
+        RGBA to keep each color 4-byte aligned.
+
+        Args:
+            glb_filename (str): The name of the output GLB file.
+
+        Raises:
+            ValueError: If the mesh has no vertex colors.
+        """
+        if 'RGB' not in self.mesh.point_data:
+            raise ValueError("Mesh does not have vertex colors. Map colors to the mesh before converting to GLB.")
+
+        try:
+            mesh = self.mesh if self._all_triangles(self.mesh.faces) else self.mesh.triangulate()
+            positions = np.ascontiguousarray(mesh.points, dtype=np.float32)
+            rgb = np.asarray(mesh.point_data['RGB'])
+            if rgb.dtype != np.uint8:
+                rgb = np.clip(np.rint(rgb * 255 if rgb.max(initial=0) <= 1 else rgb), 0, 255).astype(np.uint8)
+            colors = np.full((len(positions), 4), 255, dtype=np.uint8)
+            colors[:, :3] = rgb[:, :3]
+            indices = np.ascontiguousarray(np.asarray(mesh.faces).reshape(-1, 4)[:, 1:], dtype=np.uint32)
+
+            blobs = [positions.tobytes(), colors.tobytes(), indices.tobytes()]
+            buffer, offsets = self._pack_buffer(blobs)
+
+            gltf = {
+                'asset': {'version': '2.0', 'generator': 'DroMo MeshToOBJConverter'},
+                'scene': 0,
+                'scenes': [{'nodes': [0]}],
+                'nodes': [{'mesh': 0, 'name': 'VertexColorMesh'}],
+                'meshes': [{'primitives': [{
+                    'attributes': {'POSITION': 0, 'COLOR_0': 1},
+                    'indices': 2,
+                    'material': 0,
+                }]}],
+                'materials': [{
+                    'name': 'material0',
+                    'pbrMetallicRoughness': {'metallicFactor': 0.0, 'roughnessFactor': 1.0},
+                    'doubleSided': True,
+                }],
+                'buffers': [{'byteLength': len(buffer)}],
+                'bufferViews': [
+                    {'buffer': 0, 'byteOffset': int(offsets[0]), 'byteLength': len(blobs[0]),
+                     'target': self.GLTF_ARRAY_BUFFER},
+                    {'buffer': 0, 'byteOffset': int(offsets[1]), 'byteLength': len(blobs[1]),
+                     'target': self.GLTF_ARRAY_BUFFER},
+                    {'buffer': 0, 'byteOffset': int(offsets[2]), 'byteLength': len(blobs[2]),
+                     'target': self.GLTF_ELEMENT_ARRAY_BUFFER},
+                ],
+                'accessors': [
+                    {'bufferView': 0, 'byteOffset': 0, 'componentType': self.GLTF_FLOAT, 'count': len(positions),
+                     'type': 'VEC3', 'min': positions.min(axis=0).tolist(), 'max': positions.max(axis=0).tolist()},
+                    {'bufferView': 1, 'byteOffset': 0, 'componentType': self.GLTF_UNSIGNED_BYTE, 'normalized': True,
+                     'count': len(colors), 'type': 'VEC4'},
+                    {'bufferView': 2, 'byteOffset': 0, 'componentType': self.GLTF_UNSIGNED_INT,
+                     'count': int(indices.size), 'type': 'SCALAR'},
+                ],
+            }
+            self._write_glb(glb_filename, gltf, buffer)
+            self.logger.info(f"GLB file saved as {glb_filename}")
+        except Exception as e:
+            self.logger.error(f"Error saving GLB file: {str(e)}", exc_info=True)
+            raise
+
+    def _pack_buffer(self, blobs):
+        """Concatenate blobs into one 4-byte aligned binary buffer; returns the buffer and blob offsets."""
+        offsets = np.concatenate([[0], np.cumsum([self._padded_length(len(blob)) for blob in blobs])])
+        buffer = b''.join(blob.ljust(self._padded_length(len(blob)), b'\0') for blob in blobs)
+        return buffer, offsets
+
+    def _write_glb(self, glb_filename, gltf, buffer):
+        """Write the glTF JSON and its binary buffer as a GLB container."""
+        json_chunk = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+        json_chunk = json_chunk.ljust(self._padded_length(len(json_chunk)), b' ')
+
+        with open(glb_filename, 'wb') as f:
+            f.write(struct.pack('<III', self.GLB_MAGIC, 2, 12 + 8 + len(json_chunk) + 8 + len(buffer)))
+            f.write(struct.pack('<II', len(json_chunk), self.GLB_JSON_CHUNK))
+            f.write(json_chunk)
+            f.write(struct.pack('<II', len(buffer), self.GLB_BIN_CHUNK))
+            f.write(buffer)
+
+    def _texture_png_bytes(self, texture_filename=None):
+        """PNG bytes of the saved texture image, or of a freshly generated one."""
+        if texture_filename and os.path.exists(texture_filename):
+            with open(texture_filename, 'rb') as f:
+                return f.read()
+        texture_image = self.texture_mapper.generate_texture_image()
+        stream = io.BytesIO()
+        Image.fromarray((texture_image * 255).astype(np.uint8)).save(stream, format='PNG')
+        return stream.getvalue()
+
+    @staticmethod
+    def _padded_length(length):
+        """Round a chunk length up to the 4-byte alignment GLB requires."""
+        return (length + 3) & ~3
+
+    def convert_and_save(self, obj_filename, texture_filename, glb_filename=None):
         """
         Convert the mesh to OBJ format and save all associated files.
 
@@ -141,6 +376,7 @@ class MeshToOBJConverter:
         1. Converting the mesh to OBJ format and saving it
         2. Generating and saving the texture image
         3. Creating and saving the Material Template Library (MTL) file
+        4. Optionally packing the mesh and texture into a single GLB file
 
         The method ensures that all necessary files (OBJ, MTL, and texture image)
         are created and properly referenced to represent a complete textured 3D model.
@@ -150,6 +386,7 @@ class MeshToOBJConverter:
                                 the full path if you want to save it in a specific directory.
             texture_filename (str): The name of the output texture image file. This should
                                     include the full path if you want to save it in a specific directory.
+            glb_filename (str, optional): The name of the output GLB file; no GLB is written if omitted.
 
         Raises:
             Exception: If there's an error during any part of the conversion process.
@@ -160,6 +397,8 @@ class MeshToOBJConverter:
             self.convert_to_obj(obj_filename)
             self.save_texture_image(texture_filename)
             self.create_mtl_file(obj_filename, texture_filename)
+            if glb_filename:
+                self.convert_to_glb(glb_filename, texture_filename)
             self.logger.info(f"OBJ file saved as {obj_filename}")
             self.logger.info(f"Texture image saved as {texture_filename}")
         except Exception as e:
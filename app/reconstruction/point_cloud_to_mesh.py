@@ -1,52 +1,197 @@
 import numpy as np
+import open3d as o3d
 import pyvista as pv
 pv.OFF_SCREEN = True  # Disable the need for graphical output
 import logging
+import multiprocessing
 import os
-from scipy.spatial import cKDTree
+import time
+from concurrent.futures import ProcessPoolExecutor
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from app.reconstruction.reconstruction_context import ReconstructionContext
+from app.services.thread_budget import ThreadBudget
 
 from scipy.sparse import csr_matrix
 from scipy.sparse.csgraph import maximum_flow
-from scipy.ndimage import laplace
+from scipy.ndimage import laplace, maximum_filter
 
 class PointCloudToMesh:
     """
     A class to convert point cloud data to a 3D mesh.
 
     This class provides functionality to load point cloud data,
-    generate a 3D mesh using Delaunay triangulation, and apply various smoothing
-    and refinement techniques to improve the mesh quality.
+    generate a 3D mesh with one of the registered surface reconstruction
+    engines, and apply various smoothing and refinement techniques to
+    improve the mesh quality.
+
+    Engines are registered in ``ENGINES`` by name. With ``engine='auto'`` the
+    engine is picked from ``SHAPE_ENGINES`` by the shape class of the cloud.
 
     Attributes:
         point_cloud (np.ndarray): The loaded point cloud data.
+        normals (np.ndarray): Normals of the points, estimated by the Open3D engines if None.
         mesh (pv.PolyData): The generated 3D mesh.
+        engine (str): The engine that generated the mesh.
+        diagnostics (str): 'debug' computes the mesh quality statistics, 'production' skips them.
+        mesh_quality (dict): Cell quality statistics of the last mesh, None if not computed.
         logger (logging.Logger): Logger for the class.
     """
 
-    def __init__(self):
-        """Initialize the PointCloudToMesh object."""
+    # Engine name -> method name; extend with register_engine()
+    ENGINES = {
+        'delaunay': '_mesh_delaunay',
+        'poisson': '_mesh_poisson',
+        'ball_pivoting': '_mesh_ball_pivoting',
+        'tsdf': '_mesh_tsdf',
+    }
+    # Default engine per shape class, used when the engine is 'auto'
+    SHAPE_ENGINES = {
+        'cube_like': 'delaunay',
+        'flat': 'delaunay',
+        'elongated': 'delaunay',
+    }
+    # Default tile overlap of generate_mesh_tiled, in mean point spacings
+    TILE_OVERLAP_SPACINGS = 20
+    # Candidate selection ranks surfaces whose proxy points lie farther than this many
+    # mean point spacings from them, on average, after every faithful surface
+    CANDIDATE_MAX_DISTANCE_SPACINGS = 1.0
+    # Diagnostics levels; computations done only to be logged run in 'debug' only
+    DIAGNOSTICS_LEVELS = ('production', 'debug')
+
+    def __init__(self, diagnostics='production'):
+        """
+        Initialize the PointCloudToMesh object.
+
+        Args:
+            diagnostics (str): Diagnostics level, 'production' or 'debug'.
+
+        Raises:
+            ValueError: If the diagnostics level is unknown.
+        """
+        if diagnostics not in self.DIAGNOSTICS_LEVELS:
+            raise ValueError(f"Unknown diagnostics level '{diagnostics}', expected one of {self.DIAGNOSTICS_LEVELS}")
         self.point_cloud = None
+        self.normals = None
+        # Spatial index of the current cloud, created on first use unless given to set_point_cloud
+        self.context = None
         self.mesh = None
+        self.engine = None
+        self.diagnostics = diagnostics
+        self.mesh_quality = None
+        # Open3D engines orient normals away from this point, the cloud's centroid if None
+        self.normal_origin = None
         self.logger = logging.getLogger(self.__class__.__name__)
 
-    def set_point_cloud(self, points):
+    @classmethod
+    def register_engine(cls, name, method_name):
+        """
+        Register a surface reconstruction engine.
+
+        Args:
+            name (str): Engine name used in requests.
+            method_name (str): Name of a method taking the engine parameters as
+                               keyword arguments and returning a pv.PolyData surface.
+        """
+        cls.ENGINES = {**cls.ENGINES, name: method_name}
+
+    def set_point_cloud(self, points, normals=None, context=None):
         """
         Set the point cloud data.
 
+        Arrays are kept as given, not copied; the reconstruction service passes
+        the float32 array shared by all stages, with the context of that array.
+
         Args:
             points (list or np.ndarray): Array of 3D point coordinates.
+            normals (np.ndarray, optional): Normals of the points, e.g. those stored by
+                                            preprocessing; their orientation does not matter.
+            context (ReconstructionContext, optional): Spatial index context of the same points,
+                                                       to share with other stages.
         """
         if len(points) == 0:
             raise ValueError("Point cloud cannot be empty")
         # Convert to numpy array if it's not already
-        if not isinstance(points, np.ndarray):
-            points = np.array(points)
+        points = np.asarray(points)
         if points.ndim != 2 or points.shape[1] != 3:
             raise ValueError("Point cloud must be a 2D array with 3 columns (x, y, z)")
+        if normals is not None:
+            normals = np.asarray(normals)
+            if normals.shape != points.shape:
+                raise ValueError("Normals must be an array with one row per point")
+        if context is not None and context.points.shape != points.shape:
+            raise ValueError("The reconstruction context must be of the same points")
         self.point_cloud = points
+        self.normals = normals
+        self.context = context
         self.logger.info(f"Point cloud set with {len(points)} points")
 
-    def calculate_optimal_alpha(self, percentile=95):
+    def simplify(self, point_budget, tolerance=0.05, max_iterations=16):
+        """
+        Reduce the point cloud to about ``point_budget`` points before meshing.
+
+        Density-adaptive voxel subsampling: the voxel size is searched so that the
+        number of occupied voxels matches the budget, and each voxel keeps the
+        original point closest to its centroid. Dense regions lose the most
+        points, sparse regions keep theirs, and every kept point lies on the scan.
+
+        Args:
+            point_budget (int): Target number of points; clouds within budget are left unchanged.
+            tolerance (float): Accepted relative deviation from the budget.
+            max_iterations (int): Maximum voxel size search steps.
+
+        Returns:
+            np.ndarray: The simplified point cloud.
+        """
+        if self.point_cloud is None:
+            raise ValueError("No point cloud data loaded. Use set_point_cloud() first.")
+        n_points = len(self.point_cloud)
+        if not point_budget or n_points <= point_budget:
+            return self.point_cloud
+
+        points = self.point_cloud
+        origin = points.min(axis=0)
+        extent = max(float(np.max(np.ptp(points, axis=0))), 1e-12)
+        # Occupied voxels shrink as the voxel grows, so bisect the size in log space
+        low, high = extent / np.sqrt(n_points) / 64, extent
+        for _ in range(max_iterations):
+            voxel_size = np.sqrt(low * high)
+            voxels = np.floor((points - origin) / voxel_size).astype(np.int64)
+            # One scalar key per voxel is much cheaper to unique than rows
+            dims = voxels.max(axis=0) + 1
+            keys = (voxels[:, 0] * dims[1] + voxels[:, 1]) * dims[2] + voxels[:, 2]
+            _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+            if abs(len(counts) - point_budget) <= tolerance * point_budget:
+                break
+            if len(counts) > point_budget:
+                low = voxel_size
+            else:
+                high = voxel_size
+        inverse = inverse.ravel()
+
+        centroids = np.zeros((len(counts), 3))
+        np.add.at(centroids, inverse, points)
+        centroids /= counts[:, None]
+        distances = np.linalg.norm(points - centroids[inverse], axis=1)
+        # Nearest point to its voxel centroid: sort by (voxel, distance) and keep the first of each voxel
+        order = np.lexsort((distances, inverse))
+        keep = order[np.r_[True, np.diff(inverse[order]) != 0]]
+
+        keep = np.sort(keep)
+        self.point_cloud = self.point_cloud[keep]
+        self.context = None
+        if self.normals is not None:
+            self.normals = self.normals[keep]
+        self.logger.info(f"Simplified point cloud from {n_points} to {len(self.point_cloud)} points "
+                         f"(budget {point_budget}, voxel size {voxel_size:.6f})")
+        return self.point_cloud
+
+    def reconstruction_context(self):
+        """Spatial index context of the current point cloud, created on first use."""
+        if self.context is None:
+            self.context = ReconstructionContext(self.point_cloud)
+        return self.context
+
+    def calculate_optimal_alpha(self, percentile=95, scaling_factor=None):
         """
         Calculate an optimal alpha value for mesh generation based on point cloud characteristics.
 
@@ -57,6 +202,8 @@ class PointCloudToMesh:
         Args:
             percentile (int): Percentile of nearest neighbor distances to use for alpha calculation.
                               Default is 95, which works well for most point clouds.
+            scaling_factor (float, optional): Multiple of that distance used as alpha; picked
+                                              by is_cube_like() if None.
 
         Returns:
             float: The calculated optimal alpha value.
@@ -66,22 +213,19 @@ class PointCloudToMesh:
 
         self.logger.info("Calculating optimal alpha value...")
 
-        # Build a KD-tree for efficient nearest neighbor search
-        tree = cKDTree(self.point_cloud)
-
-        # Find the distance to the nearest neighbor for each point
-        distances, _ = tree.query(self.point_cloud, k=2)  # k=2 because the nearest neighbor of a point is itself
-        nearest_neighbor_distances = distances[:, 1]  # Take the second-nearest neighbor (first is the point itself)
+        # Distance to the nearest neighbor for each point, from the cloud's shared KD-tree
+        nearest_neighbor_distances = self.reconstruction_context().nearest_neighbor_distances()
 
         # Calculate the alpha value based on the specified percentile of nearest neighbor distances
         alpha = np.percentile(nearest_neighbor_distances, percentile)
 
         # Apply a scaling factor to fine-tune the alpha value
         # This factor can be adjusted based on empirical results
-        if self.is_cube_like():
-            scaling_factor = 25.2
-        else:
-            scaling_factor = 2.2
+        if scaling_factor is None:
+            if self.is_cube_like():
+                scaling_factor = 25.2
+            else:
+                scaling_factor = 2.2
         # alpha *= scaling_factor
         # scaling_factor = 2.0
         alpha *= scaling_factor
@@ -98,16 +242,54 @@ class PointCloudToMesh:
         aspect_ratios = dimensions / np.max(dimensions)
         return np.all(aspect_ratios > 0.8)  # Consider it cube-like if all dimensions are similar
 
-    def generate_mesh(self, alpha=None):
+    def shape_class(self):
+        """
+        Classify the point cloud by the aspect ratios of its bounding box.
+
+        Returns:
+            str: 'cube_like', 'flat' or 'elongated'.
+        """
+        dimensions = np.ptp(self.point_cloud, axis=0)
+        aspect_ratios = np.sort(dimensions / np.max(dimensions))
+        if np.all(aspect_ratios > 0.8):
+            return 'cube_like'
+        if aspect_ratios[0] < 0.2:
+            return 'flat'
+        return 'elongated'
+
+    def resolve_engine(self, engine='auto', shape_engines=None):
         """
-        Generate a 3D mesh from the loaded point cloud data using Delaunay triangulation.
+        Resolve an engine name, picking one by shape class for 'auto'.
+
+        Args:
+            engine (str): Engine name or 'auto'.
+            shape_engines (dict, optional): Shape class -> engine, overriding SHAPE_ENGINES.
+
+        Returns:
+            str: A registered engine name.
+
+        Raises:
+            ValueError: If the engine is not registered.
+        """
+        if engine in (None, 'auto'):
+            engine = {**self.SHAPE_ENGINES, **(shape_engines or {})}[self.shape_class()]
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown reconstruction engine: {engine}. Available: {', '.join(self.ENGINES)}")
+        return engine
+
+    def generate_mesh(self, alpha=None, engine='delaunay', shape_engines=None, **engine_params):
+        """
+        Generate a 3D mesh from the loaded point cloud data.
 
         Args:
             alpha (float, optional): The alpha value for the Delaunay triangulation algorithm.
                                      If None, calculates the optimal alpha value.
+            engine (str): Registered engine name, or 'auto' to pick one by shape class.
+            shape_engines (dict, optional): Shape class -> engine overrides for 'auto'.
+            **engine_params: Engine specific parameters (e.g. depth for 'poisson').
 
         Raises:
-            ValueError: If no point cloud data has been loaded.
+            ValueError: If no point cloud data has been loaded or the engine is unknown.
         """
         if self.point_cloud is None:
             self.logger.error("No point cloud data loaded")
@@ -115,14 +297,13 @@ class PointCloudToMesh:
         if len(self.point_cloud) < 4:
             raise ValueError("At least 4 points are required to generate a 3D mesh")
 
-        if alpha is None:
-            alpha = self.calculate_optimal_alpha()
+        self.engine = self.resolve_engine(engine, shape_engines)
+        if self.engine == 'delaunay':
+            engine_params['alpha'] = alpha
 
-        self.logger.info(f"Generating mesh with alpha={alpha}")
+        self.logger.info(f"Generating mesh with engine={self.engine} {engine_params}")
         try:
-            poly_data = pv.PolyData(self.point_cloud)
-            self.mesh = poly_data.delaunay_3d(alpha=alpha)
-            self.mesh = self.mesh.extract_surface()
+            self.mesh = getattr(self, self.ENGINES[self.engine])(**engine_params)
 
             # Remove degenerate triangles
             self.mesh.clean(tolerance=1e-6)
@@ -130,13 +311,453 @@ class PointCloudToMesh:
             n_cells = self.mesh.n_cells
             self.logger.info(f"Mesh generated with {self.mesh.n_points} points and {n_cells} cells")
 
-            # Compute and log mesh quality
+            # Compute and log mesh quality in debug mode
             self.log_mesh_quality()
             return self.mesh
         except Exception as e:
             self.logger.error(f"Error generating mesh: {str(e)}")
             raise
 
+    def generate_mesh_tiled(self, tile_size, workers=None, overlap=None, alpha=None, engine='delaunay',
+                            shape_engines=None, **engine_params):
+        """
+        Generate a mesh by meshing overlapping spatial tiles in parallel worker processes.
+
+        The two widest axes of the cloud are cut into tiles of ``tile_size``; every
+        tile is meshed together with the points within ``overlap`` around it, so
+        triangles near its border see their full neighborhood. Each tile keeps
+        the triangles whose centroid lies in its own area, and the tile meshes
+        are stitched by merging their coincident vertices. Engines that keep the
+        input points as vertices ('delaunay', 'ball_pivoting') stitch seamlessly;
+        small gaps left between 'poisson' or 'tsdf' tiles are closed by MeshRefiner.
+
+        Args:
+            tile_size (float): Tile edge length in cloud units; clouds that fit in
+                               one tile are meshed by generate_mesh.
+            workers (int, optional): Worker processes, defaults to the job's ThreadBudget.
+            overlap (float, optional): Margin around every tile in cloud units, defaults
+                                       to TILE_OVERLAP_SPACINGS mean point spacings or twice
+                                       the Delaunay alpha, whichever is larger. A cloud whose
+                                       overlap exceeds ``tile_size`` is meshed whole.
+            alpha (float, optional): Delaunay alpha shared by all tiles, estimated on the
+                                     whole cloud if None.
+            engine (str): Registered engine name, or 'auto' to pick one by shape class.
+            shape_engines (dict, optional): Shape class -> engine overrides for 'auto'.
+            **engine_params: Engine specific parameters.
+
+        Returns:
+            pv.PolyData: The stitched mesh.
+        """
+        if self.point_cloud is None:
+            raise ValueError("No point cloud data loaded. Use set_point_cloud() first.")
+        points = self.point_cloud
+        bounds_min, extent = points.min(axis=0), np.ptp(points, axis=0)
+        # Tile the two widest axes; the third axis is kept whole inside every tile
+        tile_axes = np.argsort(extent)[::-1][:2]
+        tiles_per_axis = [max(1, int(np.ceil(extent[axis] / tile_size))) if tile_size else 1 for axis in tile_axes]
+        if tiles_per_axis == [1, 1]:
+            return self.generate_mesh(alpha=alpha, engine=engine, shape_engines=shape_engines, **engine_params)
+
+        self.engine = self.resolve_engine(engine, shape_engines)
+        if self.engine == 'delaunay':
+            # Tiles share the alpha of the whole cloud so their triangles agree in the overlaps
+            alpha_scale = engine_params.pop('alpha_scale', None)
+            engine_params['alpha'] = alpha if alpha is not None else self.calculate_optimal_alpha(
+                scaling_factor=alpha_scale)
+        if overlap is None:
+            spacing = np.mean(self.reconstruction_context().nearest_neighbor_distances())
+            overlap = max(self.TILE_OVERLAP_SPACINGS * spacing, 2 * engine_params.get('alpha', 0))
+        if overlap > tile_size:
+            # Every tile would then mesh most of its neighbors too, which costs more than one whole mesh
+            self.logger.warning(f"Tile overlap {overlap:.6f} exceeds the tile size {tile_size}, meshing the cloud whole")
+            return self.generate_mesh(engine=self.engine, **engine_params)
+
+        planar = points[:, tile_axes]
+        tile_extent = np.maximum(extent[tile_axes] / tiles_per_axis, np.finfo(np.float32).tiny)
+        grid = (tile_axes, bounds_min[tile_axes], tile_extent, np.array(tiles_per_axis))
+        cell = _tile_cells(planar, grid)
+        tiles = []
+        for i in range(tiles_per_axis[0]):
+            for j in range(tiles_per_axis[1]):
+                core = (cell[:, 0] == i) & (cell[:, 1] == j)
+                if not core.any():
+                    continue
+                core_min, core_max = planar[core].min(axis=0), planar[core].max(axis=0)
+                members = np.all((planar >= core_min - overlap) & (planar <= core_max + overlap), axis=1)
+                tiles.append(((i, j), np.nonzero(members)[0]))
+
+        workers = max(1, min(workers or ThreadBudget.threads(), len(tiles)))
+        self.logger.info(f"Meshing {len(tiles)} tiles of size {tile_size} (overlap {overlap:.6f}) "
+                         f"with engine={self.engine} on {workers} worker processes")
+        center = points.mean(axis=0)
+        jobs = [(points[members], None if self.normals is None else self.normals[members], cell_index, grid,
+                 self.engine, engine_params, center) for cell_index, members in tiles]
+        if workers == 1:
+            tile_meshes = [_mesh_tile(*job) for job in jobs]
+        else:
+            with _worker_pool(workers) as executor:
+                tile_meshes = list(executor.map(_mesh_tile, *zip(*jobs)))
+
+        vertices, faces, offset = [], [], 0
+        for tile_vertices, tile_faces in tile_meshes:
+            vertices.append(tile_vertices)
+            faces.append(tile_faces + offset)
+            offset += len(tile_vertices)
+        self.mesh = self._stitch(np.concatenate(vertices), np.concatenate(faces))
+        self.logger.info(f"Stitched tiled mesh with {self.mesh.n_points} points and {self.mesh.n_cells} cells")
+        self.log_mesh_quality()
+        return self.mesh
+
+    @classmethod
+    def parse_candidates(cls, candidates):
+        """
+        Parse meshing candidates.
+
+        A candidate is an engine name; Delaunay candidates may add the scaling
+        factor of the estimated alpha, as in 'delaunay:2.2'.
+
+        Args:
+            candidates (str or list): Comma separated candidates, or a list of them.
+
+        Returns:
+            list: One dict per candidate with its 'engine' and engine parameters.
+
+        Raises:
+            ValueError: If an engine is unknown or an alpha scale is given to another engine.
+        """
+        if isinstance(candidates, str):
+            candidates = [candidate for candidate in candidates.split(',') if candidate.strip()]
+        parsed = []
+        for candidate in candidates or []:
+            if isinstance(candidate, dict):
+                parsed.append(dict(candidate))
+                continue
+            engine, _, alpha_scale = candidate.strip().partition(':')
+            if engine not in cls.ENGINES:
+                raise ValueError(f"Unknown reconstruction engine: {engine}. Available: {', '.join(cls.ENGINES)}")
+            if not alpha_scale:
+                parsed.append({'engine': engine})
+            elif engine == 'delaunay':
+                parsed.append({'engine': engine, 'alpha_scale': float(alpha_scale)})
+            else:
+                raise ValueError(f"Only the delaunay engine takes an alpha scale, got '{candidate}'")
+        return parsed
+
+    def select_candidate(self, candidates, proxy_points=20000, workers=None):
+        """
+        Pick the meshing candidate that gives the best surface on a downsampled proxy of the cloud.
+
+        The cloud is simplified to ``proxy_points`` points and every candidate
+        meshes the proxy in its own worker process. Candidates are ranked by
+        candidate_rank on the scores of score_mesh; the winner's parameters are
+        meant for meshing the full cloud, so alpha candidates are given as
+        scaling factors, which carry over to the denser cloud, not as distances.
+
+        Args:
+            candidates (str or list): Candidates accepted by parse_candidates.
+            proxy_points (int): Points kept for the proxy.
+            workers (int, optional): Worker processes, defaults to the job's ThreadBudget.
+
+        Returns:
+            tuple: (winning candidate dict, list of score dicts in candidate order).
+
+        Raises:
+            ValueError: If no candidate is given or none of them meshes the proxy.
+        """
+        if self.point_cloud is None:
+            raise ValueError("No point cloud data loaded. Use set_point_cloud() first.")
+        candidates = self.parse_candidates(candidates)
+        if not candidates:
+            raise ValueError("No meshing candidates given")
+
+        proxy = PointCloudToMesh(diagnostics='production')
+        proxy.set_point_cloud(self.point_cloud, self.normals)
+        proxy.simplify(proxy_points)
+        workers = max(1, min(workers or ThreadBudget.threads(), len(candidates)))
+        self.logger.info(f"Scoring {len(candidates)} meshing candidates on a proxy of {len(proxy.point_cloud)} points "
+                         f"with {workers} worker processes")
+        # The proxy is oriented around the full cloud's center so outward normals agree
+        normal_origin = self.point_cloud.mean(axis=0) if self.normal_origin is None else self.normal_origin
+        jobs = [(proxy.point_cloud, proxy.normals, candidate, normal_origin) for candidate in candidates]
+        if workers == 1:
+            scores = [_score_candidate(*job) for job in jobs]
+        else:
+            with _worker_pool(workers) as executor:
+                scores = list(executor.map(_score_candidate, *zip(*jobs)))
+
+        best = min(range(len(candidates)), key=lambda index: self.candidate_rank(scores[index]))
+        if 'error' in scores[best]:
+            raise ValueError(f"No meshing candidate produced a surface: {[score['error'] for score in scores]}")
+        self.logger.info(f"Selected meshing candidate {candidates[best]} from scores {scores}")
+        return candidates[best], scores
+
+    @classmethod
+    def candidate_rank(cls, score):
+        """
+        Sort key of a candidate score, lower is better.
+
+        Candidates that failed come last, then those whose surface strays from
+        the points (a too large alpha closes concavities with a tidy hull);
+        the rest are ordered by non-manifold edges, then holes, then cell quality.
+        """
+        if 'error' in score:
+            return (True, True, np.inf, np.inf, np.inf)
+        return (False, score['distance'] > cls.CANDIDATE_MAX_DISTANCE_SPACINGS,
+                score['non_manifold_edges'], score['holes'], -score['quality'])
+
+    @staticmethod
+    def score_mesh(mesh, points, context=None):
+        """
+        Score a surface meshed from a point cloud.
+
+        Args:
+            mesh (pv.PolyData): The surface.
+            points (np.ndarray): The points it was meshed from.
+            context (ReconstructionContext, optional): Spatial index context of the points.
+
+        Returns:
+            dict: 'faces'; 'non_manifold_edges', edges shared by more than two triangles;
+                  'holes', boundary loops; 'quality', mean radius ratio of the triangles
+                  (1 for equilateral ones); and 'distance', mean distance of the points to
+                  the surface in mean point spacings.
+
+        Raises:
+            ValueError: If the surface has no triangles.
+        """
+        # Rebuilt from points and faces, without the cell arrays the engines leave behind
+        triangles = pv.PolyData(mesh.points, mesh.faces).triangulate()
+        faces = np.asarray(triangles.faces).reshape(-1, 4)[:, 1:].astype(np.int64)
+        if len(faces) == 0:
+            raise ValueError("The surface has no triangles")
+        vertices = np.asarray(triangles.points, dtype=np.float64)
+
+        edges = np.sort(np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]]), axis=1)
+        _, edge_counts = np.unique(edges[:, 0] * len(vertices) + edges[:, 1], return_counts=True)
+
+        corners = vertices[faces]
+        a = np.linalg.norm(corners[:, 1] - corners[:, 2], axis=1)
+        b = np.linalg.norm(corners[:, 2] - corners[:, 0], axis=1)
+        c = np.linalg.norm(corners[:, 0] - corners[:, 1], axis=1)
+        # Radius ratio 2r/R of each triangle
+        products = a * b * c
+        quality = np.divide((b + c - a) * (c + a - b) * (a + b - c), products,
+                            out=np.zeros_like(products), where=products > 0)
+
+        if context is None:
+            context = ReconstructionContext(points)
+        spacing = max(float(np.mean(context.nearest_neighbor_distances())), 1e-12)
+        distances = pv.PolyData(np.asarray(points, dtype=np.float64)).compute_implicit_distance(triangles)
+        return {
+            'faces': int(len(faces)),
+            'non_manifold_edges': int(np.sum(edge_counts > 2)),
+            'holes': len(MeshRefiner.boundary_loops(faces)),
+            'quality': float(np.mean(np.clip(quality, 0, 1))),
+            'distance': float(np.mean(np.abs(distances['implicit_distance']))) / spacing,
+        }
+
+    @staticmethod
+    def _stitch(vertices, faces):
+        """
+        Merge the coincident vertices of concatenated tile meshes and drop the triangles this collapses.
+
+        Every triangle is owned by exactly one tile, so no triangle is repeated across tiles.
+        """
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        _, first, inverse = np.unique(vertices.view(np.dtype((np.void, vertices.itemsize * 3))).ravel(),
+                                      return_index=True, return_inverse=True)
+        faces = inverse.ravel()[faces]
+        faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])]
+        return pv.PolyData(vertices[first], np.hstack([np.full((len(faces), 1), 3), faces]).ravel())
+
+    def _mesh_delaunay(self, alpha=None, alpha_scale=None):
+        """
+        Alpha-limited 3D Delaunay tetrahedralization followed by surface extraction.
+
+        Args:
+            alpha (float, optional): Alpha value, estimated by calculate_optimal_alpha if None.
+            alpha_scale (float, optional): Scaling factor of the estimated alpha.
+        """
+        if alpha is None:
+            alpha = self.calculate_optimal_alpha(scaling_factor=alpha_scale)
+        poly_data = pv.PolyData(self.point_cloud)
+        mesh = poly_data.delaunay_3d(alpha=alpha)
+        return mesh.extract_surface()
+
+    def _to_open3d(self, max_nn=30):
+        """
+        Open3D cloud of the points with normals oriented away from the centroid.
+
+        Normals given to set_point_cloud are reused; otherwise they are estimated
+        from the ``max_nn`` nearest neighbors of every point.
+        """
+        pcd = o3d.geometry.PointCloud()
+        pcd.points = o3d.utility.Vector3dVector(np.asarray(self.point_cloud, dtype=np.float64))
+        if self.normals is not None:
+            pcd.normals = o3d.utility.Vector3dVector(np.asarray(self.normals, dtype=np.float64))
+        else:
+            pcd.estimate_normals(o3d.geometry.KDTreeSearchParamKNN(knn=max_nn))
+        # Scanned objects are closed around their centroid, so outward means away from it
+        origin = pcd.get_center() if self.normal_origin is None else np.asarray(self.normal_origin, dtype=np.float64)
+        pcd.orient_normals_towards_camera_location(origin)
+        pcd.normals = o3d.utility.Vector3dVector(-np.asarray(pcd.normals))
+        return pcd
+
+    @staticmethod
+    def _from_open3d(triangle_mesh):
+        """Convert an Open3D triangle mesh to PolyData."""
+        triangles = np.asarray(triangle_mesh.triangles)
+        faces = np.hstack([np.full((len(triangles), 1), 3), triangles]).ravel()
+        return pv.PolyData(np.asarray(triangle_mesh.vertices), faces)
+
+    def _mesh_poisson(self, depth=8, density_quantile=0.02):
+        """
+        Screened Poisson surface reconstruction.
+
+        Args:
+            depth (int): Octree depth; higher keeps more detail and costs more.
+            density_quantile (float): Vertices supported by fewer points than this
+                                      quantile of the density are trimmed.
+        """
+        pcd = self._to_open3d()
+        triangle_mesh, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(pcd, depth=int(depth))
+        densities = np.asarray(densities)
+        if density_quantile and len(densities):
+            triangle_mesh.remove_vertices_by_mask(densities < np.quantile(densities, density_quantile))
+        return self._from_open3d(triangle_mesh)
+
+    def _mesh_ball_pivoting(self, radius_factors=(1.5, 3.0, 6.0)):
+        """
+        Ball-pivoting surface reconstruction.
+
+        Args:
+            radius_factors (tuple): Ball radii as multiples of the mean nearest neighbor distance.
+        """
+        pcd = self._to_open3d()
+        spacing = np.mean(self.reconstruction_context().nearest_neighbor_distances())
+        radii = o3d.utility.DoubleVector([spacing * factor for factor in radius_factors])
+        triangle_mesh = o3d.geometry.TriangleMesh.create_from_point_cloud_ball_pivoting(pcd, radii)
+        return self._from_open3d(triangle_mesh)
+
+    def _mesh_tsdf(self, voxel_size=None, truncation=3.0, block_size=32, k=4):
+        """
+        Truncated signed-distance grid meshed by blockwise marching cubes.
+
+        The signed distance of a grid corner is its distance to the tangent planes
+        of its ``k`` nearest points, weighted by inverse distance; corners farther
+        than the truncation band from every point stay unobserved, and cells with
+        an unobserved corner get no triangles. The grid is sparse at block level:
+        only blocks of ``block_size``^3 voxels with points in or near them are
+        evaluated, one at a time, so the cost grows with the occupied volume and
+        memory is bounded by the block size. Blocks share their boundary corners,
+        so their surfaces are stitched by merging coincident vertices.
+
+        Args:
+            voxel_size (float, optional): Grid spacing, defaults to twice the mean point spacing.
+            truncation (float): Half-width of the band around the points, in voxels.
+            block_size (int): Block edge length in voxels.
+            k (int): Nearest points blended per corner.
+
+        Raises:
+            ValueError: If the grid has no surface crossing.
+        """
+        context = self.reconstruction_context()
+        if voxel_size is None:
+            voxel_size = 2 * float(np.mean(context.nearest_neighbor_distances()))
+        points = context.tree().data
+        normals = np.asarray(self._to_open3d().normals)
+        band = truncation * voxel_size
+        block_size = int(block_size)
+        origin = points.min(axis=0) - band
+
+        # Blocks holding points, plus the neighbors of those whose band crosses a block face
+        # One scalar key per voxel is much cheaper to unique than rows
+        voxels = np.floor((points - origin) / voxel_size).astype(np.int64)
+        dims = voxels.max(axis=0) + 1
+        voxels = np.stack(np.unravel_index(np.unique(np.ravel_multi_index(voxels.T, dims)), dims), axis=1)
+        reach = int(np.ceil(truncation)) + 1
+        position = voxels % block_size
+        step = np.where(position < reach, -1, np.where(position >= block_size - reach, 1, 0))
+        # Block coordinates are shifted by one so that the neighbors of every block have a key
+        block_dims = dims // block_size + 4
+        blocks = np.unique(np.concatenate([
+            np.ravel_multi_index((voxels // block_size + step * np.array(mask) + 1).T, block_dims)
+            for mask in np.ndindex(2, 2, 2)]))
+        blocks = np.stack(np.unravel_index(blocks, block_dims), axis=1) - 1
+        blocks = blocks[np.all(blocks >= 0, axis=1)]
+
+        # Occupied voxels grouped by block, to find the corners of a block within reach of a point
+        voxel_blocks = np.ravel_multi_index((voxels // block_size + 1).T, block_dims)
+        order = np.argsort(voxel_blocks)
+        voxels, voxel_blocks = voxels[order], voxel_blocks[order]
+        block_keys, starts = np.unique(voxel_blocks, return_index=True)
+        ranges = dict(zip(block_keys.tolist(), zip(starts, np.r_[starts[1:], len(voxels)])))
+
+        offsets = np.arange(block_size + 1)
+        local = np.stack(np.meshgrid(offsets, offsets, offsets, indexing='ij'), axis=-1).reshape(-1, 3)
+        padded = block_size + 1 + 2 * reach
+        neighbors = np.array(list(np.ndindex(3, 3, 3))) - 1
+        vertices, faces, offset = [], [], 0
+        for block in blocks:
+            neighbor_keys = np.ravel_multi_index((block + neighbors + 1).T, block_dims).tolist()
+            near = [ranges[key] for key in neighbor_keys if key in ranges]
+            nearby = np.concatenate([voxels[i:j] for i, j in near]) - (block * block_size - reach)
+            nearby = nearby[np.all((nearby >= 0) & (nearby < padded), axis=1)]
+            occupied = np.zeros((padded,) * 3, dtype=bool)
+            occupied[nearby[:, 0], nearby[:, 1], nearby[:, 2]] = True
+            candidates = maximum_filter(occupied, size=2 * reach + 1)[reach:-reach, reach:-reach, reach:-reach].ravel()
+            if not candidates.any():
+                continue
+
+            block_origin = origin + block * block_size * voxel_size
+            corner_index = np.nonzero(candidates)[0]
+            corners = block_origin + local[corner_index] * voxel_size
+            distances, indices = context.query(corners, k=k, distance_upper_bound=band)
+            distances, indices = distances.reshape(-1, k), indices.reshape(-1, k)
+            hit = np.isfinite(distances[:, 0])
+            if not hit.any():
+                continue
+            corner_index, corners, distances, indices = corner_index[hit], corners[hit], distances[hit], indices[hit]
+            found = np.isfinite(distances)
+            indices = np.where(found, indices, 0)
+            weights = np.where(found, 1 / np.maximum(distances, 1e-12 * voxel_size), 0)
+            plane_distances = np.einsum('ckd,ckd->ck', corners[:, None, :] - points[indices], normals[indices])
+            sdf = np.full(len(local), band)
+            sdf[corner_index] = np.clip((weights * plane_distances).sum(axis=1) / weights.sum(axis=1), -band, band)
+            observed = np.zeros(len(local), dtype=bool)
+            observed[corner_index] = True
+
+            # A cell is meshed only if all its 8 corners are observed
+            observed = observed.reshape((block_size + 1,) * 3)
+            valid = np.ones((block_size,) * 3, dtype=bool)
+            for di, dj, dk in np.ndindex(2, 2, 2):
+                valid &= observed[di:di + block_size, dj:dj + block_size, dk:dk + block_size]
+            if not valid.any():
+                continue
+
+            image = vtkImageData()
+            image.SetDimensions(block_size + 1, block_size + 1, block_size + 1)
+            image.SetSpacing(voxel_size, voxel_size, voxel_size)
+            image.SetOrigin(*block_origin)
+            grid = pv.wrap(image)
+            # VTK orders grid points with x varying fastest
+            grid.point_data['sdf'] = sdf.reshape((block_size + 1,) * 3).ravel(order='F')
+            surface = grid.contour([0.0], scalars='sdf')
+            if surface.n_cells == 0:
+                continue
+            block_vertices = np.asarray(surface.points)
+            block_faces = np.asarray(surface.faces).reshape(-1, 4)[:, 1:]
+            cell = np.clip(((block_vertices[block_faces].mean(axis=1) - block_origin) // voxel_size).astype(np.int64),
+                           0, block_size - 1)
+            used, block_faces = np.unique(block_faces[valid[cell[:, 0], cell[:, 1], cell[:, 2]]], return_inverse=True)
+            vertices.append(block_vertices[used])
+            faces.append(block_faces.reshape(-1, 3) + offset)
+            offset += len(used)
+
+        if offset == 0:
+            raise ValueError("The signed-distance grid has no surface; increase voxel_size or truncation")
+        self.logger.info(f"TSDF meshed {len(blocks)} blocks of {block_size}^3 voxels (voxel size {voxel_size:.6f})")
+        return self._stitch(np.concatenate(vertices), np.concatenate(faces))
+
     def log_mesh_quality(self):
         """
         Compute and log the quality metrics of the generated mesh.
@@ -149,25 +770,37 @@ class PointCloudToMesh:
         The quality metric used is based on the ratio of the inscribed sphere radius
         to the circumscribed sphere radius for each cell, scaled to [0, 1].
 
-        If the mesh has no cells, a warning is logged instead.
+        The metrics are only computed with the 'debug' diagnostics level; with
+        'production' the pass over every cell is skipped. If the mesh has no
+        cells, a warning is logged instead.
 
         Note:
             This method assumes that the mesh has already been generated and stored
             in the `self.mesh` attribute.
 
+        Returns:
+            dict: 'min', 'max' and 'avg' cell quality, also kept in `self.mesh_quality`;
+                  None if the metrics were not computed.
+
         Raises:
             AttributeError: If `self.mesh` is None or doesn't have the required methods.
         """
+        self.mesh_quality = None
+        if self.diagnostics != 'debug':
+            return None
         quality = self.mesh.compute_cell_quality()
         quality_array = quality['CellQuality']
         if len(quality_array) > 0:
-            min_quality = np.min(quality_array)
-            max_quality = np.max(quality_array)
-            avg_quality = np.mean(quality_array)
-            self.logger.info(
-                f"Mesh quality - Min: {min_quality:.4f}, Max: {max_quality:.4f}, Avg: {avg_quality:.4f}")
+            self.mesh_quality = {
+                'min': float(np.min(quality_array)),
+                'max': float(np.max(quality_array)),
+                'avg': float(np.mean(quality_array)),
+            }
+            self.logger.info(f"Mesh quality - Min: {self.mesh_quality['min']:.4f}, "
+                             f"Max: {self.mesh_quality['max']:.4f}, Avg: {self.mesh_quality['avg']:.4f}")
         else:
             self.logger.warning("Unable to compute mesh quality. No cells in the mesh.")
+        return self.mesh_quality
 
     def visualize_mesh(self):
         """
@@ -213,6 +846,74 @@ class PointCloudToMesh:
             raise
 
 
+def _worker_pool(workers):
+    """
+    Worker processes that split the calling job's ThreadBudget allotment between them.
+
+    Workers are spawned rather than forked: the parent runs Flask, task and
+    library threads whose locks a forked child could inherit held.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=ThreadBudget.limit_process_threads,
+                               initargs=(max(1, ThreadBudget.threads() // workers),))
+
+
+def _tile_cells(planar, grid):
+    """Tile cell (i, j) of points given by their coordinates on the two tiled axes."""
+    _, origin, tile_extent, tiles_per_axis = grid
+    return np.clip((planar - origin) // tile_extent, 0, tiles_per_axis - 1)
+
+
+def _mesh_tile(points, normals, cell_index, grid, engine, engine_params, normal_origin):
+    """
+    Mesh the points of one tile; runs inside a worker process of generate_mesh_tiled.
+
+    Only the triangles owned by the tile, those whose centroid lies in its cell,
+    are returned, with the vertices they use.
+
+    Returns:
+        tuple: (vertices, triangles) as Nx3 and Mx3 arrays; empty if the tile could not be meshed.
+    """
+    empty = np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.int64)
+    if len(points) < 4:
+        return empty
+    pc_to_mesh = PointCloudToMesh()
+    pc_to_mesh.set_point_cloud(points, normals)
+    pc_to_mesh.normal_origin = normal_origin
+    mesh = getattr(pc_to_mesh, PointCloudToMesh.ENGINES[engine])(**engine_params).triangulate()
+    vertices = np.asarray(mesh.points)
+    faces = np.asarray(mesh.faces).reshape(-1, 4)[:, 1:].astype(np.int64)
+    if len(faces) == 0:
+        return empty
+    owner = _tile_cells(vertices[faces].mean(axis=1)[:, grid[0]], grid)
+    faces = faces[(owner[:, 0] == cell_index[0]) & (owner[:, 1] == cell_index[1])]
+    used, faces = np.unique(faces, return_inverse=True)
+    return vertices[used], faces.reshape(-1, 3)
+
+
+def _score_candidate(points, normals, candidate, normal_origin):
+    """
+    Mesh a proxy cloud with one candidate and score the surface; runs inside a worker process of select_candidate.
+
+    Returns:
+        dict: The scores of PointCloudToMesh.score_mesh, or an 'error' if the candidate
+              failed, with the 'candidate' and the meshing 'seconds'.
+    """
+    start = time.perf_counter()
+    engine_params = {name: value for name, value in candidate.items() if name != 'engine'}
+    try:
+        pc_to_mesh = PointCloudToMesh(diagnostics='production')
+        pc_to_mesh.set_point_cloud(points, normals)
+        pc_to_mesh.normal_origin = normal_origin
+        mesh = pc_to_mesh.generate_mesh(engine=candidate['engine'], **engine_params)
+        score = PointCloudToMesh.score_mesh(mesh, points, pc_to_mesh.reconstruction_context())
+    except Exception as e:
+        score = {'error': str(e)}
+    score['candidate'] = dict(candidate)
+    score['seconds'] = round(time.perf_counter() - start, 4)
+    return score
+
+
 ##########################################
 # OPTIONAL FOR UPGRADE
 ###########################################
@@ -226,10 +927,30 @@ class PointCloudToMesh:
 #         return mesh  # Placeholder, replace with actual refinement logic
 
 class MeshRefiner:
+    """
+    Cleans, repairs, smooths and decimates a generated mesh.
+
+    ``refine`` runs the steps in order and records each one in ``steps``: its
+    time, the change in points and cells, and step details such as points
+    merged or holes filled. Steps the mesh state shows to be no-ops are
+    skipped and recorded with the reason.
+
+    Attributes:
+        mesh (pv.PolyData): The mesh being refined.
+        steps (list): One dict per step run or skipped by refine.
+        is_clean (bool): No duplicate or unused points since the last clean.
+        is_closed (bool): No open boundary left by the last fill_holes; None if unknown.
+    """
+
     def __init__(self, mesh):
         self.mesh = mesh
         self.logger = logging.getLogger(self.__class__.__name__)
         self.original_type = type(mesh)
+        self.steps = []
+        self.is_clean = False
+        self.is_closed = None
+        # Details of the last step, added to its entry in steps
+        self.step_details = {}
 
     def _to_polydata(self):
         if not isinstance(self.mesh, pv.PolyData):
@@ -267,7 +988,10 @@ class MeshRefiner:
         self.logger.info(f"Cleaning mesh with tolerance {tolerance}")
         self._to_polydata()
         try:
+            n_points = self.mesh.n_points
             self.mesh = self.mesh.clean(tolerance=tolerance)
+            self.is_clean = True
+            self.step_details = {'points_merged': n_points - self.mesh.n_points}
         except Exception as e:
             self.logger.warning(f"Error cleaning mesh: {str(e)}. Skipping this step.")
         return self.mesh
@@ -283,28 +1007,128 @@ class MeshRefiner:
             max_count = counts.max()
             keep_labels = unique_labels[counts >= max_count * min_ratio]
             mask = np.isin(labels, keep_labels)
-            self.mesh = self.mesh.extract_cells(mask)
+            self.step_details = {'components': len(unique_labels), 'cells_removed': int((~mask).sum())}
+            # Extracting cells copies the mesh into an UnstructuredGrid, only worth it if some are dropped
+            if not mask.all():
+                self.mesh = self.mesh.extract_cells(mask)
         except Exception as e:
             self.logger.warning(f"Error removing small components: {str(e)}. Skipping this step.")
         return self.mesh
 
-    def fill_holes(self, max_hole_size=None):
-        """Fill holes in the mesh surface."""
-        self.logger.info(f"Filling holes up to size {max_hole_size}")
+    def fill_holes(self, max_perimeter=None):
+        """
+        Fill holes in the mesh surface by capping its boundary loops.
+
+        Boundary loops are walked directly from the face connectivity and each
+        loop is closed with a fan around its centroid, oriented like the
+        surrounding faces. Cost is linear in the mesh size.
+
+        Args:
+            max_perimeter (float, optional): Maximum loop perimeter to fill; None fills every loop.
+        """
+        self.logger.info(f"Filling holes up to perimeter {max_perimeter}")
         self._to_polydata()
         try:
-            # First, try PyVista's built-in method
-            self.mesh = self.mesh.fill_holes(max_hole_size)
-
-            # Then, use a custom approach for any remaining holes
-            edges = self.mesh.extract_feature_edges(feature_angle=60, boundary_edges=True, non_manifold_edges=False)
-            if edges.n_cells > 0:
-                hole_fill = edges.triangulate()
-                self.mesh = self.mesh.boolean_union(hole_fill)
+            if not self.is_triangulated(self.mesh):
+                self.mesh = self.mesh.triangulate()
+            points = np.asarray(self.mesh.points)
+            faces = self.mesh.faces.reshape(-1, 4)[:, 1:]
+            new_points, new_faces = [], []
+            n_points = len(points)
+            boundary = self.boundary_edges(faces)
+            loops = self._walk_loops(boundary)
+            left_open = len(boundary) - sum(len(loop) for loop in loops)
+            for loop in loops:
+                loop_points = points[loop]
+                perimeter = np.linalg.norm(loop_points - np.roll(loop_points, -1, axis=0), axis=1).sum()
+                if max_perimeter is not None and perimeter > max_perimeter:
+                    left_open += len(loop)
+                    continue
+                following = np.roll(loop, -1)
+                if len(loop) == 3:
+                    new_faces.append(loop[::-1][None, :])
+                    continue
+                # Boundary edge a->b belongs to a face traversing it a->b, so the cap traverses b->a
+                new_points.append(loop_points.mean(axis=0))
+                new_faces.append(np.column_stack([following, loop, np.full(len(loop), n_points)]))
+                n_points += 1
+            if new_faces:
+                cap = np.vstack(new_faces)
+                all_faces = np.vstack([faces, cap])
+                all_points = np.vstack([points] + [np.asarray(new_points).reshape(-1, 3)])
+                self.mesh = pv.PolyData(all_points, np.hstack([np.full((len(all_faces), 1), 3), all_faces]).ravel())
+                self.logger.info(f"Filled holes with {len(cap)} faces")
+            self.is_closed = left_open == 0
+            self.step_details = {'holes_filled': len(new_faces), 'boundary_edges_left': int(left_open)}
         except Exception as e:
             self.logger.warning(f"Error filling holes: {str(e)}. Skipping this step.")
         return self.mesh
 
+    @staticmethod
+    def is_triangulated(mesh):
+        """Whether every polygon of a PolyData mesh is a triangle, without triangulating a copy."""
+        faces = np.asarray(mesh.faces)
+        return (mesh.GetNumberOfStrips() == 0 and len(faces) == 4 * mesh.GetNumberOfPolys()
+                and bool(np.all(faces[::4] == 3)))
+
+    @staticmethod
+    def boundary_edges(faces):
+        """
+        Directed edges of a triangle mesh used by a single face.
+
+        Args:
+            faces (np.ndarray): Mx3 array of triangle vertex indices.
+
+        Returns:
+            np.ndarray: Kx2 array of (start, end) vertex indices, in the direction of their face.
+        """
+        if len(faces) == 0:
+            return np.empty((0, 2), dtype=np.int64)
+        edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]]).astype(np.int64)
+        undirected = np.sort(edges, axis=1)
+        keys = undirected[:, 0] * (int(edges.max()) + 1) + undirected[:, 1]
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        return edges[counts[inverse.ravel()] == 1]
+
+    @staticmethod
+    def boundary_loops(faces):
+        """
+        Find the closed boundary loops of a triangle mesh.
+
+        Args:
+            faces (np.ndarray): Mx3 array of triangle vertex indices.
+
+        Returns:
+            list: One array of vertex indices per loop, in the direction of the boundary edges.
+        """
+        return MeshRefiner._walk_loops(MeshRefiner.boundary_edges(faces))
+
+    @staticmethod
+    def _walk_loops(boundary):
+        """Chain directed boundary edges into closed loops of at least 3 vertices."""
+        successors = {}
+        for start, end in boundary.tolist():
+            successors.setdefault(start, []).append(end)
+
+        # Follow each boundary edge once; revisiting a vertex of the current walk closes a
+        # loop, which also splits loops that touch at a non-manifold vertex
+        loops = []
+        for start in list(successors):
+            path, position, current = [start], {start: 0}, start
+            while successors.get(current):
+                current = successors[current].pop()
+                if current not in position:
+                    position[current] = len(path)
+                    path.append(current)
+                    continue
+                loop = path[position[current]:]
+                for vertex in loop[1:]:
+                    del position[vertex]
+                del path[position[current] + 1:]
+                if len(loop) >= 3:
+                    loops.append(np.array(loop))
+        return loops
+
     def remove_degenerate_faces(self, tolerance=1e-6):
         """Remove degenerate faces from the mesh."""
         self.logger.info(f"Removing degenerate faces with tolerance {tolerance}")
@@ -317,6 +1141,42 @@ class MeshRefiner:
             self.logger.warning(f"Error removing degenerate faces: {str(e)}. Skipping this step.")
         return self.mesh
 
+    def decimate(self, target_faces=None, max_error=None, boundary_weight=1000.0):
+        """
+        Reduce the face count with quadric error metric decimation.
+
+        Collapses stop at ``target_faces`` or once the next collapse would exceed
+        ``max_error``, whichever comes first. Boundary vertices are weighted so
+        that open borders keep their shape.
+
+        Args:
+            target_faces (int, optional): Target number of triangles.
+            max_error (float, optional): Maximum quadric error of a collapse.
+            boundary_weight (float): Weight of the boundary edge quadrics.
+        """
+        if not target_faces and max_error is None:
+            return self.mesh
+        self._to_polydata()
+        if target_faces and self.mesh.n_cells <= target_faces:
+            return self.mesh
+        self.logger.info(f"Decimating mesh with {self.mesh.n_cells} faces to target_faces={target_faces}, max_error={max_error}")
+        try:
+            triangulated = self.mesh.triangulate()
+            triangle_mesh = o3d.geometry.TriangleMesh(
+                o3d.utility.Vector3dVector(np.asarray(triangulated.points, dtype=np.float64)),
+                o3d.utility.Vector3iVector(triangulated.faces.reshape(-1, 4)[:, 1:]))
+            triangle_mesh = triangle_mesh.simplify_quadric_decimation(
+                target_number_of_triangles=int(target_faces or 0),
+                maximum_error=float('inf') if max_error is None else float(max_error),
+                boundary_weight=boundary_weight)
+            triangle_mesh.remove_unreferenced_vertices()
+            self.mesh = PointCloudToMesh._from_open3d(triangle_mesh)
+            self.is_clean = False
+            self.logger.info(f"Decimated mesh to {self.mesh.n_cells} faces")
+        except Exception as e:
+            self.logger.warning(f"Error decimating mesh: {str(e)}. Skipping this step.")
+        return self.mesh
+
     def ensure_watertight(self):
         """Ensure the mesh is watertight."""
         self.logger.info("Ensuring mesh is watertight")
@@ -328,41 +1188,91 @@ class MeshRefiner:
             filled = surface.fill_holes(1000)  # Use a large max_hole_size to fill all holes
             # Triangulate to ensure a consistent surface
             self.mesh = filled.triangulate()
+            self.is_clean = False
         except Exception as e:
             self.logger.warning(f"Error ensuring watertight mesh: {str(e)}. Skipping this step.")
         return self.mesh
 
-    def refine(self):
-        """Apply a complete refinement pipeline to the mesh."""
+    def refine(self, target_faces=None, max_error=None):
+        """
+        Apply a complete refinement pipeline to the mesh.
+
+        ensure_watertight is skipped when fill_holes left no open boundary, the
+        final clean when no step since the first clean could leave duplicate or
+        unused points, and decimate without a budget. Every step is recorded in
+        ``steps``.
+
+        Args:
+            target_faces (int, optional): Decimate the refined mesh to this many triangles.
+            max_error (float, optional): Decimate until a collapse would exceed this quadric error.
+        """
         self.logger.info("Starting complete mesh refinement pipeline")
+        self.steps = []
 
         # Initial cleaning
-        self.clean(tolerance=1e-6)
+        self._run_step('clean', self.clean, tolerance=1e-6)
 
         # Remove small disconnected components
-        self.remove_small_components(min_ratio=0.01)
+        self._run_step('remove_small_components', self.remove_small_components, min_ratio=0.01)
 
         # Fill holes (more aggressive)
-        self.fill_holes(max_hole_size=None)  # Fill all holes
+        self._run_step('fill_holes', self.fill_holes, max_perimeter=None)  # Fill all holes
 
         # Remove degenerate faces
         # self.remove_degenerate_faces(tolerance=1e-6)
 
         # Apply very gentle smoothing
-        self.smooth(n_iter=3, relaxation_factor=0.01, feature_smoothing=False, boundary_smoothing=True)
+        self._run_step('smooth', self.smooth, n_iter=3, relaxation_factor=0.01, feature_smoothing=False,
+                       boundary_smoothing=True)
+
+        # Ensure the mesh is watertight; fill_holes usually closed every boundary already
+        watertight = self.is_closed and isinstance(self.mesh, pv.PolyData) and self.is_triangulated(self.mesh)
+        self._run_step('ensure_watertight', self.ensure_watertight,
+                       skip_reason='no open boundary left by fill_holes' if watertight else None)
 
-        # Ensure the mesh is watertight
-        self.ensure_watertight()
+        # Reduce the face count if a budget or error bound is set
+        over_budget = max_error is not None or (target_faces and self.mesh.n_cells > target_faces)
+        self._run_step('decimate', self.decimate, target_faces=target_faces, max_error=max_error,
+                       skip_reason=None if over_budget else 'mesh within the face budget')
 
         # Final cleaning pass
-        self.clean(tolerance=1e-6)
+        self._run_step('clean', self.clean, tolerance=1e-6,
+                       skip_reason='no duplicate or unused points since the last clean' if self.is_clean else None)
 
         # Restore original mesh type if changed
         self._restore_original_type()
 
-        self.logger.info("Mesh refinement pipeline completed")
+        timings = ", ".join(f"{step['step']} skipped" if step['skipped'] else f"{step['step']} {step['seconds']:.3f}s"
+                            for step in self.steps)
+        self.logger.info(f"Mesh refinement pipeline completed in "
+                         f"{sum(step['seconds'] for step in self.steps):.3f}s: {timings}")
         return self.mesh
 
+    def _run_step(self, step, method, skip_reason=None, **kwargs):
+        """
+        Run one refinement step, or record why it is skipped.
+
+        Args:
+            step (str): Step name in the report.
+            method (callable): The step method.
+            skip_reason (str, optional): Skip the step for this reason.
+            **kwargs: Arguments of the step method.
+        """
+        entry = {'step': step, 'skipped': skip_reason is not None, 'seconds': 0.0}
+        if skip_reason is not None:
+            self.logger.info(f"Skipping {step}: {skip_reason}")
+            entry['reason'] = skip_reason
+        else:
+            n_points, n_cells = self.mesh.n_points, self.mesh.n_cells
+            self.step_details = {}
+            start = time.perf_counter()
+            method(**kwargs)
+            entry['seconds'] = round(time.perf_counter() - start, 4)
+            entry['points_change'] = int(self.mesh.n_points - n_points)
+            entry['cells_change'] = int(self.mesh.n_cells - n_cells)
+            entry.update(self.step_details)
+        self.steps.append(entry)
+
     def get_refined_mesh(self):
         """Get the current state of the refined mesh."""
         return self.mesh
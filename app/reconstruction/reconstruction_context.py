@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from app.services.thread_budget import ThreadBudget
+
+
+class ReconstructionContext:
+    """
+    Owns the spatial index of one point cloud for the reconstruction pipeline.
+
+    Alpha estimation, color transfer and any other nearest-neighbor lookup on
+    the same cloud share one KD-tree, built on first use. Queries run on the
+    threads allotted to the current job by ThreadBudget.
+
+    The context is passed along explicitly: the reconstruction service gets
+    one for the cloud it loads and hands it to PointCloudToMesh and
+    TextureMapper, which otherwise create their own. A float32 cloud is
+    referenced, not copied.
+
+    The service gets its contexts through ``cached``, keyed by the stored
+    cloud's ID and version, so repeated reconstructions of the same cloud (a
+    retry, or the stages endpoint after a reconstruction) reuse the index. The
+    cache keeps the most recently used ``MAX_CACHED_CLOUDS`` clouds.
+
+    Attributes:
+        points (np.ndarray): Nx3 float32 array of the cloud.
+        index_builds (int): Number of KD-tree / KNN builds.
+        index_reuses (int): Number of lookups served from an existing index.
+    """
+
+    MAX_CACHED_CLOUDS = 4
+
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    def __init__(self, points):
+        """
+        Initialize a context for one cloud.
+
+        Args:
+            points (array-like): Nx3 point coordinates.
+        """
+        self.points = np.ascontiguousarray(points, dtype=np.float32)
+        self.index_builds = 0
+        self.index_reuses = 0
+        self.index_build_time = 0.0
+        self._tree = None
+        self._knn_distances = None
+        self._knn_indices = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @classmethod
+    def cached(cls, key, points):
+        """
+        Get the context cached under a key, creating and caching it on first use.
+
+        The key must change whenever the stored cloud does; a cached context of
+        a different number of points is replaced all the same.
+
+        Args:
+            key (hashable): Identifies the cloud and its version, e.g. (point cloud ID, timestamp).
+            points (array-like): Nx3 point coordinates of the cloud.
+
+        Returns:
+            ReconstructionContext: The context of the cloud. Its ``points`` may be
+            an earlier load of the same cloud rather than ``points`` itself.
+        """
+        with cls._cache_lock:
+            context = cls._cache.get(key)
+            if context is not None and len(context.points) == len(points):
+                cls._cache.move_to_end(key)
+                return context
+            context = cls(points)
+            cls._cache[key] = context
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > cls.MAX_CACHED_CLOUDS:
+                cls._cache.popitem(last=False)
+            return context
+
+    @classmethod
+    def clear_cache(cls):
+        """Drop every cached context."""
+        with cls._cache_lock:
+            cls._cache.clear()
+
+    def tree(self):
+        """KD-tree over the cloud, built once."""
+        with self._lock:
+            if self._tree is None:
+                start = time.perf_counter()
+                self._tree = cKDTree(self.points)
+                self._record_build(time.perf_counter() - start)
+            else:
+                self.index_reuses += 1
+            return self._tree
+
+    def query(self, targets, k=1, distance_upper_bound=np.inf):
+        """
+        k nearest cloud points of arbitrary query points, in parallel.
+
+        Args:
+            targets (array-like): Mx3 query coordinates.
+            k (int): Number of neighbors.
+            distance_upper_bound (float): Neighbors farther than this are reported missing,
+                                          with infinite distance and index len(points).
+
+        Returns:
+            tuple: (distances, indices) as returned by cKDTree.query.
+        """
+        return self.tree().query(np.asarray(targets, dtype=np.float64), k=k,
+                                 distance_upper_bound=distance_upper_bound, workers=ThreadBudget.threads())
+
+    def knn(self, k):
+        """
+        k nearest neighbors of every cloud point, the point itself included.
+
+        The graph is computed for the largest k requested so far; smaller
+        requests are served as column slices of the cached graph.
+
+        Args:
+            k (int): Number of neighbors (including the point itself).
+
+        Returns:
+            tuple: (distances, indices), each of shape (N, k).
+        """
+        k = min(k, len(self.points))
+        with self._lock:
+            cached = self._knn_indices is not None and self._knn_indices.shape[1] >= k
+            if cached:
+                self.index_reuses += 1
+                return self._knn_distances[:, :k], self._knn_indices[:, :k]
+        # The tree already holds a float64 copy of the points, query with it
+        distances, indices = self.query(self.tree().data, k=k)
+        if k == 1:
+            distances, indices = distances[:, None], indices[:, None]
+        with self._lock:
+            if self._knn_indices is None or self._knn_indices.shape[1] < k:
+                self._knn_distances, self._knn_indices = distances, indices
+        return distances, indices
+
+    def nearest_neighbor_distances(self):
+        """Distance from every point to its nearest other point."""
+        distances, _ = self.knn(2)
+        return distances[:, 1]
+
+    def _record_build(self, seconds):
+        self.index_builds += 1
+        self.index_build_time += seconds
+        self.logger.info(f"Built KD-tree over {len(self.points)} points in {seconds:.3f}s")
+
+    def report(self):
+        """Summarize index builds and reuses."""
+        return {
+            'points': len(self.points),
+            'index_builds': self.index_builds,
+            'index_reuses': self.index_reuses,
+            'index_build_time': round(self.index_build_time, 4),
+        }
@@ -1,3 +1,8 @@
+import functools
+import glob
+import hashlib
+import json
+import os
 import numpy as np
 import pandas as pd
 import logging
@@ -85,3 +90,110 @@ def generate_colors(points, method='height'):
     else:
         raise ValueError(f"Unknown color generation method: {method}")
 
+
+def as_point_array(points):
+    """
+    Get points as one C-contiguous Nx3 float32 array, the layout used by every reconstruction stage.
+
+    An array that already has this layout is returned as is, so callers can
+    pass it down the pipeline without copies.
+
+    Args:
+        points (list or numpy.ndarray): Nx3 point coordinates.
+
+    Returns:
+        numpy.ndarray: Nx3 float32 array.
+    """
+    points = np.ascontiguousarray(points, dtype=np.float32)
+    if points.ndim != 2 or points.shape[1] != 3:
+        raise ValueError("Point cloud must be a 2D array with 3 columns (x, y, z)")
+    return points
+
+
+def as_color_array(colors, scale=None):
+    """
+    Get colors as one C-contiguous Nx3 uint8 array.
+
+    The range of the colors is never guessed from their values, since a dark
+    cloud in [0, 255] looks like one in [0, 1]: it is given by the source, or
+    by the dtype. uint8 arrays are returned as is.
+
+    Args:
+        colors (list or numpy.ndarray): Nx3 RGB values.
+        scale (float, optional): Value of full intensity, 1.0 or 255; point cloud documents
+                                 store colors in [0, 255]. If None, integer colors are taken
+                                 to be in [0, 255] and floating point ones in [0, 1], as
+                                 Open3D stores them.
+
+    Returns:
+        numpy.ndarray: Nx3 uint8 array.
+    """
+    if isinstance(colors, np.ndarray) and colors.dtype == np.uint8:
+        return np.ascontiguousarray(colors)
+    colors = np.asarray(colors)
+    if scale is None:
+        scale = 255 if np.issubdtype(colors.dtype, np.integer) else 1.0
+    colors = colors.astype(np.float32) * (255 / scale)
+    return np.ascontiguousarray(np.clip(np.rint(colors), 0, 255), dtype=np.uint8)
+
+
+def content_hash(*parts):
+    """
+    Compute a SHA-256 content hash over arrays, strings and JSON-serializable values.
+
+    Arrays are hashed with their dtype and shape, so equal values stored with a
+    different layout hash differently.
+
+    Args:
+        *parts: numpy arrays, bytes, strings or JSON-serializable values.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part)
+            digest.update(f"{part.dtype.str}{part.shape}".encode())
+            digest.update(part.tobytes())
+        elif isinstance(part, bytes):
+            digest.update(part)
+        elif isinstance(part, str):
+            digest.update(part.encode())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+def file_hash(filename, chunk_size=1024 * 1024):
+    """
+    Compute the SHA-256 hash of a file's content.
+
+    Args:
+        filename (str): Path of the file.
+        chunk_size (int): Bytes read at a time.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def pipeline_version():
+    """
+    Hash of the reconstruction code, so cached results are not reused across code changes.
+
+    Returns:
+        str: Hex digest of the source files of the app.reconstruction package and of the
+             reconstruction service, which wires the stages and their option defaults.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    sources = sorted(glob.glob(os.path.join(package_dir, '*.py')))
+    sources.append(os.path.join(os.path.dirname(package_dir), 'services', 'reconstruction_service.py'))
+    return content_hash(*[file_hash(source) for source in sources])
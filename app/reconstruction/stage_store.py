@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+
+import pyvista as pv
+
+from app.reconstruction.reconstruction_utils import file_hash
+
+
+class StageStore:
+    """
+    Stores the intermediate meshes of a reconstruction next to its OBJ file.
+
+    Each stage is written as a binary, zlib-compressed VTK PolyData file
+    (``.vtp``), which keeps point data such as vertex colors and UV
+    coordinates, so the reconstruction stages can be served again without
+    rerunning the pipeline.
+
+    Stages can also be checkpointed: a JSON manifest records, per stage, a
+    content hash of the stage input and the SHA-256 of every file the stage
+    wrote. A checkpoint is valid only while the input hash matches and all
+    files are present with unchanged content, which lets a failed
+    reconstruction resume from the last good stage.
+
+    Attributes:
+        output_dir (str): The model folder.
+        model_name (str): The model name used as file prefix.
+    """
+
+    STAGES = ('stage_1_mesh', 'stage_2_refined_mesh', 'stage_3_textured_mesh')
+    CHECKPOINTS = STAGES + ('export',)
+    EXTENSION = '.vtp'
+
+    def __init__(self, output_dir, model_name):
+        """
+        Initialize the store for one model folder.
+
+        Args:
+            output_dir (str): The model folder.
+            model_name (str): The model name used as file prefix.
+        """
+        self.output_dir = output_dir
+        self.model_name = model_name
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def path(self, stage):
+        """
+        Get the file path of a stage artifact.
+
+        Args:
+            stage (str): One of STAGES.
+
+        Returns:
+            str: The artifact path.
+
+        Raises:
+            ValueError: If the stage is unknown.
+        """
+        if stage not in self.STAGES:
+            raise ValueError(f"Unknown reconstruction stage: {stage}")
+        return os.path.join(self.output_dir, f"{self.model_name}.{stage}{self.EXTENSION}")
+
+    def paths(self):
+        """
+        Get the file paths of all stage artifacts and of the checkpoint manifest.
+
+        Returns:
+            list: One path per stage plus the manifest, whether or not they exist.
+        """
+        return [self.path(stage) for stage in self.STAGES] + [self.manifest_path()]
+
+    def manifest_path(self):
+        """Get the path of the checkpoint manifest."""
+        return os.path.join(self.output_dir, f"{self.model_name}.checkpoints.json")
+
+    def save(self, stage, mesh, input_hash=None):
+        """
+        Save a stage mesh and checkpoint it.
+
+        Artifacts are a cache: a failed write is logged and does not fail the reconstruction.
+
+        Args:
+            stage (str): One of STAGES.
+            mesh (pyvista.PolyData): The stage mesh.
+            input_hash (str, optional): Content hash of the stage input. Without it,
+                                        any previous checkpoint of the stage is dropped.
+
+        Returns:
+            str: The artifact path, or None if it could not be written.
+        """
+        path = self.path(stage)
+        try:
+            mesh.save(path, binary=True)
+            self.logger.info(f"Saved {stage} to {path}")
+        except Exception as e:
+            self.logger.warning(f"Could not save {stage} to {path}: {str(e)}")
+            self.checkpoint(stage, None, [])
+            return None
+        self.checkpoint(stage, input_hash, [path])
+        return path
+
+    def load(self, stage):
+        """
+        Load a stage mesh.
+
+        Args:
+            stage (str): One of STAGES.
+
+        Returns:
+            pyvista.PolyData: The stage mesh, or None if the artifact is missing or unreadable.
+        """
+        path = self.path(stage)
+        if not os.path.isfile(path):
+            return None
+        try:
+            return pv.read(path)
+        except Exception as e:
+            self.logger.warning(f"Could not read {stage} from {path}: {str(e)}")
+            return None
+
+    def load_manifest(self):
+        """
+        Load the checkpoint manifest.
+
+        Returns:
+            dict: Checkpoint entries by stage, empty if there is no readable manifest.
+        """
+        try:
+            with open(self.manifest_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def checkpoint(self, stage, input_hash, files):
+        """
+        Record that a stage completed from a given input.
+
+        The manifest is replaced atomically, so a crash never leaves it half written.
+
+        Args:
+            stage (str): One of CHECKPOINTS.
+            input_hash (str): Content hash of the stage input; None drops the checkpoint.
+            files (list): Paths of the files the stage wrote.
+        """
+        if stage not in self.CHECKPOINTS:
+            raise ValueError(f"Unknown reconstruction stage: {stage}")
+        manifest = self.load_manifest()
+        if input_hash is None:
+            if manifest.pop(stage, None) is None:
+                return
+        else:
+            try:
+                manifest[stage] = {
+                    'input_hash': input_hash,
+                    'files': {os.path.basename(path): file_hash(path) for path in files},
+                }
+            except OSError as e:
+                self.logger.warning(f"Could not checkpoint {stage}: {str(e)}")
+                manifest.pop(stage, None)
+        try:
+            temp_path = self.manifest_path() + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(temp_path, self.manifest_path())
+        except OSError as e:
+            self.logger.warning(f"Could not write checkpoint manifest: {str(e)}")
+
+    def is_valid(self, stage, input_hash):
+        """
+        Check whether a stage checkpoint can be reused.
+
+        Args:
+            stage (str): One of CHECKPOINTS.
+            input_hash (str): Content hash of the current stage input.
+
+        Returns:
+            bool: True if the stage ran on the same input and its files are intact.
+        """
+        entry = self.load_manifest().get(stage)
+        if input_hash is None or entry is None or entry['input_hash'] != input_hash:
+            return False
+        for name, expected in entry['files'].items():
+            path = os.path.join(self.output_dir, name)
+            if not os.path.isfile(path) or file_hash(path) != expected:
+                self.logger.info(f"Checkpoint of {stage} is stale: {name} is missing or changed")
+                return False
+        return True
+
+    def resume(self, stage, input_hash):
+        """
+        Load a stage mesh from a valid checkpoint.
+
+        Args:
+            stage (str): One of STAGES.
+            input_hash (str): Content hash of the current stage input.
+
+        Returns:
+            pyvista.PolyData: The checkpointed mesh, or None if the stage has to run again.
+        """
+        if not self.is_valid(stage, input_hash):
+            return None
+        return self.load(stage)
+
+    def artifact_hash(self, stage):
+        """
+        Get the content hash of a checkpointed stage's output, used as the next stage's input.
+
+        Args:
+            stage (str): One of CHECKPOINTS.
+
+        Returns:
+            str: Hash of the stage's files, or None if the stage has no checkpoint.
+        """
+        entry = self.load_manifest().get(stage)
+        if entry is None:
+            return None
+        return '-'.join(entry['files'][name] for name in sorted(entry['files']))
@@ -0,0 +1,70 @@
+"""
+Benchmark of texture baking at several texture resolutions.
+
+Usage::
+
+    python -m app.reconstruction.texture_benchmark [textured_mesh.vtp] [resolution ...]
+
+Without a mesh, a colored UV-mapped sphere is generated.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+import numpy as np
+import pyvista as pv
+
+from app.reconstruction.texture_mapper import TextureMapper
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = (512, 1024, 4096)
+
+
+def sample_textured_mesh(resolution=300):
+    """A sphere with random vertex colors and spherical UV coordinates."""
+    mesh = pv.Sphere(theta_resolution=resolution, phi_resolution=resolution)
+    mesh.point_data['RGB'] = np.random.default_rng(0).random((mesh.n_points, 3))
+    texture_mapper = TextureMapper()
+    texture_mapper.load_mesh(mesh)
+    texture_mapper.apply_spherical_uv_mapping()
+    return mesh
+
+
+def benchmark_texture_resolutions(mesh, resolutions=RESOLUTIONS, repeats=3):
+    """
+    Time generate_texture_image at each texture resolution.
+
+    Args:
+        mesh (pyvista.PolyData): Mesh with 'RGB' and 'UV' point data.
+        resolutions (tuple): Texture resolutions to compare.
+        repeats (int): Runs per resolution; the fastest is reported.
+
+    Returns:
+        list: One dict per resolution with 'resolution', 'seconds' and 'faces'.
+    """
+    results = []
+    for resolution in resolutions:
+        texture_mapper = TextureMapper(texture_resolution=resolution)
+        texture_mapper.load_mesh(mesh)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            texture_mapper.generate_texture_image()
+            timings.append(time.perf_counter() - start)
+        result = {'resolution': resolution, 'seconds': round(min(timings), 3), 'faces': int(mesh.n_cells)}
+        logger.info(f"Benchmark result: {result}")
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('mesh', nargs='?', help='mesh with RGB and UV point data (default: generated sphere)')
+    parser.add_argument('resolutions', nargs='*', type=int, help=f'texture resolutions (default: {RESOLUTIONS})')
+    args = parser.parse_args()
+    mesh = pv.read(args.mesh) if args.mesh else sample_textured_mesh()
+    json.dump(benchmark_texture_resolutions(mesh, args.resolutions or RESOLUTIONS), sys.stdout, indent=2)
+    print()
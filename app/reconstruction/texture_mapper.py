@@ -1,6 +1,8 @@
 import numpy as np
+from app.reconstruction.reconstruction_context import ReconstructionContext
+from app.services.thread_budget import ThreadBudget
+from scipy import ndimage, sparse
 from scipy.spatial import cKDTree
-from scipy import ndimage
 import logging
 
 class TextureMapper:
@@ -17,6 +19,13 @@ class TextureMapper:
         texture_resolution (int): The resolution of the generated texture image.
     """
 
+    # Texels per rasterization batch, bounds the temporary arrays
+    RASTER_BATCH_SIZE = 1 << 22
+    # Above this uncovered fraction the fill pass uses a full distance transform
+    BORDER_FILL_MAX_FRACTION = 0.25
+    # Field data array recording uv_wraps with the mesh, so it survives stage checkpoints
+    UV_WRAPS_FIELD = 'UVWraps'
+
     def __init__(self, texture_resolution=1024):
         """
         Initialize the TextureMapper with the specified texture resolution.
@@ -34,34 +43,55 @@ class TextureMapper:
             point_cloud (numpy.ndarray): The point cloud data used for color mapping.
             colors (numpy.ndarray): The color data corresponding to the point cloud.
             texture_resolution (int): The resolution of the generated texture image.
+            uv_wraps (bool): Whether the u coordinate wraps around the object, None if unknown.
         """
         self.mesh = None
         self.point_cloud = None
         self.colors = None
+        # Spatial index of the point cloud, created on first use unless given with the cloud
+        self.context = None
         self.texture_resolution = texture_resolution
+        # Whether u wraps around (cylindrical/spherical mapping); restored by load_mesh for UVs loaded with the mesh
+        self.uv_wraps = None
         self.logger = logging.getLogger(__name__)
 
     def load_mesh(self, mesh):
         """
         Load a mesh for texture mapping.
 
+        A mesh that already has UVs, such as a resumed textured stage, brings
+        back whether they wrap around; meshes saved without that record get it
+        from the mapping apply_smart_uv_mapping picks for their shape.
+
         Args:
             mesh (pyvista.PolyData): The mesh to be textured.
         """
         self.mesh = mesh
-
-    def load_point_cloud_with_colors(self, points, colors):
+        self.uv_wraps = None
+        if "UV" in mesh.point_data:
+            if self.UV_WRAPS_FIELD in mesh.field_data:
+                self.uv_wraps = bool(mesh.field_data[self.UV_WRAPS_FIELD][0])
+            else:
+                self.uv_wraps = self.smart_uv_mapping() != 'planar'
+
+    def load_point_cloud_with_colors(self, points, colors, context=None):
         """
         Load a point cloud with corresponding color data.
 
+        Arrays are referenced, not copied.
+
         Args:
             points (numpy.ndarray): The point cloud data.
-            colors (numpy.ndarray): The color data corresponding to the point cloud.
+            colors (numpy.ndarray): The color data corresponding to the point cloud,
+                                    uint8 in [0, 255] or floats in [0, 1] or [0, 255].
+            context (ReconstructionContext, optional): Spatial index context of the same points,
+                                                       e.g. the one alpha estimation used.
         """
-        # self.point_cloud = points
-        # self.colors = colors
-        self.point_cloud = np.array(points)
-        self.colors = np.array(colors)
+        self.point_cloud = np.asarray(points)
+        self.colors = np.asarray(colors)
+        if context is not None and context.points.shape != self.point_cloud.shape:
+            raise ValueError("The reconstruction context must be of the same points")
+        self.context = context
 
     def apply_texture(self):
         """
@@ -90,8 +120,8 @@ class TextureMapper:
         """
         Map colors from the point cloud to the mesh vertices.
 
-        This method uses a KD-tree for efficient nearest neighbor search to map
-        colors from the point cloud to the mesh vertices.
+        This method queries the point cloud's KD-tree (see ReconstructionContext)
+        in parallel to map colors from the point cloud to the mesh vertices.
 
         Raises:
             ValueError: If the mesh or point cloud with colors hasn't been loaded.
@@ -103,8 +133,9 @@ class TextureMapper:
             if len(self.point_cloud) == 0 or len(self.colors) == 0:
                 raise ValueError("Point cloud or colors array is empty")
 
-            tree = cKDTree(self.point_cloud)
-            distances, indices = tree.query(self.mesh.points)
+            if self.context is None:
+                self.context = ReconstructionContext(self.point_cloud)
+            distances, indices = self.context.query(self.mesh.points)
 
             # Check if any valid indices were found
             if len(indices) == 0:
@@ -119,8 +150,8 @@ class TextureMapper:
             # indices = indices.astype(int)
 
             # Ensure colors are in the range [0, 1]
-            if vertex_colors.max() > 1.0:
-                vertex_colors = vertex_colors / 255.0
+            if vertex_colors.dtype == np.uint8 or vertex_colors.max() > 1.0:
+                vertex_colors = vertex_colors / np.float32(255.0)
 
             self.mesh.point_data["RGB"] = vertex_colors
         except Exception as e:
@@ -141,16 +172,31 @@ class TextureMapper:
         if self.mesh is None:
             raise ValueError("Mesh must be loaded before applying UV mapping.")
 
+        mapping = self.smart_uv_mapping()
+        if mapping == 'planar':
+            self.apply_planar_uv_mapping()
+        elif mapping == 'spherical':
+            self.apply_spherical_uv_mapping()
+        else:
+            self.apply_cylindrical_uv_mapping()
+
+    def smart_uv_mapping(self):
+        """
+        Name of the UV mapping apply_smart_uv_mapping uses for the mesh's shape.
+
+        Returns:
+            str: 'planar', 'spherical' or 'cylindrical'.
+        """
         bounds = self.mesh.bounds
         dimensions = np.array([bounds[1] - bounds[0], bounds[3] - bounds[2], bounds[5] - bounds[4]])
         aspect_ratio = dimensions / np.max(dimensions)
 
         if aspect_ratio[2] < 0.5:  # Flat object
-            self.apply_planar_uv_mapping()
+            return 'planar'
         elif aspect_ratio[0] > 0.8 and aspect_ratio[1] > 0.8:  # Roughly cubic or spherical
-            self.apply_spherical_uv_mapping()
+            return 'spherical'
         else:  # Elongated object
-            self.apply_cylindrical_uv_mapping()
+            return 'cylindrical'
 
     def apply_planar_uv_mapping(self):
         """
@@ -169,6 +215,7 @@ class TextureMapper:
         v = normalized_points[:, 1]
 
         self.mesh.point_data["UV"] = np.column_stack((u, v))
+        self._set_uv_wraps(False)
 
     def apply_cylindrical_uv_mapping(self):
         """
@@ -191,6 +238,7 @@ class TextureMapper:
         v = (z - bounds[4]) / height
 
         self.mesh.point_data["UV"] = np.column_stack((u, v))
+        self._set_uv_wraps(True)
 
     def apply_spherical_uv_mapping(self):
         """
@@ -212,33 +260,79 @@ class TextureMapper:
         v = theta / np.pi
 
         self.mesh.point_data["UV"] = np.column_stack((u, v))
+        self._set_uv_wraps(True)
 
-    def smooth_texture(self, iterations=5):
+    def _set_uv_wraps(self, wraps):
+        """Record whether u wraps around, on the mapper and with the mesh."""
+        self.uv_wraps = wraps
+        self.mesh.field_data[self.UV_WRAPS_FIELD] = np.array([int(wraps)], dtype=np.uint8)
+
+    def smooth_texture(self, iterations=5, relaxation_factor=0.1):
         """
         Smooth the texture on the mesh.
 
-        This method applies Laplacian smoothing to the color data on the mesh.
+        This method diffuses the color data over the mesh: each step moves every
+        vertex color towards the mean color of its edge neighbors. The vertex
+        adjacency is built once as a sparse matrix and every step is a sparse
+        matrix product on the color array, so the geometry is never touched.
 
         Args:
             iterations (int): Number of smoothing iterations to perform.
+            relaxation_factor (float): Fraction of the way towards the neighbor mean per iteration.
 
         Raises:
             ValueError: If the mesh hasn't been loaded.
         """
         if self.mesh is None:
             raise ValueError("Mesh must be loaded before smoothing texture.")
+        if 'RGB' not in self.mesh.point_data or iterations <= 0:
+            return
 
+        diffusion = self.color_diffusion_operator(relaxation_factor)
+        colors = np.asarray(self.mesh.point_data["RGB"], dtype=np.float64)
         for _ in range(iterations):
-            smooth = self.mesh.smooth(n_iter=1, relaxation_factor=0.1, feature_smoothing=False,
-                                      boundary_smoothing=True, edge_angle=100, feature_angle=100)
-            self.mesh.point_data["RGB"] = smooth.point_data["RGB"]
+            colors = diffusion @ colors
+        self.mesh.point_data["RGB"] = colors
+
+    def color_diffusion_operator(self, relaxation_factor=0.1):
+        """
+        Build the sparse operator of one color diffusion step.
+
+        Args:
+            relaxation_factor (float): Fraction of the way towards the neighbor mean per step.
+
+        Returns:
+            scipy.sparse.csr_matrix: (1 - r) I + r D^-1 A over the mesh vertices, where A is
+                                     the vertex adjacency and D its degrees. Isolated vertices keep their color.
+        """
+        mesh = self.mesh if self.mesh.is_all_triangles else self.mesh.triangulate()
+        faces = mesh.faces.reshape(-1, 4)[:, 1:]
+        n_points = self.mesh.n_points
+        edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+        rows = np.concatenate([edges[:, 0], edges[:, 1]])
+        cols = np.concatenate([edges[:, 1], edges[:, 0]])
+        adjacency = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_points, n_points))
+        # Edges shared by two faces were counted twice
+        adjacency.data[:] = 1.0
+
+        degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+        weights = np.where(degrees > 0, relaxation_factor / np.maximum(degrees, 1), 0.0)
+        keep = np.where(degrees > 0, 1.0 - relaxation_factor, 1.0)
+        return (sparse.diags(keep) + sparse.diags(weights) @ adjacency).tocsr()
 
     def generate_texture_image(self):
         """
         Generate a texture image from the mesh's color and UV data.
 
-        This method creates a 2D texture image based on the mesh's color data and
-        UV coordinates. It uses a distance transform to fill in empty areas of the texture.
+        Every triangle is rasterized in UV space with its vertex colors
+        interpolated barycentrically, in vectorized batches of candidate
+        texels. Texels no triangle covers are then filled in one pass with the
+        color of the nearest covered texel.
+
+        Unless the mapping is known to be planar, triangles spanning more than
+        half of the texture width cross the u seam of the cylindrical and
+        spherical mappings; they are not rasterized and their texels come
+        from the fill pass.
 
         Returns:
             numpy.ndarray: The generated texture image.
@@ -249,42 +343,127 @@ class TextureMapper:
         if 'RGB' not in self.mesh.point_data or 'UV' not in self.mesh.point_data:
             raise ValueError("Mesh must have RGB and UV data before generating texture image.")
 
-        colors = self.mesh.point_data['RGB']
-        uv_coords = self.mesh.point_data['UV']
-
-        texture_image = np.zeros((self.texture_resolution, self.texture_resolution, 3), dtype=np.float32)
+        resolution = self.texture_resolution
+        colors = np.asarray(self.mesh.point_data['RGB'], dtype=np.float32)
+        uv_coords = np.clip(np.asarray(self.mesh.point_data['UV'], dtype=np.float64), 0, 1)
+        # Texel space: x grows with u, y grows downwards with 1 - v
+        texel_coords = np.column_stack([uv_coords[:, 0], 1 - uv_coords[:, 1]]) * (resolution - 1)
 
+        texture_image = np.zeros((resolution, resolution, 3), dtype=np.float32)
         # Create a mask to track filled pixels
-        mask = np.zeros((self.texture_resolution, self.texture_resolution), dtype=bool)
+        mask = np.zeros((resolution, resolution), dtype=bool)
 
-        for i, uv in enumerate(uv_coords):
-            # x = int(uv[0] * (self.texture_resolution - 1))
-            # y = int((1 - uv[1]) * (self.texture_resolution - 1))
-            # texture_image[y, x] = colors[i]
-            # mask[y, x] = True
-                # Ensure UV coordinates are within [0, 1]
-            u = np.clip(uv[0], 0, 1)
-            v = np.clip(uv[1], 0, 1)
+        # Vertices first, so meshes without faces still get their colors
+        vertex_texels = texel_coords.astype(int)
+        texture_image[vertex_texels[:, 1], vertex_texels[:, 0]] = colors
+        mask[vertex_texels[:, 1], vertex_texels[:, 0]] = True
 
-            x = int(u * (self.texture_resolution - 1))
-            y = int((1 - v) * (self.texture_resolution - 1))
+        mesh = self.mesh if self.mesh.is_all_triangles else self.mesh.triangulate()
+        if mesh.n_cells > 0:
+            self._rasterize_triangles(mesh.faces.reshape(-1, 4)[:, 1:], texel_coords, colors, texture_image, mask)
 
-            # Double-check to ensure we're within bounds
-            x = np.clip(x, 0, self.texture_resolution - 1)
-            y = np.clip(y, 0, self.texture_resolution - 1)
+        self._fill_uncovered(texture_image, mask)
+        return texture_image
 
-            texture_image[y, x] = colors[i]
-            mask[y, x] = True
+    def _fill_uncovered(self, texture_image, mask):
+        """
+        Give every uncovered texel the color of its nearest covered texel, in place.
+
+        The nearest covered texel always borders an uncovered one, so when most of
+        the texture is covered only the border texels are indexed; otherwise a
+        distance transform over the whole texture is cheaper.
 
-        # Use a distance transform to fill empty areas
-        distance = ndimage.distance_transform_edt(~mask)
-        indices = ndimage.distance_transform_edt(~mask, return_distances=False, return_indices=True)
+        Args:
+            texture_image (numpy.ndarray): Texture written in place.
+            mask (numpy.ndarray): Texels that already have a color.
+        """
+        uncovered = ~mask
+        n_uncovered = np.count_nonzero(uncovered)
+        if n_uncovered == 0 or n_uncovered == mask.size:
+            return
+        if n_uncovered > self.BORDER_FILL_MAX_FRACTION * mask.size:
+            indices = ndimage.distance_transform_edt(uncovered, return_distances=False, return_indices=True)
+            texture_image[uncovered] = texture_image[indices[0][uncovered], indices[1][uncovered]]
+            return
+        border = np.argwhere(mask & ndimage.binary_dilation(uncovered))
+        targets = np.argwhere(uncovered)
+        _, nearest = cKDTree(border).query(targets, workers=ThreadBudget.threads())
+        texture_image[targets[:, 0], targets[:, 1]] = texture_image[border[nearest, 0], border[nearest, 1]]
+
+    def _rasterize_triangles(self, faces, texel_coords, colors, texture_image, mask):
+        """
+        Rasterize triangles into the texture with barycentric color interpolation.
 
-        for channel in range(3):
-            channel_image = texture_image[:, :, channel]
-            texture_image[:, :, channel] = channel_image[tuple(indices)]
+        Each triangle is split into texel rows, each row into the texels between
+        the triangle's edges, and every texel gets the triangle's color plane
+        (the barycentric blend of its vertex colors) evaluated at its position.
+        Only covered texels are generated, in batches of RASTER_BATCH_SIZE.
 
-        return texture_image
+        Args:
+            faces (numpy.ndarray): Mx3 vertex indices.
+            texel_coords (numpy.ndarray): Nx2 vertex positions in texel space.
+            colors (numpy.ndarray): Nx3 vertex colors.
+            texture_image (numpy.ndarray): Texture written in place.
+            mask (numpy.ndarray): Coverage mask written in place.
+        """
+        resolution = self.texture_resolution
+        corners = texel_coords[faces]
+        edge_1 = corners[:, 1] - corners[:, 0]
+        edge_2 = corners[:, 2] - corners[:, 0]
+        determinant = edge_1[:, 0] * edge_2[:, 1] - edge_1[:, 1] * edge_2[:, 0]
+        extent = corners.max(axis=1) - corners.min(axis=1)
+        keep = np.abs(determinant) > 1e-12
+        if self.uv_wraps is not False:
+            keep &= extent[:, 0] <= resolution // 2
+        faces, corners, edge_1, edge_2, determinant = faces[keep], corners[keep], edge_1[keep], edge_2[keep], determinant[keep]
+
+        # Color plane per triangle: color(x, y) = origin + gradient_x * x + gradient_y * y
+        color_1 = colors[faces[:, 1]] - colors[faces[:, 0]]
+        color_2 = colors[faces[:, 2]] - colors[faces[:, 0]]
+        gradient_x = (color_1 * edge_2[:, 1, None] - color_2 * edge_1[:, 1, None]) / determinant[:, None]
+        gradient_y = (color_2 * edge_1[:, 0, None] - color_1 * edge_2[:, 0, None]) / determinant[:, None]
+        origin = colors[faces[:, 0]] - gradient_x * corners[:, 0, 0, None] - gradient_y * corners[:, 0, 1, None]
+        origin, gradient_x, gradient_y = (array.astype(np.float32) for array in (origin, gradient_x, gradient_y))
+
+        first_row = np.ceil(corners[:, :, 1].min(axis=1)).astype(np.int64)
+        last_row = np.minimum(np.floor(corners[:, :, 1].max(axis=1)).astype(np.int64), resolution - 1)
+        heights = np.maximum(last_row - first_row + 1, 0)
+        texel_estimate = np.cumsum(heights * (np.ceil(extent[keep, 0]).astype(np.int64) + 1))
+
+        start = 0
+        while start < len(faces):
+            done = texel_estimate[start - 1] if start else 0
+            end = max(int(np.searchsorted(texel_estimate, done + self.RASTER_BATCH_SIZE, side='right')), start + 1)
+            triangles = np.arange(start, end)
+            start = end
+
+            # One entry per (triangle, texel row)
+            row_triangle = np.repeat(triangles, heights[triangles])
+            row_offset = np.arange(len(row_triangle)) - np.repeat(np.cumsum(heights[triangles]) - heights[triangles], heights[triangles])
+            y = first_row[row_triangle] + row_offset
+            row_corners = corners[row_triangle]
+            left = np.full(len(y), np.inf)
+            right = np.full(len(y), -np.inf)
+            for i, j in ((0, 1), (1, 2), (2, 0)):
+                y_i, y_j = row_corners[:, i, 1], row_corners[:, j, 1]
+                crosses = (np.minimum(y_i, y_j) <= y) & (y <= np.maximum(y_i, y_j)) & (y_i != y_j)
+                t = np.where(crosses, (y - y_i) / np.where(y_i != y_j, y_j - y_i, 1.0), 0.0)
+                x_at_y = row_corners[:, i, 0] + t * (row_corners[:, j, 0] - row_corners[:, i, 0])
+                left = np.where(crosses, np.minimum(left, x_at_y), left)
+                right = np.where(crosses, np.maximum(right, x_at_y), right)
+            x_first = np.maximum(np.ceil(left - 1e-9), 0).astype(np.int64)
+            x_last = np.minimum(np.floor(right + 1e-9), resolution - 1).astype(np.int64)
+            widths = np.maximum(x_last - x_first + 1, 0)
+
+            # One entry per covered texel
+            texel_row = np.repeat(np.arange(len(y)), widths)
+            x = x_first[texel_row] + np.arange(len(texel_row)) - np.repeat(np.cumsum(widths) - widths, widths)
+            texel_y = y[texel_row]
+            texel_triangle = row_triangle[texel_row]
+            texel_colors = (origin[texel_triangle] + gradient_x[texel_triangle] * x[:, None].astype(np.float32)
+                            + gradient_y[texel_triangle] * texel_y[:, None].astype(np.float32))
+            texture_image[texel_y, x] = texel_colors
+            mask[texel_y, x] = True
 
     def get_textured_mesh(self):
         """
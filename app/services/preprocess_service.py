@@ -1,3 +1,5 @@
+from app.config import Config
+from app.preprocess.lod import delete_lod
 from app.preprocess.ply_preprocess import PLYProcessor
 from app.db.mongodb import get_db
 import os
@@ -39,18 +41,25 @@ class PreprocessService:
         cluster_eps = 0.02
         min_points = 50
 
-        #load the pointCloud
-        pcd = ply_processor.load_point_cloud()
-        ply_processor.main_object = pcd
+        if ply_processor.should_stream(Config.PREPROCESS_STREAMING_THRESHOLD_MB):
+            # Out-of-core load: outlier removal and voxel downsampling already run per tile
+            filtered_pcd = ply_processor.load_point_cloud_streaming(
+                memory_budget_mb=Config.PREPROCESS_MEMORY_BUDGET_MB)
+            ply_processor.main_object = filtered_pcd
+            filtered_pcd = ply_processor.center_point_cloud(filtered_pcd)
+        else:
+            #load the pointCloud
+            pcd = ply_processor.load_point_cloud()
+            ply_processor.main_object = pcd
 
-        # Center the point cloud
-        center_pcd = ply_processor.center_point_cloud(pcd)
+            # Center the point cloud
+            center_pcd = ply_processor.center_point_cloud(pcd)
 
-        # Remove statistical outliers
-        filtered_pcd = ply_processor.remove_statistical_outliers(center_pcd)
+            # Remove statistical outliers
+            filtered_pcd = ply_processor.remove_statistical_outliers(center_pcd)
 
-        # Voxel downsampling
-        filtered_pcd = ply_processor.voxel_downsample(filtered_pcd)
+            # Voxel downsampling
+            filtered_pcd = ply_processor.voxel_downsample(filtered_pcd)
 
         # Estimate normals
         filtered_pcd = ply_processor.estimate_normals(filtered_pcd)
@@ -68,7 +77,8 @@ class PreprocessService:
         ply_processor.main_object = main_object
 
         # Object bottom completion
-        complete_object, bottom = ply_processor.complete_bottom(main_object)
+        complete_object, bottom = ply_processor.complete_bottom(
+            main_object, method=Config.BOTTOM_COMPLETION_METHOD)
 
         # Final object center
         complete_object = ply_processor.center_point_cloud(complete_object)
@@ -90,6 +100,8 @@ class PreprocessService:
             'ply_id': ply_id,
             'processed': True,
             'point_cloud_id': point_cloud_id,
+            'timings': ply_processor.context.report(),
+            'bottom_completion': ply_processor.bottom_completion,
         }
 
     @staticmethod
@@ -117,9 +129,9 @@ class PreprocessService:
         return None
 
 
-    def get_ply(self, ply_id, param):
+    def get_ply(self, ply_id, param, max_points=None):
         temp_PLY_Processor = PLYProcessor(None, ply_id)
-        ply = temp_PLY_Processor.get_ply(param)
+        ply = temp_PLY_Processor.get_ply(param, max_points=max_points)
         if ply is not None:
             ply = temp_PLY_Processor.format_point_cloud_to_serializable(ply)
         return ply
@@ -153,6 +165,7 @@ class PreprocessService:
                 if os.path.exists(file_path):
                     os.remove(file_path)
                     deleted_files.append(file_path)
+                    deleted_files.extend(delete_lod(file_path))
 
                     # Try to remove the folder if it's empty
                     if os.path.exists(folder_path) and not os.listdir(folder_path):
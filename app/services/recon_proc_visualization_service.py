@@ -19,13 +19,13 @@ class ReconProcVisualizationService:
         return obj
 
     @staticmethod
-    def get_point_cloud_data(model_id):
+    def get_point_cloud_data(model_id, max_points=None):
         model = ThreeDModel.get_by_id(model_id)
         if not model:
             current_app.logger.error(f"Model not found: {model_id}")
             return None
 
-        point_cloud = PointCloud.get_by_id(model.point_cloud_id)
+        point_cloud = PointCloud.get_by_id(model.point_cloud_id, max_points=max_points)
         if not point_cloud:
             current_app.logger.error(f"Point cloud not found for model: {model_id}")
             return None
@@ -44,14 +44,20 @@ class ReconProcVisualizationService:
         }
 
     @staticmethod
-    def get_mesh_data(model_id, mesh_type='initial'):
+    def get_mesh_data(model_id, mesh_type='initial', detail='full'):
         model = ThreeDModel.get_by_id(model_id)
         if not model:
             current_app.logger.error(f"Model not found: {model_id}")
             return None
 
-        current_app.logger.info(f"Loading OBJ file: {model.obj_file}")
-        mesh = pv.read(model.obj_file)
+        # detail='preview' serves the decimated preview mesh when the reconstruction exported one
+        obj_file, _, _ = model.get_files(detail)
+        if not obj_file:
+            # Fast preview models only have a GLB until the full reconstruction replaces them
+            current_app.logger.warning(f"Model has no OBJ file yet: {model_id} ({model.report.get('status')})")
+            return None
+        current_app.logger.info(f"Loading OBJ file: {obj_file}")
+        mesh = pv.read(obj_file)
         mesh_data = ReconProcVisualizationService.extract_mesh_data(mesh)
 
         if mesh_type == 'initial':
@@ -64,19 +70,23 @@ class ReconProcVisualizationService:
         return ReconProcVisualizationService.create_mesh_data(mesh_data, surface_color=color, wireframe_color='rgb(0, 0, 0)')
 
     @staticmethod
-    def get_textured_mesh_data(model_id):
+    def get_textured_mesh_data(model_id, detail='full'):
         model = ThreeDModel.get_by_id(model_id)
         if not model:
             current_app.logger.error(f"Model not found: {model_id}")
             return None
 
-        current_app.logger.info(f"Loading OBJ file: {model.obj_file}")
-        mesh = pv.read(model.obj_file)
+        obj_file, _, texture_file = model.get_files(detail)
+        if not obj_file:
+            current_app.logger.warning(f"Model has no OBJ file yet: {model_id} ({model.report.get('status')})")
+            return None
+        current_app.logger.info(f"Loading OBJ file: {obj_file}")
+        mesh = pv.read(obj_file)
         mesh_data = ReconProcVisualizationService.extract_mesh_data(mesh)
 
-        current_app.logger.info(f"Processing texture: {model.texture_file}")
+        current_app.logger.info(f"Processing texture: {texture_file}")
         try:
-            texture = Image.open(model.texture_file)
+            texture = Image.open(texture_file)
             texture_array = np.array(texture)
 
             current_app.logger.info("Mapping texture to vertices")
@@ -1,11 +1,16 @@
 import os
+import time
 from bson import ObjectId
 from flask import current_app
 from app.db.mongodb import get_db
 from app.reconstruction.point_cloud_to_mesh import PointCloudToMesh, MeshRefiner
 from app.reconstruction.texture_mapper import TextureMapper
 from app.reconstruction.mesh_to_obj_converter import MeshToOBJConverter
-from app.reconstruction.reconstruction_utils import generate_colors
+from app.reconstruction.reconstruction_utils import (generate_colors, content_hash, file_hash, pipeline_version,
+                                                     as_point_array, as_color_array)
+from app.reconstruction.reconstruction_context import ReconstructionContext
+from app.reconstruction.stage_store import StageStore
+from app.models.point_cloud import PointCloud
 from app.models.threed_model import ThreeDModel
 import logging
 import numpy as np
@@ -13,9 +18,84 @@ import numpy as np
 class ReconstructionService:
     logger = logging.getLogger(__name__)
 
+    # The fast preview thins large clouds by striding to this many times its point count before simplifying
+    FAST_PREVIEW_SAMPLE_FACTOR = 20
+
     @staticmethod
-    def start_reconstruction(point_cloud_id):
-        ReconstructionService.logger.info(f"Starting reconstruction for point cloud {point_cloud_id}")
+    def start_reconstruction(point_cloud_id, resume=False, engine=None, point_budget=None, tile_size=None,
+                             tile_workers=None, target_faces=None, max_error=None, preview_faces=None,
+                             texture_resolution=None, force=False, model_id=None, candidates=None,
+                             candidate_points=None):
+        """
+        Reconstruct a textured model from a point cloud.
+
+        Every stage is checkpointed with the content hash of its input. With
+        ``resume``, stages whose checkpoint is still valid are loaded instead of
+        recomputed, so a retry after a failure continues from the last good
+        stage. The skipped stages, the surface reconstruction engine, the
+        scores of the meshing candidates and the step timings of the mesh
+        refinement are stored in the model's report.
+
+        Results are cached by a content hash of the points, colors, pipeline
+        parameters and reconstruction code. A request matching an earlier
+        result whose files are intact returns that model without running the
+        pipeline; ``force`` bypasses the cache.
+
+        With ``model_id``, the result replaces the fast preview saved under that
+        ID by start_fast_preview, so clients showing the preview get the full
+        model under the same ID.
+
+        Args:
+            point_cloud_id (str): The point cloud ID.
+            resume (bool): Reuse valid checkpoints of a previous attempt.
+            engine (str, optional): Surface reconstruction engine, or 'auto' to pick one
+                                    by shape class. Defaults to RECONSTRUCTION_ENGINE.
+            point_budget (int, optional): Number of points kept for meshing, 0 for all.
+                                          Texture colors still come from the full cloud.
+                                          Defaults to RECONSTRUCTION_POINT_BUDGET.
+            tile_size (float, optional): Mesh overlapping tiles of this size in parallel worker
+                                         processes and stitch them, 0 to mesh the cloud whole.
+                                         Defaults to RECONSTRUCTION_TILE_SIZE.
+            tile_workers (int, optional): Worker processes for tiled meshing, 0 for the cores
+                                          allotted to the job. Defaults to RECONSTRUCTION_TILE_WORKERS.
+            target_faces (int, optional): Decimate the refined mesh to this many faces, 0 for all.
+                                          Defaults to RECONSTRUCTION_TARGET_FACES.
+            max_error (float, optional): Quadric error bound of the decimation.
+            preview_faces (int, optional): Also export a decimated preview model with this many
+                                           faces, 0 for none. Defaults to RECONSTRUCTION_PREVIEW_FACES.
+            texture_resolution (int, optional): Texture image size in texels. Defaults to TEXTURE_RESOLUTION.
+            force (bool): Run the pipeline even if a cached result matches.
+            model_id (str, optional): ID of a fast preview model to replace with the result.
+            candidates (str or list, optional): Meshing candidates, engine names or
+                                                'delaunay:<alpha scale>'. Each meshes a downsampled
+                                                proxy in parallel and only the best scoring one
+                                                meshes the full cloud; engine is then ignored.
+                                                Defaults to RECONSTRUCTION_CANDIDATES.
+            candidate_points (int, optional): Points kept for the candidates' proxy.
+                                              Defaults to RECONSTRUCTION_CANDIDATE_POINTS.
+
+        Returns:
+            str: The model ID; a cached result keeps its own ID and the fast preview is removed.
+        """
+        engine = engine or current_app.config.get('RECONSTRUCTION_ENGINE', 'auto')
+        shape_engines = current_app.config.get('RECONSTRUCTION_SHAPE_ENGINES')
+        if point_budget is None:
+            point_budget = current_app.config.get('RECONSTRUCTION_POINT_BUDGET', 0)
+        if tile_size is None:
+            tile_size = current_app.config.get('RECONSTRUCTION_TILE_SIZE', 0)
+        if tile_workers is None:
+            tile_workers = current_app.config.get('RECONSTRUCTION_TILE_WORKERS', 0)
+        if target_faces is None:
+            target_faces = current_app.config.get('RECONSTRUCTION_TARGET_FACES', 0)
+        if preview_faces is None:
+            preview_faces = current_app.config.get('RECONSTRUCTION_PREVIEW_FACES', 0)
+        if texture_resolution is None:
+            texture_resolution = current_app.config.get('TEXTURE_RESOLUTION', 1024)
+        if candidates is None:
+            candidates = current_app.config.get('RECONSTRUCTION_CANDIDATES', '')
+        if candidate_points is None:
+            candidate_points = current_app.config.get('RECONSTRUCTION_CANDIDATE_POINTS', 20000)
+        ReconstructionService.logger.info(f"Starting reconstruction for point cloud {point_cloud_id} (resume={resume}, engine={engine})")
 
         db = get_db()
         if db is None:
@@ -35,92 +115,191 @@ class ReconstructionService:
                 ReconstructionService.logger.error("Point cloud has no points data")
                 raise ValueError("Point cloud has no points data")
 
-            colors = point_cloud.get('colors')
-            # Generate colors if not present
-            if colors is None:
-                ReconstructionService.logger.info("Generating colors for point cloud")
-                colors = generate_colors(points, method='height')
+            # One float32 points array and one uint8 colors array are shared by every
+            # stage; the document's lists are dropped as soon as they are converted
+            points, colors = ReconstructionService.load_point_arrays(point_cloud)
+            normals = ReconstructionService.load_normal_array(point_cloud)
+
+            ReconstructionService.logger.info(f"Point cloud has {len(points)} points and {len(colors)} color values"
+                                              f"{'' if normals is None else ' with stored normals'}")
+
+            # Create a unique folder for this model, including the point cloud name
+            model_name, output_dir = ReconstructionService.get_model_location(point_cloud_id, point_cloud)
+            os.makedirs(output_dir, exist_ok=True)
+
+            if not os.access(output_dir, os.W_OK):
+                ReconstructionService.logger.error(f"No write permission for directory: {output_dir}")
+                raise PermissionError(f"No write permission for directory: {output_dir}")
+            stage_store = StageStore(output_dir, model_name)
+            skipped_stages = []
 
-            ReconstructionService.logger.info(f"Point cloud has {len(points)} points and {len(colors)} color values")
+            # Alpha estimation and color transfer on the full cloud share one spatial index,
+            # kept across calls for the same stored cloud
+            context = ReconstructionService.reconstruction_context(point_cloud_id, point_cloud, points)
+            points = context.points
 
             # Convert point cloud to mesh
-            ReconstructionService.logger.info("Converting point cloud to mesh")
-            pc_to_mesh = PointCloudToMesh()
+            pc_to_mesh = PointCloudToMesh(diagnostics=current_app.config.get('DIAGNOSTICS_LEVEL', 'production'))
             try:
-                pc_to_mesh.set_point_cloud(points)
-                mesh = pc_to_mesh.generate_mesh()
+                pc_to_mesh.set_point_cloud(points, normals, context=context)
+                candidates = pc_to_mesh.parse_candidates(candidates)
+                # With candidates the engine is only known once the proxy has been scored
+                engine = None if candidates else pc_to_mesh.resolve_engine(engine, shape_engines)
             except ValueError as e:
                 ReconstructionService.logger.error(f"Error generating mesh: {str(e)}")
                 raise ValueError(f"Failed to generate mesh: {str(e)}")
 
+            # The worker count does not change the result, so it is not part of the hashes
+            cache_key = content_hash(points, colors, normals, engine, candidates, candidate_points, point_budget, tile_size, target_faces, max_error,
+                                     preview_faces, texture_resolution, pipeline_version())
+            # Clouds with the same content still get models of their own
+            cached_model = ThreeDModel.get_by_cache_key(cache_key, point_cloud_id)
+            if cached_model is not None and not force and ReconstructionService.is_cached_result_intact(cached_model):
+                ReconstructionService.logger.info(f"Reusing cached reconstruction, model ID: {cached_model.id}")
+                if model_id and str(model_id) != str(cached_model.id):
+                    ReconstructionService.discard_fast_preview(model_id, delete_record=True)
+                return str(cached_model.id)
+
+            input_hash = content_hash(points, normals, engine, candidates, candidate_points, point_budget, tile_size)
+            mesh = stage_store.resume('stage_1_mesh', input_hash) if resume else None
+            candidate_scores = None
+            if mesh is not None:
+                skipped_stages.append('stage_1_mesh')
+            else:
+                ReconstructionService.logger.info(f"Converting point cloud to mesh with engine {engine}" if engine else
+                                                  f"Converting point cloud to mesh with the best of {len(candidates)} candidates")
+                try:
+                    pc_to_mesh.simplify(point_budget)
+                    engine_params = {}
+                    if candidates:
+                        engine_params, candidate_scores = pc_to_mesh.select_candidate(
+                            candidates, proxy_points=candidate_points)
+                        engine = engine_params.pop('engine')
+                    if tile_size:
+                        mesh = pc_to_mesh.generate_mesh_tiled(tile_size, workers=tile_workers, engine=engine,
+                                                              **engine_params)
+                    else:
+                        mesh = pc_to_mesh.generate_mesh(engine=engine, **engine_params)
+                except ValueError as e:
+                    ReconstructionService.logger.error(f"Error generating mesh: {str(e)}")
+                    raise ValueError(f"Failed to generate mesh: {str(e)}")
+                stage_store.save('stage_1_mesh', mesh, input_hash)
+
             # Refine the mesh
-            ReconstructionService.logger.info("Refining the generated mesh")
-            mesh_refiner = MeshRefiner(mesh)
-            try:
-                refined_mesh = mesh_refiner.refine()
-            except Exception as e:
-                ReconstructionService.logger.error(f"Error refining mesh: {str(e)}")
-                raise ValueError(f"Failed to refine mesh: {str(e)}")
+            stage_1_hash = stage_store.artifact_hash('stage_1_mesh')
+            input_hash = content_hash(stage_1_hash, target_faces, max_error) if stage_1_hash else None
+            refined_mesh = stage_store.resume('stage_2_refined_mesh', input_hash) if resume else None
+            refine_steps = None
+            if refined_mesh is not None:
+                skipped_stages.append('stage_2_refined_mesh')
+            else:
+                ReconstructionService.logger.info("Refining the generated mesh")
+                mesh_refiner = MeshRefiner(mesh)
+                try:
+                    refined_mesh = mesh_refiner.refine(target_faces=target_faces, max_error=max_error)
+                except Exception as e:
+                    ReconstructionService.logger.error(f"Error refining mesh: {str(e)}")
+                    raise ValueError(f"Failed to refine mesh: {str(e)}")
+                refine_steps = mesh_refiner.steps
+                # Saved before texturing, which adds point data to the same mesh
+                stage_store.save('stage_2_refined_mesh', refined_mesh, input_hash)
 
             # Apply textures
-            ReconstructionService.logger.info("Applying textures to mesh")
-            texture_mapper = TextureMapper()
-            try:
-                texture_mapper.load_mesh(refined_mesh)
-                texture_mapper.load_point_cloud_with_colors(points, colors)
-                texture_mapper.apply_texture()
-            except Exception as e:
-                ReconstructionService.logger.error(f"Error applying texture: {str(e)}")
-                raise ValueError(f"Failed to apply texture: {str(e)}")
-
-            # Create a unique folder for this model, including the point cloud name
-            point_cloud_name = point_cloud.get('name')
-            # Generate colors if not present
-            if point_cloud_name is None:
-                ReconstructionService.logger.error(f"Point cloud name: {point_cloud_id} not found")
-                raise ValueError("Point cloud name not found")
-            safe_name = ''.join(c if c.isalnum() else '_' for c in point_cloud_name)  # Sanitize the name
-            model_name = f"{safe_name}_{point_cloud_id}"
-            # output_dir = os.path.join('/app/outputs', model_name)
-            output_dir = os.path.join(current_app.config['MODELS_FOLDER'], model_name)
-            os.makedirs(output_dir, exist_ok=True)
-
-            if not os.access(output_dir, os.W_OK):
-                ReconstructionService.logger.error(f"No write permission for directory: {output_dir}")
-                raise PermissionError(f"No write permission for directory: {output_dir}")
+            stage_2_hash = stage_store.artifact_hash('stage_2_refined_mesh')
+            input_hash = content_hash(stage_2_hash, colors) if stage_2_hash else None
+            textured_mesh = stage_store.resume('stage_3_textured_mesh', input_hash) if resume else None
+            texture_mapper = TextureMapper(texture_resolution=texture_resolution)
+            if textured_mesh is not None:
+                skipped_stages.append('stage_3_textured_mesh')
+                texture_mapper.load_mesh(textured_mesh)
+            else:
+                ReconstructionService.logger.info("Applying textures to mesh")
+                try:
+                    texture_mapper.load_mesh(refined_mesh)
+                    texture_mapper.load_point_cloud_with_colors(points, colors, context=context)
+                    texture_mapper.apply_texture()
+                except Exception as e:
+                    ReconstructionService.logger.error(f"Error applying texture: {str(e)}")
+                    raise ValueError(f"Failed to apply texture: {str(e)}")
+                textured_mesh = texture_mapper.get_textured_mesh()
+                stage_store.save('stage_3_textured_mesh', textured_mesh, input_hash)
 
             # Define filenames
             obj_filename = os.path.join(output_dir, f"{model_name}.obj")
             mtl_filename = os.path.join(output_dir, f"{model_name}.mtl")
             texture_filename = os.path.join(output_dir, f"{model_name}.png")
+            glb_filename = os.path.join(output_dir, f"{model_name}.glb")
 
             # Convert to OBJ and save files
-            ReconstructionService.logger.info(f"Converting mesh to OBJ and saving files to {output_dir}")
-            textured_mesh = texture_mapper.get_textured_mesh()
-            obj_converter = MeshToOBJConverter(textured_mesh, texture_mapper)
-            try:
-                obj_converter.convert_and_save(obj_filename, texture_filename)
-                ReconstructionService.logger.info(f"OBJ file saved as {obj_filename}")
-                ReconstructionService.logger.info(f"Texture file saved as {texture_filename}")
-            except Exception as e:
-                ReconstructionService.logger.error(f"Error saving OBJ and texture files: {str(e)}")
-                raise ValueError(f"Failed to save OBJ and texture files: {str(e)}")
+            stage_3_hash = stage_store.artifact_hash('stage_3_textured_mesh')
+            input_hash = content_hash(stage_3_hash, texture_resolution) if stage_3_hash else None
+            # Checkpoints written before GLB export existed do not cover the GLB file
+            if resume and stage_store.is_valid('export', input_hash) and os.path.exists(glb_filename):
+                skipped_stages.append('export')
+            else:
+                ReconstructionService.logger.info(f"Converting mesh to OBJ and saving files to {output_dir}")
+                obj_converter = MeshToOBJConverter(textured_mesh, texture_mapper)
+                try:
+                    obj_converter.convert_and_save(obj_filename, texture_filename, glb_filename)
+                    ReconstructionService.logger.info(f"OBJ file saved as {obj_filename}")
+                    ReconstructionService.logger.info(f"Texture file saved as {texture_filename}")
+                except Exception as e:
+                    ReconstructionService.logger.error(f"Error saving OBJ and texture files: {str(e)}")
+                    raise ValueError(f"Failed to save OBJ and texture files: {str(e)}")
+                if input_hash is not None:
+                    stage_store.checkpoint('export', input_hash, [obj_filename, mtl_filename, texture_filename, glb_filename])
 
             # Verify that files were actually created
-            for filename in [obj_filename, mtl_filename, texture_filename]:
+            for filename in [obj_filename, mtl_filename, texture_filename, glb_filename]:
                 if not os.path.exists(filename):
                     ReconstructionService.logger.error(f"File not created: {filename}")
                     raise FileNotFoundError(f"File not created: {filename}")
 
+            report = {'status': 'complete', 'resumed': resume, 'skipped_stages': skipped_stages, 'engine': engine,
+                      'point_budget': point_budget, 'tile_size': tile_size, 'target_faces': target_faces,
+                      'max_error': max_error, 'faces': int(textured_mesh.n_cells),
+                      'cache_key': cache_key,
+                      'artifacts_hash': ReconstructionService.artifacts_hash(
+                          [obj_filename, mtl_filename, texture_filename, glb_filename])}
+            if refine_steps is not None:
+                report['refine_steps'] = refine_steps
+            if candidate_scores is not None:
+                report['candidate_scores'] = candidate_scores
+            if pc_to_mesh.mesh_quality is not None:
+                report['mesh_quality'] = pc_to_mesh.mesh_quality
+            if preview_faces and textured_mesh.n_cells > preview_faces:
+                # The preview is a convenience copy; the full-detail model does not depend on it
+                try:
+                    report['preview'] = ReconstructionService.export_preview(
+                        refined_mesh, points, colors, output_dir, model_name, preview_faces, texture_resolution,
+                        context=context)
+                except Exception as e:
+                    ReconstructionService.logger.warning(f"Could not export preview model: {str(e)}")
+
             # Create and save model metadata
             ReconstructionService.logger.info("Saving model metadata to database")
+            if skipped_stages:
+                ReconstructionService.logger.info(f"Resumed from checkpoints, skipped stages: {skipped_stages}")
+            # A resumed run updates the model record of the earlier attempt, if it got that far;
+            # a forced or stale cached result is replaced by this run, and so is a fast preview
+            existing_model = ThreeDModel.get_by_name(model_name) if resume else cached_model
+            if existing_model is not None and str(existing_model.point_cloud_id) != str(point_cloud_id):
+                existing_model = None
+            if model_id:
+                ReconstructionService.discard_fast_preview(model_id)
+                # The earlier record of this folder would otherwise point at the files written here
+                if existing_model is not None and str(existing_model.id) != str(model_id):
+                    ThreeDModel.delete(existing_model.id)
             model = ThreeDModel(
                 name=model_name,
                 folder_path=output_dir,
                 point_cloud_id=point_cloud_id,
                 obj_file=obj_filename,
                 mtl_file=mtl_filename, # this is null currently
-                texture_file=texture_filename
+                texture_file=texture_filename,
+                id=model_id or (existing_model.id if existing_model else None),
+                report=report,
+                glb_file=glb_filename
             )
             model_id = model.save()
 
@@ -133,7 +312,150 @@ class ReconstructionService:
 
 
     @staticmethod
-    def get_reconstruction_stages(point_cloud_id):
+    def start_fast_preview(point_cloud_id, preview_points=None):
+        """
+        Save a coarse, vertex-colored preview model of a point cloud in about a second.
+
+        The preview is an alpha shape of the cloud simplified to ``preview_points``
+        points, colored per vertex instead of with a baked texture, and exported
+        as GLB only. Its model record has report status 'preview' until
+        start_reconstruction is run with its ``model_id`` and replaces it.
+
+        Args:
+            point_cloud_id (str): The point cloud ID.
+            preview_points (int, optional): Points kept for meshing.
+                                            Defaults to RECONSTRUCTION_FAST_PREVIEW_POINTS.
+
+        Returns:
+            str: The preview model ID.
+        """
+        if preview_points is None:
+            preview_points = current_app.config.get('RECONSTRUCTION_FAST_PREVIEW_POINTS', 5000)
+        ReconstructionService.logger.info(f"Starting fast preview for point cloud {point_cloud_id} ({preview_points} points)")
+        start = time.perf_counter()
+
+        db = get_db()
+        if db is None:
+            ReconstructionService.logger.error("Database connection is None")
+            raise ValueError("Database connection failed")
+
+        point_cloud = db.point_clouds.find_one({'_id': ObjectId(point_cloud_id)})
+        if not point_cloud:
+            ReconstructionService.logger.error(f"Point cloud {point_cloud_id} not found")
+            raise ValueError("Point cloud not found")
+        if not point_cloud.get('points'):
+            ReconstructionService.logger.error("Point cloud has no points data")
+            raise ValueError("Point cloud has no points data")
+        points, colors = ReconstructionService.load_point_arrays(point_cloud)
+
+        model_name, output_dir = ReconstructionService.get_model_location(point_cloud_id, point_cloud)
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            preview_mesh = ReconstructionService.build_fast_preview_mesh(points, colors, preview_points)
+        except ValueError as e:
+            ReconstructionService.logger.error(f"Error generating preview mesh: {str(e)}")
+            raise ValueError(f"Failed to generate preview mesh: {str(e)}")
+
+        glb_filename = os.path.join(output_dir, f"{model_name}_fast_preview.glb")
+        MeshToOBJConverter(preview_mesh, None).convert_to_vertex_color_glb(glb_filename)
+
+        report = {'status': 'preview', 'points': int(preview_mesh.n_points), 'faces': int(preview_mesh.n_cells),
+                  'seconds': round(time.perf_counter() - start, 3)}
+        model = ThreeDModel(
+            name=model_name,
+            folder_path=output_dir,
+            point_cloud_id=point_cloud_id,
+            obj_file=None,
+            mtl_file=None,
+            texture_file=None,
+            report=report,
+            glb_file=glb_filename
+        )
+        model_id = model.save()
+        ReconstructionService.logger.info(f"Fast preview saved in {report['seconds']}s. Model ID: {model_id}")
+        return str(model_id)
+
+    @staticmethod
+    def build_fast_preview_mesh(points, colors, preview_points):
+        """
+        Mesh an alpha shape of a simplified cloud and color its vertices from the nearest points.
+
+        Clouds much larger than the preview are first thinned by striding, which
+        keeps the voxel simplification and the color lookup index small.
+
+        Args:
+            points (numpy.ndarray): Nx3 point coordinates.
+            colors (numpy.ndarray): Nx3 uint8 point colors.
+            preview_points (int): Points kept for meshing.
+
+        Returns:
+            pyvista.PolyData: The preview surface with uint8 'RGB' point data.
+        """
+        stride = max(1, len(points) // (ReconstructionService.FAST_PREVIEW_SAMPLE_FACTOR * preview_points))
+        sample, sample_colors = points[::stride], colors[::stride]
+
+        # Quality statistics of a throwaway preview are never worth a pass over its cells
+        pc_to_mesh = PointCloudToMesh(diagnostics='production')
+        pc_to_mesh.set_point_cloud(sample)
+        pc_to_mesh.simplify(preview_points)
+        preview_mesh = pc_to_mesh.generate_mesh(engine='delaunay')
+
+        _, indices = ReconstructionContext(sample).query(preview_mesh.points)
+        preview_mesh.point_data['RGB'] = sample_colors[indices]
+        return preview_mesh
+
+    @staticmethod
+    def discard_fast_preview(model_id, delete_record=False):
+        """
+        Remove the GLB file of a fast preview model, and optionally its record.
+
+        Models that are no longer previews are left untouched.
+
+        Args:
+            model_id (str): The preview model ID.
+            delete_record (bool): Also delete the model record.
+        """
+        model = ThreeDModel.get_by_id(model_id)
+        if model is None or model.report.get('status') != 'preview':
+            return
+        if model.glb_file and os.path.exists(model.glb_file):
+            os.remove(model.glb_file)
+        if delete_record:
+            ThreeDModel.delete(model_id)
+
+    @staticmethod
+    def mark_fast_preview_failed(model_id, error):
+        """
+        Record on a fast preview model that the reconstruction meant to replace it failed.
+
+        The preview GLB is kept so the browser can still show it. Models that
+        are no longer previews are left untouched.
+
+        Args:
+            model_id (str): The preview model ID.
+            error (str): The reconstruction error.
+        """
+        model = ThreeDModel.get_by_id(model_id)
+        if model is None or model.report.get('status') != 'preview':
+            return
+        model.report.update({'status': 'preview_failed', 'error': error})
+        model.save()
+
+    @staticmethod
+    def get_reconstruction_stages(point_cloud_id, target_faces=None, max_error=None):
+        """
+        Get the stage meshes of a point cloud's reconstruction, for display.
+
+        Args:
+            point_cloud_id (str): The point cloud ID.
+            target_faces (int, optional): Decimation budget of a recomputed stage 2; defaults
+                                          to that of the cloud's model, then RECONSTRUCTION_TARGET_FACES.
+            max_error (float, optional): Quadric error bound of that decimation; defaults to
+                                         that of the cloud's model.
+
+        Returns:
+            dict: The serialized points and stage meshes.
+        """
         ReconstructionService.logger.info(f"Getting reconstruction stages for point cloud {point_cloud_id}")
 
         db = get_db()
@@ -148,40 +470,74 @@ class ReconstructionService:
                 raise ValueError("Point cloud not found")
 
             ReconstructionService.logger.info(f"Point cloud retrieved: {point_cloud.get('name')}")
-            points = point_cloud.get('points')
-            if not points:
+            if not point_cloud.get('points'):
                 raise ValueError("Point cloud has no points data")
-
-            colors = point_cloud.get('colors')
-            if colors is None:
-                ReconstructionService.logger.info("Generating colors for point cloud")
-                colors = generate_colors(points, method='height')
+            points, colors = ReconstructionService.load_point_arrays(point_cloud)
+            context = ReconstructionService.reconstruction_context(point_cloud_id, point_cloud, points)
+            points = context.points
 
             # Stage 0: Original point cloud
             stage_0 = ReconstructionService.serialize_points(points, colors)
             ReconstructionService.logger.info(f"Stage 0 completed: {len(points)} points")
 
-            # Stage 1: Generate mesh
-            ReconstructionService.logger.info("Starting Stage 1: Generate mesh")
-            pc_to_mesh = PointCloudToMesh()
-            pc_to_mesh.set_point_cloud(points)
-            stage_1 = pc_to_mesh.generate_mesh()
-            ReconstructionService.logger.info(f"Stage 1 completed: Mesh generated with {stage_1.n_points} points and {stage_1.n_cells} cells")
-
-            # Stage 2: Refine mesh
-            ReconstructionService.logger.info("Starting Stage 2: Refine mesh")
-            mesh_refiner = MeshRefiner(stage_1)
-            stage_2 = mesh_refiner.refine()
-            ReconstructionService.logger.info(f"Stage 2 completed: Refined mesh with {stage_2.n_points} points and {stage_2.n_cells} cells")
-
-            # Stage 3: Apply texture
-            ReconstructionService.logger.info("Starting Stage 3: Apply texture")
-            texture_mapper = TextureMapper()
-            texture_mapper.load_mesh(stage_2)
-            texture_mapper.load_point_cloud_with_colors(points, colors)
-            texture_mapper.apply_texture()
-            stage_3 = texture_mapper.get_textured_mesh()
-            ReconstructionService.logger.info("Stage 3 completed: Texture applied")
+            # Stages 1-3 are served from the artifacts saved by start_reconstruction;
+            # only missing ones are recomputed, from the previous stage. Recomputed
+            # stages are not saved: only start_reconstruction knows their input hashes,
+            # and replacing an artifact would invalidate the checkpoints built on it
+            model_name, output_dir = ReconstructionService.get_model_location(point_cloud_id, point_cloud)
+            stage_store = StageStore(output_dir, model_name)
+            stage_1, stage_2, stage_3 = (stage_store.load(stage) for stage in StageStore.STAGES)
+            recomputed = []
+
+            if stage_1 is None:
+                ReconstructionService.logger.info("Starting Stage 1: Generate mesh")
+                pc_to_mesh = PointCloudToMesh(diagnostics=current_app.config.get('DIAGNOSTICS_LEVEL', 'production'))
+                pc_to_mesh.set_point_cloud(points, ReconstructionService.load_normal_array(point_cloud), context=context)
+                pc_to_mesh.simplify(current_app.config.get('RECONSTRUCTION_POINT_BUDGET', 0))
+                engine = current_app.config.get('RECONSTRUCTION_ENGINE', 'auto')
+                shape_engines = current_app.config.get('RECONSTRUCTION_SHAPE_ENGINES')
+                tile_size = current_app.config.get('RECONSTRUCTION_TILE_SIZE', 0)
+                engine_params = {}
+                if current_app.config.get('RECONSTRUCTION_CANDIDATES'):
+                    engine_params, _ = pc_to_mesh.select_candidate(
+                        current_app.config['RECONSTRUCTION_CANDIDATES'],
+                        proxy_points=current_app.config.get('RECONSTRUCTION_CANDIDATE_POINTS', 20000))
+                    engine = engine_params.pop('engine')
+                if tile_size:
+                    stage_1 = pc_to_mesh.generate_mesh_tiled(
+                        tile_size, workers=current_app.config.get('RECONSTRUCTION_TILE_WORKERS', 0),
+                        engine=engine, shape_engines=shape_engines, **engine_params)
+                else:
+                    stage_1 = pc_to_mesh.generate_mesh(engine=engine, shape_engines=shape_engines, **engine_params)
+                recomputed.append('stage_1_mesh')
+            ReconstructionService.logger.info(f"Stage 1: Mesh with {stage_1.n_points} points and {stage_1.n_cells} cells")
+
+            if stage_2 is None:
+                ReconstructionService.logger.info("Starting Stage 2: Refine mesh")
+                # Decimate as the stored model was, so the stage matches it
+                model = ThreeDModel.get_by_name(model_name)
+                report = model.report if model is not None and str(model.point_cloud_id) == str(point_cloud_id) else {}
+                if target_faces is None:
+                    target_faces = report.get('target_faces', current_app.config.get('RECONSTRUCTION_TARGET_FACES', 0))
+                if max_error is None:
+                    max_error = report.get('max_error')
+                mesh_refiner = MeshRefiner(stage_1.copy())
+                stage_2 = mesh_refiner.refine(target_faces=target_faces, max_error=max_error)
+                recomputed.append('stage_2_refined_mesh')
+            ReconstructionService.logger.info(f"Stage 2: Refined mesh with {stage_2.n_points} points and {stage_2.n_cells} cells")
+
+            if stage_3 is None:
+                ReconstructionService.logger.info("Starting Stage 3: Apply texture")
+                texture_mapper = TextureMapper()
+                texture_mapper.load_mesh(stage_2.copy())
+                texture_mapper.load_point_cloud_with_colors(points, colors, context=context)
+                texture_mapper.apply_texture()
+                stage_3 = texture_mapper.get_textured_mesh()
+                recomputed.append('stage_3_textured_mesh')
+            ReconstructionService.logger.info("Stage 3: Texture applied")
+
+            if recomputed:
+                ReconstructionService.logger.info(f"Recomputed missing stages: {recomputed}")
 
             return {
                 'stage_0_points': stage_0,
@@ -194,6 +550,159 @@ class ReconstructionService:
             ReconstructionService.logger.error(f"Error getting reconstruction stages: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    def export_preview(refined_mesh, points, colors, output_dir, model_name, preview_faces, texture_resolution=1024,
+                       context=None):
+        """
+        Export a decimated, textured preview model next to the full-detail one.
+
+        Args:
+            refined_mesh (pyvista.PolyData): The full-detail refined mesh; it is not modified.
+            points (list or numpy.ndarray): The point cloud the colors are taken from.
+            colors (list or numpy.ndarray): The point colors.
+            output_dir (str): The model folder.
+            model_name (str): The model name.
+            preview_faces (int): Target face count of the preview.
+            texture_resolution (int): Texture image size of the preview in texels.
+            context (ReconstructionContext, optional): Spatial index context of the points.
+
+        Returns:
+            dict: The preview 'obj_file', 'mtl_file', 'texture_file' and 'faces'.
+        """
+        ReconstructionService.logger.info(f"Exporting preview model with about {preview_faces} faces")
+        mesh_refiner = MeshRefiner(refined_mesh.copy(deep=True))
+        preview_mesh = mesh_refiner.decimate(target_faces=preview_faces)
+        texture_mapper = TextureMapper(texture_resolution=texture_resolution)
+        texture_mapper.load_mesh(preview_mesh)
+        texture_mapper.load_point_cloud_with_colors(points, colors, context=context)
+        texture_mapper.apply_texture()
+        preview_mesh = texture_mapper.get_textured_mesh()
+
+        obj_filename = os.path.join(output_dir, f"{model_name}_preview.obj")
+        texture_filename = os.path.join(output_dir, f"{model_name}_preview.png")
+        MeshToOBJConverter(preview_mesh, texture_mapper).convert_and_save(obj_filename, texture_filename)
+        return {
+            'obj_file': obj_filename,
+            'mtl_file': os.path.join(output_dir, f"{model_name}_preview.mtl"),
+            'texture_file': texture_filename,
+            'faces': int(preview_mesh.n_cells),
+        }
+
+    @staticmethod
+    def artifacts_hash(filenames):
+        """Content hash over the files of an exported model, or None if a file cannot be read."""
+        try:
+            return content_hash(*[file_hash(filename) for filename in filenames])
+        except OSError as e:
+            ReconstructionService.logger.warning(f"Could not hash model files: {str(e)}")
+            return None
+
+    @staticmethod
+    def is_cached_result_intact(model):
+        """
+        Check that the files of a cached model still exist unchanged.
+
+        Later reconstructions of the same point cloud write to the same folder,
+        so a cached result is only reusable while its files are the ones it exported.
+
+        Args:
+            model (ThreeDModel): The cached model.
+
+        Returns:
+            bool: True if every exported file matches the model's artifacts hash.
+        """
+        filenames = [model.obj_file, model.mtl_file, model.texture_file, model.glb_file]
+        if not all(filename and os.path.isfile(filename) for filename in filenames):
+            ReconstructionService.logger.info(f"Cached model {model.id} is missing files")
+            return False
+        expected = model.report.get('artifacts_hash')
+        if expected is None or ReconstructionService.artifacts_hash(filenames) != expected:
+            ReconstructionService.logger.info(f"Cached model {model.id} files were overwritten")
+            return False
+        return True
+
+    @staticmethod
+    def load_point_arrays(point_cloud):
+        """
+        Convert a point cloud document to the arrays used by the reconstruction stages.
+
+        The 'points' and 'colors' lists are removed from the document once converted,
+        so the Python lists can be freed before meshing. Missing colors are generated
+        from the point heights.
+
+        Args:
+            point_cloud (dict): The point cloud document.
+
+        Returns:
+            tuple: (points, colors) as Nx3 float32 and Nx3 uint8 arrays.
+        """
+        points = as_point_array(point_cloud.pop('points'))
+        colors = point_cloud.pop('colors', None)
+        if colors is None:
+            ReconstructionService.logger.info("Generating colors for point cloud")
+            return points, as_color_array(generate_colors(points, method='height'), scale=1.0)
+        # Documents store colors in [0, 255], possibly as floats
+        return points, as_color_array(colors, scale=255)
+
+    @staticmethod
+    def reconstruction_context(point_cloud_id, point_cloud, points):
+        """
+        Get the spatial index context of a stored point cloud.
+
+        Contexts are cached by the point cloud ID and its timestamp, so the
+        cloud is indexed once across repeated reconstructions without hashing
+        its points.
+
+        Args:
+            point_cloud_id (str): The point cloud ID.
+            point_cloud (dict): The point cloud document.
+            points (np.ndarray): Nx3 float32 points loaded from the document.
+
+        Returns:
+            ReconstructionContext: The context; use its ``points`` as the shared points array.
+        """
+        return ReconstructionContext.cached((str(point_cloud_id), point_cloud.get('timestamp')), points)
+
+    @staticmethod
+    def load_normal_array(point_cloud):
+        """
+        Unpack the normals stored with a point cloud document.
+
+        The packed 'normals' field is removed from the document once converted.
+
+        Args:
+            point_cloud (dict): The point cloud document.
+
+        Returns:
+            numpy.ndarray: Nx3 float32 unit normals, or None if the point cloud has none.
+        """
+        normals = point_cloud.pop('normals', None)
+        return PointCloud.unpack_normals(normals) if normals is not None else None
+
+    @staticmethod
+    def get_model_location(point_cloud_id, point_cloud):
+        """
+        Get the model name and output folder of a point cloud's reconstruction.
+
+        Args:
+            point_cloud_id (str): The point cloud ID.
+            point_cloud (dict): The point cloud document.
+
+        Returns:
+            tuple: (model_name, output_dir).
+
+        Raises:
+            ValueError: If the point cloud has no name.
+        """
+        point_cloud_name = point_cloud.get('name')
+        if point_cloud_name is None:
+            ReconstructionService.logger.error(f"Point cloud name: {point_cloud_id} not found")
+            raise ValueError("Point cloud name not found")
+        safe_name = ''.join(c if c.isalnum() else '_' for c in point_cloud_name)  # Sanitize the name
+        model_name = f"{safe_name}_{point_cloud_id}"
+        output_dir = os.path.join(current_app.config['MODELS_FOLDER'], model_name)
+        return model_name, output_dir
+
     @staticmethod
     def serialize_points(points, colors):
         return {
@@ -0,0 +1,246 @@
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+from app.config import Config
+
+try:
+    import cv2
+except ImportError:  # OpenCV is only needed for video frame extraction
+    cv2 = None
+
+try:
+    from threadpoolctl import threadpool_info, threadpool_limits
+except ImportError:
+    threadpool_info = threadpool_limits = None
+
+try:
+    from vtkmodules.vtkCommonCore import vtkSMPTools
+except ImportError:
+    vtkSMPTools = None
+
+
+class ThreadBudget:
+    """
+    Splits the machine's cores between concurrently running jobs.
+
+    Open3D, VTK's SMP backend, the BLAS/OpenMP pools under numpy/scipy and
+    OpenCV each size their thread pool to every core, so a few concurrent
+    preprocess/reconstruct jobs oversubscribe the machine. A job wrapped in
+    ``allocate`` gets an even share of the cores, and the shares of all
+    running jobs are rebalanced whenever a job starts or ends. Each job's
+    thread is pinned to its cores, which is exact per job; threads the job
+    starts inherit the mask when they are created.
+
+    The VTK, OpenCV and BLAS/OpenMP thread counts are process wide, not per
+    job, so they are best-effort: they are set, under the lock, to the
+    smallest allotment of the running jobs and restored to their original
+    values when the last job ends.
+
+    Open3D has no thread count setting of its own; its parallel loops run on
+    OpenMP, so it is limited through the OpenMP runtime it loads. Each
+    allocation lists 'open3d' under ``controls`` only when such a runtime was
+    found by threadpoolctl, and under ``unlimited`` otherwise, together with
+    any other library whose thread count could not be set.
+    """
+
+    _lock = threading.Lock()
+    _local = threading.local()
+    _allocations: Dict[str, Dict[str, Any]] = {}
+    _completed: Dict[str, int] = {}
+    # Library thread counts from before the first running job, restored after the last one
+    _library_defaults: Dict[str, Any] = {}
+
+    @staticmethod
+    def available_cores() -> List[int]:
+        """Cores this process may run on (the main thread's mask, not a pinned job's)."""
+        if hasattr(os, 'sched_getaffinity'):
+            return sorted(os.sched_getaffinity(os.getpid()))
+        return list(range(os.cpu_count() or 1))
+
+    @classmethod
+    def threads(cls) -> int:
+        """Thread count currently allotted to the calling thread's job, or all cores outside a job."""
+        allocation = getattr(cls._local, 'allocation', None)
+        return allocation['threads'] if allocation else len(cls.available_cores())
+
+    @classmethod
+    def _rebalance(cls):
+        """Split the cores evenly between the running jobs, in disjoint blocks while there are enough cores."""
+        cores = cls.available_cores()
+        allocations = list(cls._allocations.values())
+        if not allocations:
+            return
+        share = max(1, len(cores) // len(allocations))
+        for index, allocation in enumerate(allocations):
+            job_share = share
+            for cap in (allocation['max_cores'], Config.THREAD_BUDGET_MAX_CORES_PER_JOB):
+                if cap:
+                    job_share = min(job_share, cap)
+            start = index * share % len(cores)
+            allocation['cores'] = sorted(cores[(start + offset) % len(cores)] for offset in range(job_share))
+            allocation['threads'] = len(allocation['cores'])
+
+    @classmethod
+    @contextmanager
+    def allocate(cls, job_id: str, kind: str, max_cores: int = None):
+        """
+        Run the enclosed block within a core allotment.
+
+        The allotment shrinks when other jobs start and grows back when they
+        end; ``threads()`` always returns its current size.
+
+        Args:
+            job_id (str): Identifier of the job, shown in the metrics.
+            kind (str): Job type, e.g. 'preprocess' or 'reconstruct'.
+            max_cores (int, optional): Upper bound on the allotment.
+
+        Yields:
+            dict: The allocation (cores, threads, applied controls).
+        """
+        previous_allocation = getattr(cls._local, 'allocation', None)
+        previous_affinity = os.sched_getaffinity(0) if hasattr(os, 'sched_setaffinity') else None
+        allocation = {
+            'job_id': job_id,
+            'kind': kind,
+            'cores': [],
+            'threads': 0,
+            'max_cores': max_cores,
+            'native_id': threading.get_native_id(),
+            'start_time': time.time(),
+            'controls': [],
+            'unlimited': [],
+        }
+        with cls._lock:
+            cls._allocations[job_id] = allocation
+            cls._rebalance()
+            cls._apply_limits()
+        cls._local.allocation = allocation
+        try:
+            logging.info(f"Job {job_id} ({kind}) runs on cores {allocation['cores']}")
+            yield allocation
+        finally:
+            cls._local.allocation = previous_allocation
+            with cls._lock:
+                cls._allocations.pop(job_id, None)
+                cls._completed[kind] = cls._completed.get(kind, 0) + 1
+                if previous_allocation is None and previous_affinity is not None:
+                    os.sched_setaffinity(0, previous_affinity)
+                cls._rebalance()
+                cls._apply_limits()
+
+    @classmethod
+    def _apply_limits(cls):
+        """Pin every running job's thread to its cores and set the library thread counts (lock held)."""
+        allocations = list(cls._allocations.values())
+        for allocation in allocations:
+            if hasattr(os, 'sched_setaffinity'):
+                try:
+                    os.sched_setaffinity(allocation['native_id'], allocation['cores'])
+                    allocation['controls'] = ['affinity']
+                except OSError:
+                    # The job's thread has already ended
+                    allocation['controls'] = []
+        if not allocations:
+            cls._restore_library_defaults()
+            return
+
+        threads = min(allocation['threads'] for allocation in allocations)
+        controls, unlimited = [], []
+        if vtkSMPTools is not None:
+            cls._library_defaults.setdefault('vtk_smp', vtkSMPTools.GetEstimatedNumberOfThreads())
+            vtkSMPTools.Initialize(threads)
+            controls.append('vtk_smp')
+        else:
+            unlimited.append('vtk_smp')
+        if cv2 is not None:
+            cls._library_defaults.setdefault('opencv', cv2.getNumThreads())
+            cv2.setNumThreads(threads)
+            controls.append('opencv')
+        else:
+            unlimited.append('opencv')
+        if threadpool_limits is not None:
+            # The first limiter remembers the original limits of every pool
+            limiter = threadpool_limits(limits=threads)
+            cls._library_defaults.setdefault('blas_openmp', limiter)
+            controls.append('blas_openmp')
+        else:
+            unlimited.append('blas_openmp')
+        if cls._open3d_openmp_loaded():
+            controls.append('open3d')
+        else:
+            unlimited.append('open3d')
+        for allocation in allocations:
+            allocation['controls'] += controls
+            allocation['unlimited'] = unlimited
+
+    @staticmethod
+    def _open3d_openmp_loaded() -> bool:
+        """
+        Whether Open3D is loaded together with an OpenMP runtime that threadpoolctl limits.
+
+        Open3D wheels either bundle their OpenMP runtime or link the system
+        one; a runtime bundled with another package (e.g. torch) does not count.
+        """
+        open3d = sys.modules.get('open3d')
+        if threadpool_info is None or open3d is None:
+            return False
+        package_dir = os.path.dirname(getattr(open3d, '__file__', None) or '')
+        for pool in threadpool_info():
+            if pool.get('user_api') != 'openmp':
+                continue
+            filepath = pool.get('filepath', '')
+            if (package_dir and filepath.startswith(package_dir)) or 'site-packages' not in filepath:
+                return True
+        return False
+
+    @classmethod
+    def _restore_library_defaults(cls):
+        """Give the library thread pools back the sizes they had before the first job (lock held)."""
+        defaults, cls._library_defaults = cls._library_defaults, {}
+        if 'vtk_smp' in defaults:
+            vtkSMPTools.Initialize(defaults['vtk_smp'])
+        if 'opencv' in defaults:
+            cv2.setNumThreads(defaults['opencv'])
+        if 'blas_openmp' in defaults:
+            defaults['blas_openmp'].restore_original_limits()
+
+    @staticmethod
+    def limit_process_threads(threads: int):
+        """
+        Set the library thread counts of a whole worker process, for its lifetime.
+
+        Used as the initializer of the worker pools a job starts, so that its
+        workers share the job's allotment instead of each sizing to every core.
+        """
+        if vtkSMPTools is not None:
+            vtkSMPTools.Initialize(threads)
+        if cv2 is not None:
+            cv2.setNumThreads(threads)
+        if threadpool_limits is not None:
+            threadpool_limits(limits=threads)
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Any]:
+        """Current allocations, for the metrics endpoint."""
+        cores = cls.available_cores()
+        with cls._lock:
+            active = [dict(allocation) for allocation in cls._allocations.values()]
+            completed = dict(cls._completed)
+        allocated = sorted({core for allocation in active for core in allocation['cores']})
+        now = time.time()
+        for allocation in active:
+            allocation['running_seconds'] = round(now - allocation.pop('start_time'), 2)
+            allocation.pop('native_id', None)
+        return {
+            'total_cores': len(cores),
+            'allocated_cores': allocated,
+            'oversubscription': round(sum(a['threads'] for a in active) / len(cores), 2),
+            'max_cores_per_job': Config.THREAD_BUDGET_MAX_CORES_PER_JOB,
+            'active_jobs': active,
+            'completed_jobs': completed,
+        }
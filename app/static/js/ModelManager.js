@@ -89,7 +89,7 @@ class ModelManager {
         try {
 
             const modelDetails = await this.apiService.get(`/models/${id}`);
-            const { obj_file, mtl_file, texture_file, point_cloud_id } = modelDetails;
+            const { obj_file, mtl_file, texture_file, glb_file, point_cloud_id } = modelDetails;
 
             const viewerContainer = document.getElementById('modelViewer');
             viewerContainer.innerHTML = '';
@@ -113,7 +113,7 @@ class ModelManager {
             }
 
             window.currentModelViewer = new ModelViewer('modelViewer');
-            await window.currentModelViewer.loadModel(id, obj_file, mtl_file, texture_file);
+            await window.currentModelViewer.loadModel(id, obj_file, mtl_file, texture_file, glb_file);
 
             // Switch to the ModelTab
             const modelTab = document.querySelector('[data-tab="ModelTab"]');
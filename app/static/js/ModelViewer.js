@@ -1,6 +1,7 @@
 import * as THREE from 'three';
 import { MTLLoader } from 'three/addons/loaders/MTLLoader.js';
 import { OBJLoader } from 'three/addons/loaders/OBJLoader.js';
+import { GLTFLoader } from 'three/addons/loaders/GLTFLoader.js';
 import { OrbitControls } from 'three/addons/controls/OrbitControls.js';
 
 class ModelViewer {
@@ -77,8 +78,14 @@ class ModelViewer {
         this.scene.add(this.grid);
     }
 
-    async loadModel(modelId, objFile, mtlFile, textureFile) {
-        console.log('Loading model:', { modelId, objFile, mtlFile, textureFile });
+    async loadModel(modelId, objFile, mtlFile, textureFile, glbFile) {
+        console.log('Loading model:', { modelId, objFile, mtlFile, textureFile, glbFile });
+        if (glbFile) {
+            // Mesh, UVs and texture arrive in one binary response
+            const gltf = await new GLTFLoader().loadAsync(`/api/models/${modelId}/glb`);
+            this.showObject(gltf.scene);
+            return;
+        }
         const mtlLoader = new MTLLoader();
         const objLoader = new OBJLoader();
         const textureLoader = new THREE.TextureLoader();
@@ -106,25 +113,29 @@ class ModelViewer {
                 }
             });
 
-            if (this.loadedObject) {
-                this.scene.remove(this.loadedObject);
-            }
-            this.loadedObject = object;
-
-            this.centerModel();
-
-            this.scene.add(object);
-            console.log('Object added to scene');
-
-            this.resetCamera();
-            this.controls.update();
-            console.log('Camera and controls updated');
+            this.showObject(object);
         } catch (error) {
             console.error('Error loading 3D model:', error);
             throw error;
         }
     }
 
+    showObject(object) {
+        if (this.loadedObject) {
+            this.scene.remove(this.loadedObject);
+        }
+        this.loadedObject = object;
+
+        this.centerModel();
+
+        this.scene.add(object);
+        console.log('Object added to scene');
+
+        this.resetCamera();
+        this.controls.update();
+        console.log('Camera and controls updated');
+    }
+
     centerModel() {
         if (this.loadedObject) {
             const box = new THREE.Box3().setFromObject(this.loadedObject);
@@ -157,13 +157,27 @@ class PointCloudManager {
 
     async reconstructPointCloud(id) {
         try {
-            const response = await this.apiService.post(`/reconstruct/${id}`);
-            this.notificationSystem.show(`Reconstruction completed. Model ID: ${response.model_id}`, 'success');
+            // A coarse preview model is ready at once; the full model replaces it under the same ID
+            const response = await this.apiService.post(`/reconstruct/${id}?fast_preview=true`);
+            this.notificationSystem.show(`Preview ready, reconstructing in the background. Model ID: ${response.model_id}`, 'info');
+            if (window.modelManager) window.modelManager.listModels();
+            const result = await this.pollReconstructionStatus(response.task_id);
+            this.notificationSystem.show(`Reconstruction completed. Model ID: ${result.model_id}`, 'success');
+            if (window.modelManager) window.modelManager.listModels();
         } catch (error) {
             this.notificationSystem.show('Error starting reconstruction: ' + error.message, 'error');
         }
     }
 
+    async pollReconstructionStatus(taskId, interval = 3000) {
+        while (true) {
+            const statusResponse = await this.apiService.get(`/reconstruct/status/${taskId}`);
+            if (statusResponse.status === 'SUCCESS') return statusResponse.result;
+            if (statusResponse.status === 'ERROR') throw new Error(statusResponse.error || 'Reconstruction failed');
+            await new Promise(resolve => setTimeout(resolve, interval));
+        }
+    }
+
      async visualizePointCloud(id) {
             try {
                 const pointCloudDetails = await this.apiService.get(`/point_clouds/${id}`);
@@ -0,0 +1,129 @@
+import numpy as np
+import open3d as o3d
+import pytest
+from app.preprocess.ply_preprocess import PLYProcessor
+
+
+@pytest.fixture
+def cup_on_table():
+    """Fixture to provide an open-bottomed cylinder standing on a table plane."""
+    # Plane segmentation samples with Open3D's own generator
+    o3d.utility.random.seed(0)
+    rng = np.random.default_rng(0)
+    angles = rng.uniform(0, 2 * np.pi, 6000)
+    heights = rng.uniform(0.0, 0.1, 6000)
+    wall = np.stack([0.05 * np.cos(angles), heights, 0.05 * np.sin(angles)], axis=1)
+    table = np.stack([rng.uniform(-0.2, 0.2, 4000), np.zeros(4000), rng.uniform(-0.2, 0.2, 4000)], axis=1)
+
+    scene = o3d.geometry.PointCloud()
+    scene.points = o3d.utility.Vector3dVector(np.vstack([wall, table]))
+    cup = o3d.geometry.PointCloud()
+    cup.points = o3d.utility.Vector3dVector(wall)
+    cup.paint_uniform_color([0.2, 0.4, 0.6])
+    return scene, cup
+
+
+def test_raster_bottom_fills_footprint_on_support_plane(cup_on_table):
+    """
+    Scenario: Complete the bottom with the raster method
+        Given I have a cylinder standing on a detected support plane
+        When I complete its bottom with the raster method
+        Then the bottom should be a grid filling the disc footprint on the support plane
+    """
+    scene, cup = cup_on_table
+    processor = PLYProcessor(None, 'test')
+    processor.main_object = cup
+    processor.segment_plane(scene, distance_threshold=0.002, ransac_n=3, num_iterations=200)
+    normal = processor.support_plane[:3] / np.linalg.norm(processor.support_plane[:3])
+    assert np.arccos(np.clip(normal[1], -1, 1)) < 1e-2
+
+    complete, bottom = processor.complete_bottom(cup, resolution=0.005, method='raster')
+    bottom_points = np.asarray(bottom.points)
+
+    disc_cells = np.pi * 0.05 ** 2 / 0.005 ** 2
+    assert 0.8 * disc_cells < len(bottom_points) < 1.3 * disc_cells
+    assert np.ptp(bottom_points @ normal) < 1e-3
+    assert np.linalg.norm(bottom_points[:, [0, 2]], axis=1).max() < 0.06
+    assert len(complete.points) == len(cup.points) + len(bottom_points)
+    assert processor.bottom_completion['method'] == 'raster'
+
+
+def test_raster_bottom_lies_on_the_plane_below_a_raised_object(cup_on_table):
+    """
+    Scenario: Complete the bottom of an object whose lowest point is above the support plane
+        Given I have a cylinder whose scanned wall stops above the detected table plane
+        When I center the cylinder and complete its bottom with the raster method
+        Then the bottom should lie on the table plane in the centered frame, not at the wall's lowest point
+    """
+    scene, cup = cup_on_table
+    processor = PLYProcessor(None, 'test')
+    processor.main_object = cup
+    processor.segment_plane(scene, distance_threshold=0.002, ransac_n=3, num_iterations=200)
+    plane = processor.support_plane.copy()
+    raised = o3d.geometry.PointCloud(cup)
+    raised.translate([0.0, 0.02, 0.0])
+    center = raised.get_center()
+
+    raised = processor.center_point_cloud(raised)
+    _, bottom = processor.complete_bottom(raised, resolution=0.005, method='raster')
+    bottom_points = np.asarray(bottom.points)
+
+    # Moved back to the scene's frame, the bottom lies on the detected table plane
+    np.testing.assert_allclose((bottom_points + center) @ plane[:3] + plane[3], 0, atol=1e-9)
+    assert np.asarray(raised.points)[:, 1].min() - bottom_points[:, 1].max() > 0.015
+
+
+def test_compare_bottom_methods(cup_on_table):
+    """
+    Scenario: Compare the bottom completion methods
+        Given I have an object and its support plane
+        When I compare the bottom completion methods
+        Then I should get the timing and point count of each method
+    """
+    scene, cup = cup_on_table
+    processor = PLYProcessor(None, 'test')
+    processor.main_object = cup
+    processor.segment_plane(scene, distance_threshold=0.002, ransac_n=3, num_iterations=200)
+
+    comparison = processor.compare_bottom_methods(cup)
+    assert set(comparison) == {'hull', 'raster'}
+    for result in comparison.values():
+        assert result['points'] > 0
+        assert result['seconds'] >= 0
+
+
+def test_raster_without_support_plane_falls_back_to_hull(cup_on_table):
+    """
+    Scenario: Raster completion without a detected plane
+        Given no support plane was detected
+        When I complete the bottom with the raster method
+        Then the hull method should be used instead
+    """
+    _, cup = cup_on_table
+    processor = PLYProcessor(None, 'test')
+    processor.main_object = cup
+    processor.complete_bottom(cup, method='raster')
+    assert processor.bottom_completion['method'] == 'hull'
+
+    with pytest.raises(ValueError):
+        processor.complete_bottom(cup, method='unknown')
+
+
+def test_bottom_completion_keeps_normals(cup_on_table):
+    """
+    Scenario: Complete the bottom of an object with normals
+        Given I have an object whose normals were estimated
+        When I complete its bottom
+        Then the completed object should keep normals, with the bottom ones pointing away from the object
+    """
+    scene, cup = cup_on_table
+    cup.estimate_normals()
+    processor = PLYProcessor(None, 'test')
+    processor.main_object = cup
+    processor.segment_plane(scene, distance_threshold=0.002, ransac_n=3, num_iterations=200)
+
+    complete, bottom = processor.complete_bottom(cup, resolution=0.005, method='raster')
+    assert complete.has_normals()
+    # The support plane normal points towards the object, the bottom normals away from it
+    away = -processor.support_plane[:3] / np.linalg.norm(processor.support_plane[:3])
+    np.testing.assert_allclose(np.asarray(bottom.normals), np.tile(away, (len(bottom.points), 1)), atol=1e-3)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from app.preprocess.lod import build_lod_order, delete_lod, load_lod, lod_paths, save_lod
+
+
+@pytest.fixture
+def sample_points():
+    """Fixture to provide a dense cluster and a sparse cluster of points."""
+    rng = np.random.default_rng(0)
+    dense = rng.uniform(0, 0.1, size=(20000, 3))
+    sparse = rng.uniform(0.9, 1.0, size=(200, 3))
+    return np.vstack([dense, sparse])
+
+
+def test_lod_order_is_a_permutation(sample_points):
+    """
+    Scenario: Build a level-of-detail order
+        Given I have a point cloud
+        When I build its octree LOD order
+        Then every point should appear exactly once and the level offsets should end at the point count
+    """
+    order, level_offsets = build_lod_order(sample_points)
+    np.testing.assert_array_equal(np.sort(order), np.arange(len(sample_points)))
+    assert level_offsets == sorted(level_offsets)
+    assert level_offsets[-1] == len(sample_points)
+
+
+def test_lod_prefix_covers_sparse_regions(sample_points):
+    """
+    Scenario: Serve a small point budget
+        Given I have a cloud with a dense and a sparse region
+        When I take a short prefix of the LOD order
+        Then the sparse region should be represented far beyond its share of the points
+    """
+    order, _ = build_lod_order(sample_points)
+    prefix = sample_points[order[:500]]
+    sparse_share = (prefix[:, 0] > 0.5).mean()
+    assert sparse_share > 10 * 200 / len(sample_points)
+
+
+def test_save_and_load_lod_prefix(tmp_path, sample_points):
+    """
+    Scenario: Read a budget from a saved pyramid
+        Given I have saved a point cloud as an LOD pyramid
+        When I load it with a point budget
+        Then I should get exactly that many points, and delete should remove the files
+    """
+    ply_path = str(tmp_path / 'cloud.ply')
+    colors = np.full((len(sample_points), 3), 0.5)
+    save_lod(ply_path, sample_points, colors)
+
+    points, loaded_colors = load_lod(ply_path, max_points=1000)
+    assert len(points) == len(loaded_colors) == 1000
+    assert len(load_lod(ply_path)[0]) == len(sample_points)
+    assert np.all(loaded_colors == 127)
+
+    assert len(delete_lod(ply_path)) == 2
+    assert load_lod(ply_path) is None
+    assert lod_paths(ply_path)[0].endswith('cloud.lod.npy')
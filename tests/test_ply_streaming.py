@@ -0,0 +1,98 @@
+import os
+import numpy as np
+import open3d as o3d
+import pytest
+from app.preprocess.ply_preprocess import PLYProcessor
+from app.preprocess.ply_streaming import PLYVertexReader
+
+
+@pytest.fixture
+def test_ply_file():
+    """Path to the test PLY file."""
+    return os.path.join(os.path.dirname(__file__), 'ply', 'input.ply')
+
+
+def test_vertex_reader_streams_all_points(test_ply_file):
+    """
+    Scenario: Read a binary PLY file in chunks
+        Given I have a binary PLY file
+        When I iterate over its vertex block in small chunks
+        Then I should get exactly the points Open3D loads in one go
+    """
+    reader = PLYVertexReader(test_ply_file)
+    chunks = list(reader.iter_chunks(chunk_size=50000))
+    points = np.concatenate([p for p, _ in chunks])
+    colors = np.concatenate([c for _, c in chunks])
+
+    expected = o3d.io.read_point_cloud(test_ply_file)
+    assert len(chunks) > 1
+    assert reader.vertex_count == len(points) == len(expected.points)
+    np.testing.assert_allclose(points, np.asarray(expected.points), rtol=1e-6)
+    np.testing.assert_allclose(colors / 255.0, np.asarray(expected.colors), atol=1e-6)
+
+
+def test_vertex_reader_ascii(tmp_path):
+    """
+    Scenario: Read an ASCII PLY file in chunks
+        Given I have an ASCII PLY file
+        When I iterate over its vertex block
+        Then I should get its points and colors
+    """
+    ply_path = tmp_path / 'ascii.ply'
+    ply_path.write_text(
+        "ply\nformat ascii 1.0\nelement vertex 3\n"
+        "property float x\nproperty float y\nproperty float z\n"
+        "property uchar red\nproperty uchar green\nproperty uchar blue\nend_header\n"
+        "0 0 0 255 0 0\n1 1 1 0 255 0\n2 2 2 0 0 255\n"
+    )
+    reader = PLYVertexReader(str(ply_path))
+    (points, colors), = list(reader.iter_chunks(chunk_size=10))
+
+    np.testing.assert_array_equal(points, [[0, 0, 0], [1, 1, 1], [2, 2, 2]])
+    np.testing.assert_array_equal(colors, [[255, 0, 0], [0, 255, 0], [0, 0, 255]])
+
+
+def test_streaming_load_matches_in_memory_reduction(test_ply_file):
+    """
+    Scenario: Stream a PLY file with a small memory budget
+        Given I have a PLY file larger than the memory budget
+        When I load it in streaming mode
+        Then I should get a reduced cloud close to the in-memory outlier filter and voxel downsampling
+    """
+    processor = PLYProcessor(test_ply_file, 'test')
+    streamed = processor.load_point_cloud_streaming(memory_budget_mb=8)
+
+    in_memory = processor.load_point_cloud()
+    in_memory = processor.remove_statistical_outliers(in_memory)
+    in_memory = processor.voxel_downsample(in_memory)
+
+    assert streamed.has_colors()
+    assert abs(len(streamed.points) - len(in_memory.points)) < 0.05 * len(in_memory.points)
+
+
+def test_streaming_load_does_not_duplicate_voxels_at_tile_seams(tmp_path):
+    """
+    Scenario: Stream a dense cloud split into tiles
+        Given I have a dense planar PLY file that is loaded as four tiles
+        When I load it in streaming mode
+        Then the points along the tile seams should match the in-memory voxel downsampling
+    """
+    rng = np.random.default_rng(0)
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(np.column_stack([rng.uniform(0, 0.04, (2000, 2)), np.zeros(2000)]))
+    pcd.colors = o3d.utility.Vector3dVector(rng.uniform(0, 1, (2000, 3)))
+    ply_path = str(tmp_path / 'plane.ply')
+    o3d.io.write_point_cloud(ply_path, pcd)
+    processor = PLYProcessor(ply_path, 'test')
+
+    # 2000 points over a budget of 1000 make a 2x2 grid of tiles with seams at the middle
+    streamed = processor.load_point_cloud_streaming(memory_budget_mb=0.01, tile_overlap=0.004, nn=16)
+    in_memory = processor.load_point_cloud().voxel_down_sample(voxel_size=0.002)
+
+    def seam_points(cloud):
+        points = np.asarray(cloud.points)[:, :2]
+        middle = (np.asarray(pcd.points)[:, :2].min(axis=0) + np.asarray(pcd.points)[:, :2].max(axis=0)) / 2
+        return np.sum(np.any(np.abs(points - middle) < 0.002, axis=1))
+
+    assert seam_points(streamed) == seam_points(in_memory)
+    assert len(streamed.points) == len(in_memory.points)
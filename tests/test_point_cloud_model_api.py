@@ -200,3 +200,24 @@ def test_upload_large_point_cloud(client):
     assert response.status_code == 200
     response_data = json.loads(response.data.decode('utf-8'))
     assert "point_cloud_id" in response_data
+
+def test_point_cloud_normals_are_packed_compactly():
+    """
+    Scenario: Store the normals of a point cloud
+        Given I have a point cloud with normals of any length
+        When I pack them for the database and unpack them again
+        Then each normal should take 3 bytes and come back as a unit vector close to the original
+    """
+    normals = np.random.default_rng(0).normal(size=(500, 3))
+    normals[0] = 0
+    pc = PointCloud("Test Cloud", np.zeros((500, 3)), normals=normals)
+
+    packed = PointCloud.pack_normals(pc.normals)
+    assert len(packed) == 3 * len(normals)
+
+    unpacked = PointCloud.unpack_normals(packed)
+    assert unpacked.dtype == np.float32
+    np.testing.assert_array_equal(unpacked[0], [0, 0, 0])
+    expected = normals[1:] / np.linalg.norm(normals[1:], axis=1, keepdims=True)
+    np.testing.assert_allclose(np.linalg.norm(unpacked[1:], axis=1), 1, atol=1e-6)
+    assert np.min(np.sum(unpacked[1:] * expected, axis=1)) > np.cos(np.radians(1))
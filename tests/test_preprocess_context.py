@@ -0,0 +1,88 @@
+import numpy as np
+import open3d as o3d
+import pytest
+from app.preprocess.preprocess_context import PreprocessContext
+from app.preprocess.ply_preprocess import PLYProcessor
+
+
+@pytest.fixture
+def sample_pcd():
+    """Fixture to provide two well separated clusters of points with a few outliers."""
+    rng = np.random.default_rng(0)
+    cluster_a = rng.normal([0, 0, 0], 0.01, size=(500, 3))
+    cluster_b = rng.normal([1, 0, 0], 0.01, size=(200, 3))
+    outliers = rng.uniform(-3, 3, size=(5, 3))
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(np.vstack([cluster_a, cluster_b, outliers]))
+    return pcd
+
+
+def test_outlier_filter_matches_open3d(sample_pcd):
+    """
+    Scenario: Filter statistical outliers with the shared index
+        Given I have a point cloud with outliers
+        When I compute the inliers from the shared KNN graph
+        Then I should keep the same points as Open3D
+    """
+    context = PreprocessContext()
+    _, expected = sample_pcd.remove_statistical_outlier(16, 2.0)
+    inliers = context.statistical_outlier_inliers(sample_pcd, 16, 2.0)
+    np.testing.assert_array_equal(inliers, expected)
+
+
+def test_report_lists_stages_without_index_reuse(sample_pcd):
+    """
+    Scenario: Report which stages do not reuse the neighbor index
+        Given I have a point cloud left after plane segmentation
+        When I cluster it to find the main object
+        Then the clusters should match Open3D's DBSCAN
+        And the timings report should list clustering as a stage without index reuse
+    """
+    processor = PLYProcessor(None, 'test')
+    main_object = processor.cluster_points(sample_pcd, cluster_eps=0.02, min_points=10)
+
+    assert len(main_object.points) == 500
+    report = processor.context.report()
+    assert 'cluster_points' in report['stage_timings']
+    assert report['stages_without_index_reuse'] == ['cluster_points']
+    assert report['index_builds'] == 0
+
+
+def test_index_is_reused_until_points_are_removed(sample_pcd):
+    """
+    Scenario: Reuse the neighbor index across stages
+        Given I have a point cloud processed by several stages
+        When the stages only translate the cloud or add normals
+        Then the index should be built once and invalidated only when points are removed
+    """
+    processor = PLYProcessor(None, 'test')
+    pcd = processor.center_point_cloud(sample_pcd)
+    pcd = processor.estimate_normals(pcd, max_nn=16)
+    pcd = processor.center_point_cloud(pcd)
+    processor.cluster_points(pcd, cluster_eps=0.02, min_points=10)
+    assert processor.context.index_builds == 1
+    assert processor.context.index_reuses > 0
+
+    filtered = processor.remove_statistical_outliers(pcd, nn=16, std_multiplier=2.0)
+    assert len(filtered.points) < len(pcd.points)
+    processor.estimate_normals(filtered, max_nn=16)
+    assert processor.context.index_builds == 2
+    assert 'estimate_normals' in processor.context.report()['stage_timings']
+
+
+def test_index_is_rebuilt_after_in_place_transforms(sample_pcd):
+    """
+    Scenario: Transform a cloud in place
+        Given I have a point cloud with a neighbor index
+        When the cloud is scaled in place
+        Then the index should be rebuilt and give the neighbor distances of the scaled cloud
+    """
+    context = PreprocessContext()
+    distances = context.nearest_neighbor_distances(sample_pcd)
+    context.translate(sample_pcd, [1.0, 2.0, 3.0])
+    np.testing.assert_allclose(context.nearest_neighbor_distances(sample_pcd), distances)
+    assert context.index_builds == 1
+
+    sample_pcd.scale(2.0, center=sample_pcd.get_center())
+    np.testing.assert_allclose(context.nearest_neighbor_distances(sample_pcd), 2 * distances, rtol=1e-6)
+    assert context.index_builds == 2
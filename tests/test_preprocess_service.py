@@ -183,7 +183,7 @@ def test_get_preprocess_process_ply_success(client, mongo, point_cloud_data):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert data == [mock_ply_data]
-    mock_get_ply.assert_called_once_with(ply_id, param)
+    mock_get_ply.assert_called_once_with(ply_id, param, max_points=None)
 
 def test_get_preprocess_process_ply_not_found(client, mongo):
     """
@@ -199,4 +199,4 @@ def test_get_preprocess_process_ply_not_found(client, mongo):
     assert response.status_code == 404
     data = json.loads(response.data)
     assert data == {"error": f"{param} ply not found"}
-    mock_get_ply.assert_called_once_with(ply_id, param)
\ No newline at end of file
+    mock_get_ply.assert_called_once_with(ply_id, param, max_points=None)
\ No newline at end of file
@@ -32,6 +32,7 @@ def mock_threed_model():
     model.point_cloud_id = 'test_point_cloud_id'
     model.obj_file = '/path/to/model.obj'
     model.texture_file = '/path/to/texture.jpg'
+    model.get_files.return_value = (model.obj_file, None, model.texture_file)
     return model
 
 @pytest.fixture
@@ -248,5 +249,24 @@ def test_get_mesh_data_invalid_type(app, mongo, mock_threed_model):
     assert surface['type'] == 'mesh3d'
     assert surface['color'] == 'rgb(100, 100, 100)'  # Check for default color
 
+def test_get_mesh_data_serves_full_detail_unless_preview_is_asked(app, mongo, mock_threed_model):
+    """
+    Scenario: Choose the detail of the mesh data
+        Given I have a 3D model with a preview mesh
+        When I call get_mesh_data without a detail and then with detail 'preview'
+        Then the full-detail mesh should be read first and the preview mesh second
+    """
+    with patch('app.models.threed_model.ThreeDModel.get_by_id', return_value=mock_threed_model):
+        with patch('app.services.recon_proc_visualization_service.pv.read') as mock_pv_read:
+            mock_mesh = MagicMock()
+            mock_mesh.points = np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+            mock_mesh.faces = np.array([[3, 0, 1, 2]])
+            mock_pv_read.return_value = mock_mesh
+
+            ReconProcVisualizationService.get_mesh_data('test_model_id', mesh_type='refined')
+            ReconProcVisualizationService.get_mesh_data('test_model_id', mesh_type='refined', detail='preview')
+
+    assert [call.args for call in mock_threed_model.get_files.call_args_list] == [('full',), ('preview',)]
+
 if __name__ == '__main__':
     pytest.main()
\ No newline at end of file
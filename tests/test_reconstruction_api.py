@@ -14,10 +14,11 @@ import pytest
 from app import create_app
 from app.db.mongodb import get_db
 from app.models.point_cloud import PointCloud
+from app.models.threed_model import ThreeDModel
 from app.services.reconstruction_service import ReconstructionService
 from bson import ObjectId
 import json
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 
 @pytest.fixture
 def app():
@@ -103,4 +104,71 @@ def test_reconstruct_server_error(client, mongo):
     assert response.status_code == 500
     data = json.loads(response.data)
     assert "error" in data
-    assert data['error'] == "Internal server error"
\ No newline at end of file
+    assert data['error'] == "Internal server error"
+def test_reconstruct_resume_reports_skipped_stages(client, mongo):
+    """
+    Scenario: Resume a reconstruction from its checkpoints
+        Given I have a point cloud whose previous reconstruction failed after meshing
+        When I send a POST request to reconstruct it with the resume flag
+        Then I should receive the stages that were skipped
+    """
+    pc_string = """x,y,z,r,g,b
+    0.1,0.2,0.3,255,0,0
+    0.4,0.5,0.6,0,255,0"""
+    pc = PointCloud.from_string("Test Cloud", pc_string)
+    pc_id = pc.save()
+
+    mock_model = MagicMock()
+    mock_model.report = {'resumed': True, 'skipped_stages': ['stage_1_mesh', 'stage_2_refined_mesh']}
+    with patch.object(ReconstructionService, 'start_reconstruction', return_value='mock_model_id') as mock_reconstruct, \
+            patch.object(ThreeDModel, 'get_by_id', return_value=mock_model):
+        response = client.post(f'/api/reconstruct/{pc_id}?resume=true')
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['skipped_stages'] == ['stage_1_mesh', 'stage_2_refined_mesh']
+    mock_reconstruct.assert_called_once_with(str(pc_id), resume=True)
+
+def test_reconstruct_passes_meshing_candidates(client, mongo):
+    """
+    Scenario: Let the reconstruction pick its meshing candidate
+        Given I have a point cloud
+        When I send a POST request to reconstruct it with meshing candidates
+        Then the candidates and the proxy size should be passed to the reconstruction
+    """
+    pc = PointCloud("Test Cloud", np.array([[0.1, 0.2, 0.3]]), np.array([[255, 0, 0]]))
+    pc_id = pc.save()
+
+    with patch.object(ReconstructionService, 'start_reconstruction', return_value='mock_model_id') as mock_reconstruct:
+        response = client.post(f'/api/reconstruct/{pc_id}?candidates=delaunay:2.2,tsdf&candidate_points=5000')
+
+    assert response.status_code == 200
+    mock_reconstruct.assert_called_once_with(str(pc_id), candidates='delaunay:2.2,tsdf', candidate_points=5000)
+
+def test_reconstruct_rejects_malformed_options(client, mongo):
+    """
+    Scenario: Send malformed reconstruction options
+        Given I have a point cloud
+        When I send reconstruction or stages requests with options that cannot be parsed
+        Then I should receive a bad request error naming the option
+        And the reconstruction should not be started
+    """
+    pc = PointCloud("Test Cloud", np.array([[0.1, 0.2, 0.3]]), np.array([[255, 0, 0]]))
+    pc_id = pc.save()
+
+    with patch.object(ReconstructionService, 'start_reconstruction', return_value='mock_model_id') as mock_reconstruct, \
+            patch.object(ReconstructionService, 'get_reconstruction_stages', return_value={}) as mock_stages:
+        response = client.post(f'/api/reconstruct/{pc_id}?point_budget=abc')
+        assert response.status_code == 400
+        assert "'point_budget'" in json.loads(response.data)['error']
+
+        response = client.post(f'/api/reconstruct/{pc_id}', json={'resume': 'maybe'})
+        assert response.status_code == 400
+        assert "'resume'" in json.loads(response.data)['error']
+
+        response = client.get(f'/api/reconstruction_stages/{pc_id}?max_error=high')
+        assert response.status_code == 400
+        assert "'max_error'" in json.loads(response.data)['error']
+
+    mock_reconstruct.assert_not_called()
+    mock_stages.assert_not_called()
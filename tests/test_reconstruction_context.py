@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+import pyvista as pv
+from scipy.spatial import cKDTree
+from app.reconstruction.point_cloud_to_mesh import PointCloudToMesh
+from app.reconstruction.reconstruction_context import ReconstructionContext
+from app.reconstruction.reconstruction_utils import as_point_array, as_color_array
+from app.reconstruction.texture_mapper import TextureMapper
+
+
+@pytest.fixture
+def sample_points():
+    """Fixture to provide points sampled from a sphere."""
+    return pv.Sphere(theta_resolution=30, phi_resolution=30).points
+
+
+def test_alpha_estimation_and_color_transfer_share_one_index(sample_points):
+    """
+    Scenario: Reconstruct a cloud with one spatial index
+        Given I have a point cloud with colors and a context for it
+        When I estimate alpha and then map the colors onto a mesh with that context
+        Then the KD-tree should be built once and reused by the color transfer
+    """
+    context = ReconstructionContext(sample_points)
+    pc_to_mesh = PointCloudToMesh()
+    pc_to_mesh.set_point_cloud(sample_points, context=context)
+    pc_to_mesh.calculate_optimal_alpha()
+
+    texture_mapper = TextureMapper()
+    texture_mapper.load_mesh(pv.Sphere(theta_resolution=10, phi_resolution=10))
+    texture_mapper.load_point_cloud_with_colors(sample_points, np.random.default_rng(0).random((len(sample_points), 3)),
+                                                context=context)
+    texture_mapper.map_colors_to_mesh()
+
+    assert context.index_builds == 1
+    assert context.index_reuses >= 1
+
+
+def test_queries_match_a_fresh_kdtree(sample_points):
+    """
+    Scenario: Query the shared index
+        Given I have a context for a cloud
+        When I query nearest neighbors of other points
+        Then I should get the same neighbors as a fresh KD-tree
+    """
+    targets = np.random.default_rng(1).random((100, 3)) - 0.5
+    _, indices = ReconstructionContext(sample_points).query(targets)
+    _, expected = cKDTree(sample_points).query(targets)
+    np.testing.assert_array_equal(indices, expected)
+
+
+def test_context_follows_the_cloud_being_meshed(sample_points):
+    """
+    Scenario: Keep one context per cloud while meshing
+        Given I have set a point cloud with its context
+        When I run several lookups and then simplify the cloud
+        Then the lookups should reuse that context, and the simplified cloud should get a context of its own
+    """
+    context = ReconstructionContext(sample_points)
+    pc_to_mesh = PointCloudToMesh()
+    pc_to_mesh.set_point_cloud(sample_points, context=context)
+    pc_to_mesh.calculate_optimal_alpha()
+    pc_to_mesh.calculate_optimal_alpha()
+    assert pc_to_mesh.reconstruction_context() is context
+    assert context.index_builds == 1
+
+    pc_to_mesh.simplify(len(sample_points) // 4)
+    assert pc_to_mesh.reconstruction_context() is not context
+    assert len(pc_to_mesh.reconstruction_context().points) == len(pc_to_mesh.point_cloud)
+
+    with pytest.raises(ValueError):
+        pc_to_mesh.set_point_cloud(sample_points[:10], context=context)
+
+
+def test_float32_cloud_is_shared_without_copies(sample_points):
+    """
+    Scenario: Pass one float32 cloud through the reconstruction stages
+        Given I have a float32 point cloud and uint8 colors
+        When I load them for meshing, indexing and color transfer
+        Then every stage should reference the same arrays instead of copying them
+    """
+    points = as_point_array(sample_points)
+    colors = as_color_array(np.random.default_rng(0).random((len(points), 3)))
+    assert as_point_array(points) is points
+    assert colors.dtype == np.uint8 and as_color_array(colors) is colors
+
+    pc_to_mesh = PointCloudToMesh()
+    pc_to_mesh.set_point_cloud(points)
+    texture_mapper = TextureMapper()
+    texture_mapper.load_point_cloud_with_colors(points, colors)
+
+    assert pc_to_mesh.point_cloud is points
+    assert texture_mapper.point_cloud is points and texture_mapper.colors is colors
+    assert np.shares_memory(ReconstructionContext(points).points, points)
+
+
+def test_cached_context_is_shared_per_key(sample_points):
+    """
+    Scenario: Reuse the index of a stored cloud across reconstructions
+        Given I have got the cached context of a cloud and built its index
+        When I get the context under the same key again
+        Then I should get the same context without building the index again
+        And a different key, or a cloud of another size, should get a context of its own
+    """
+    ReconstructionContext.clear_cache()
+    context = ReconstructionContext.cached(('cloud', 1), sample_points)
+    context.tree()
+    again = ReconstructionContext.cached(('cloud', 1), np.array(sample_points))
+    assert again is context
+    again.tree()
+    assert context.index_builds == 1
+
+    other = ReconstructionContext.cached(('cloud', 2), sample_points)
+    assert other is not context
+    other.tree()
+    assert ReconstructionContext.cached(('cloud', 1), sample_points[:10]) is not context
+
+    for key in range(ReconstructionContext.MAX_CACHED_CLOUDS):
+        ReconstructionContext.cached(key, sample_points)
+    assert ReconstructionContext.cached(('cloud', 2), sample_points) is not other
+    ReconstructionContext.clear_cache()
@@ -1,3 +1,5 @@
+import os
+import shutil
 import warnings
 import numpy as np
 
@@ -14,15 +16,21 @@ import pytest
 from app import create_app
 from app.db.mongodb import get_db
 from app.models.point_cloud import PointCloud
+from app.models.threed_model import ThreeDModel
 from app.services.reconstruction_service import ReconstructionService
 from bson import ObjectId
 import json
+import struct
+import time
 from unittest.mock import patch, MagicMock
 import pyvista as pv
-from app.reconstruction.point_cloud_to_mesh import PointCloudToMesh
+from PIL import Image
+from app.reconstruction.point_cloud_to_mesh import PointCloudToMesh, MeshRefiner
+from app.reconstruction.reconstruction_context import ReconstructionContext
+from app.reconstruction.stage_store import StageStore
 from app.reconstruction.texture_mapper import TextureMapper
 from app.reconstruction.mesh_to_obj_converter import MeshToOBJConverter
-from app.reconstruction.reconstruction_utils import generate_colors
+from app.reconstruction.reconstruction_utils import generate_colors, as_point_array, as_color_array
 
 
 @pytest.fixture
@@ -77,7 +85,7 @@ class TestReconstructionService:
             monkeypatch.setattr('os.makedirs', lambda *args, **kwargs: None)
             monkeypatch.setattr('os.path.exists', lambda *args: True)
             monkeypatch.setattr('os.access', lambda *args, **kwargs: True)
-            monkeypatch.setattr(PointCloudToMesh, 'generate_mesh', lambda *args: pv.PolyData(np.array([[0, 0, 0], [1, 1, 1], [2, 2, 2]])))
+            monkeypatch.setattr(PointCloudToMesh, 'generate_mesh', lambda *args, **kwargs: pv.PolyData(np.array([[0, 0, 0], [1, 1, 1], [2, 2, 2]])))
             monkeypatch.setattr(TextureMapper, 'apply_texture', lambda *args: None)
             monkeypatch.setattr(MeshToOBJConverter, 'convert_and_save', lambda *args: None)
 
@@ -89,6 +97,132 @@ class TestReconstructionService:
             assert model_id is not None
             assert mongo.point_clouds.find_one({'_id': point_cloud_data['_id']}) is not None
 
+    def test_start_reconstruction_reuses_cached_result_unless_forced(self, app, mongo, point_cloud_data, monkeypatch):
+        """
+        Test that a repeated reconstruction request returns the cached model without running the pipeline.
+
+        This test reconstructs a small sphere, then verifies that the same request
+        returns the same model without meshing, that force runs the pipeline again
+        and updates that model, and that another cloud with the same points gets
+        a model of its own.
+        """
+        with app.app_context():
+            points = pv.Sphere(theta_resolution=20, phi_resolution=20).points
+            points = points + np.random.default_rng(0).normal(0, 0.003, points.shape)
+            point_cloud_data['points'] = points.tolist()
+            point_cloud_data['colors'] = np.random.default_rng(1).integers(0, 256, points.shape).tolist()
+            twin_data = {**point_cloud_data, '_id': ObjectId()}
+            mongo.point_clouds.insert_one(point_cloud_data)
+            mongo.point_clouds.insert_one(twin_data)
+            point_cloud_id, twin_id = str(point_cloud_data['_id']), str(twin_data['_id'])
+            output_dirs = [ReconstructionService.get_model_location(pc_id, point_cloud_data)[1]
+                           for pc_id in (point_cloud_id, twin_id)]
+
+            generate_mesh = PointCloudToMesh.generate_mesh
+            calls = []
+
+            def counting_generate_mesh(self, *args, **kwargs):
+                calls.append(kwargs)
+                return generate_mesh(self, *args, **kwargs)
+
+            monkeypatch.setattr(PointCloudToMesh, 'generate_mesh', counting_generate_mesh)
+            try:
+                model_id = ReconstructionService.start_reconstruction(point_cloud_id, texture_resolution=64)
+                assert len(calls) == 1
+
+                assert ReconstructionService.start_reconstruction(point_cloud_id, texture_resolution=64) == model_id
+                assert len(calls) == 1
+
+                forced_id = ReconstructionService.start_reconstruction(point_cloud_id, texture_resolution=64, force=True)
+                assert len(calls) == 2
+                assert forced_id == model_id
+
+                twin_model_id = ReconstructionService.start_reconstruction(twin_id, texture_resolution=64)
+                assert len(calls) == 3
+                assert twin_model_id != model_id
+                assert ThreeDModel.get_by_id(model_id).point_cloud_id == point_cloud_id
+            finally:
+                for output_dir in output_dirs:
+                    shutil.rmtree(output_dir, ignore_errors=True)
+
+    def test_repeated_reconstructions_of_a_cloud_build_its_index_once(self, app, mongo, point_cloud_data):
+        """
+        Test that repeated reconstructions of the same stored cloud share one spatial index.
+
+        This test reconstructs a small sphere twice, forcing the second run, and
+        verifies that the cloud's KD-tree was built by the first run only.
+        """
+        with app.app_context():
+            ReconstructionContext.clear_cache()
+            points = pv.Sphere(theta_resolution=20, phi_resolution=20).points
+            point_cloud_data['points'] = points.tolist()
+            point_cloud_data['colors'] = np.random.default_rng(1).integers(0, 256, points.shape).tolist()
+            mongo.point_clouds.insert_one(point_cloud_data)
+            point_cloud_id = str(point_cloud_data['_id'])
+            output_dir = ReconstructionService.get_model_location(point_cloud_id, point_cloud_data)[1]
+            try:
+                ReconstructionService.start_reconstruction(point_cloud_id, texture_resolution=64)
+                ReconstructionService.start_reconstruction(point_cloud_id, texture_resolution=64, force=True)
+            finally:
+                shutil.rmtree(output_dir, ignore_errors=True)
+
+            context = ReconstructionService.reconstruction_context(point_cloud_id, point_cloud_data,
+                                                                   as_point_array(points))
+            assert context.index_builds == 1
+            assert context.index_reuses >= 2
+
+    def test_start_reconstruction_replaces_fast_preview_and_stale_record(self, app, mongo, point_cloud_data):
+        """
+        Test that a reconstruction replacing a fast preview leaves a single model for the cloud.
+
+        This test reconstructs a small sphere, then saves a fast preview and
+        reconstructs it again under the preview's model ID, and verifies that the
+        earlier record is deleted and that a failed run marks the preview instead.
+        """
+        with app.app_context():
+            points = pv.Sphere(theta_resolution=20, phi_resolution=20).points
+            point_cloud_data['points'] = points.tolist()
+            point_cloud_data['colors'] = np.random.default_rng(1).integers(0, 256, points.shape).tolist()
+            mongo.point_clouds.insert_one(point_cloud_data)
+            point_cloud_id = str(point_cloud_data['_id'])
+            output_dir = ReconstructionService.get_model_location(point_cloud_id, point_cloud_data)[1]
+            try:
+                stale_id = ReconstructionService.start_reconstruction(point_cloud_id, texture_resolution=64)
+
+                preview_id = ReconstructionService.start_fast_preview(point_cloud_id, preview_points=200)
+                ReconstructionService.mark_fast_preview_failed(preview_id, 'boom')
+                assert ThreeDModel.get_by_id(preview_id).report['status'] == 'preview_failed'
+                assert ThreeDModel.get_by_id(preview_id).report['error'] == 'boom'
+
+                preview_id = ReconstructionService.start_fast_preview(point_cloud_id, preview_points=200)
+                model_id = ReconstructionService.start_reconstruction(point_cloud_id, model_id=preview_id,
+                                                                      texture_resolution=64, force=True)
+                assert model_id == preview_id
+                assert ThreeDModel.get_by_id(stale_id) is None
+                assert ThreeDModel.get_by_id(model_id).report['status'] == 'complete'
+            finally:
+                shutil.rmtree(output_dir, ignore_errors=True)
+
+    def test_build_fast_preview_mesh_colors_vertices_from_nearest_points(self):
+        """
+        Test that the fast preview is a closed surface of a simplified cloud colored per vertex.
+
+        This test meshes a dense sphere colored by hemisphere and verifies that
+        the preview keeps about the requested number of points and that every
+        vertex takes the color of its hemisphere.
+        """
+        points = pv.Sphere(theta_resolution=200, phi_resolution=200).points
+        colors = np.where(points[:, 2:] > 0, [[255, 0, 0]], [[0, 0, 255]]).astype(np.uint8)
+
+        preview_mesh = ReconstructionService.build_fast_preview_mesh(points, colors, preview_points=500)
+
+        assert preview_mesh.n_points <= 600
+        assert preview_mesh.point_data['RGB'].dtype == np.uint8
+        upper = preview_mesh.points[:, 2] > 0.05
+        lower = preview_mesh.points[:, 2] < -0.05
+        assert np.all(preview_mesh.point_data['RGB'][upper] == [255, 0, 0])
+        assert np.all(preview_mesh.point_data['RGB'][lower] == [0, 0, 255])
+
     def test_start_reconstruction_raises_error_when_point_cloud_not_found(self, app, mongo):
         """
         Test that start_reconstruction raises a ValueError when the point cloud is not found.
@@ -114,6 +248,89 @@ class TestReconstructionService:
             with pytest.raises(ValueError, match="Point cloud has no points data"):
                 ReconstructionService.start_reconstruction(str(point_cloud_data['_id']))
 
+    def test_get_reconstruction_stages_serves_saved_artifacts(self, app, mongo, point_cloud_data, monkeypatch):
+        """
+        Test that get_reconstruction_stages serves the saved stage meshes without recomputing them.
+
+        This test saves all stage artifacts in the model folder and verifies that
+        none of the pipeline steps run when the stages are requested.
+        """
+        with app.app_context():
+            mongo.point_clouds.insert_one(point_cloud_data)
+            point_cloud_id = str(point_cloud_data['_id'])
+            model_name, output_dir = ReconstructionService.get_model_location(point_cloud_id, point_cloud_data)
+            os.makedirs(output_dir, exist_ok=True)
+            stage_store = StageStore(output_dir, model_name)
+            sphere = pv.Sphere(theta_resolution=8, phi_resolution=8)
+            for stage in StageStore.STAGES:
+                stage_store.save(stage, sphere)
+
+            def fail(*args, **kwargs):
+                raise AssertionError("Stage should not be recomputed")
+
+            monkeypatch.setattr(PointCloudToMesh, 'generate_mesh', fail)
+            monkeypatch.setattr(MeshRefiner, 'refine', fail)
+            monkeypatch.setattr(TextureMapper, 'apply_texture', fail)
+
+            try:
+                stages = ReconstructionService.get_reconstruction_stages(point_cloud_id)
+            finally:
+                shutil.rmtree(output_dir)
+
+            for stage in StageStore.STAGES:
+                assert stages[stage]['n_points'] == sphere.n_points
+                assert stages[stage]['n_cells'] == sphere.n_cells
+
+    def test_get_reconstruction_stages_does_not_overwrite_checkpoints(self, app, mongo, point_cloud_data):
+        """
+        Test that stages recomputed by get_reconstruction_stages are not written over the checkpoints.
+
+        This test checkpoints only the first stage, requests the stages, and
+        verifies that the missing ones are served without being saved and that
+        the first stage's checkpoint is kept.
+        """
+        with app.app_context():
+            mongo.point_clouds.insert_one(point_cloud_data)
+            point_cloud_id = str(point_cloud_data['_id'])
+            model_name, output_dir = ReconstructionService.get_model_location(point_cloud_id, point_cloud_data)
+            os.makedirs(output_dir, exist_ok=True)
+            stage_store = StageStore(output_dir, model_name)
+            stage_store.save('stage_1_mesh', pv.Sphere(theta_resolution=8, phi_resolution=8), 'input-hash')
+
+            try:
+                stages = ReconstructionService.get_reconstruction_stages(point_cloud_id)
+                assert stages['stage_3_textured_mesh']['n_cells'] > 0
+                assert stage_store.is_valid('stage_1_mesh', 'input-hash')
+                assert not os.path.exists(stage_store.path('stage_2_refined_mesh'))
+                assert not os.path.exists(stage_store.path('stage_3_textured_mesh'))
+            finally:
+                shutil.rmtree(output_dir)
+
+    def test_get_reconstruction_stages_decimates_like_the_stored_model(self, app, mongo, point_cloud_data):
+        """
+        Test that a recomputed refined stage uses the decimation budget of the cloud's model.
+
+        This test checkpoints only the first stage of a cloud whose model was
+        decimated to 100 faces, and verifies that the refined stage is decimated
+        the same way unless another budget is requested.
+        """
+        with app.app_context():
+            mongo.point_clouds.insert_one(point_cloud_data)
+            point_cloud_id = str(point_cloud_data['_id'])
+            model_name, output_dir = ReconstructionService.get_model_location(point_cloud_id, point_cloud_data)
+            os.makedirs(output_dir, exist_ok=True)
+            StageStore(output_dir, model_name).save('stage_1_mesh', pv.Sphere(theta_resolution=20, phi_resolution=20))
+            ThreeDModel(name=model_name, folder_path=output_dir, point_cloud_id=point_cloud_id, obj_file=None,
+                        mtl_file=None, texture_file=None, report={'target_faces': 100, 'max_error': None}).save()
+
+            try:
+                stages = ReconstructionService.get_reconstruction_stages(point_cloud_id)
+                assert stages['stage_2_refined_mesh']['n_cells'] <= 110
+                stages = ReconstructionService.get_reconstruction_stages(point_cloud_id, target_faces=300)
+                assert 250 <= stages['stage_2_refined_mesh']['n_cells'] <= 330
+            finally:
+                shutil.rmtree(output_dir)
+
 class TestPointCloudToMesh:
     """Tests for the PointCloudToMesh class."""
 
@@ -159,6 +376,274 @@ class TestPointCloudToMesh:
         assert isinstance(mesh, pv.PolyData)
         assert mesh.n_points == len(sample_points)
 
+    def test_simplify_meets_point_budget_with_original_points(self, pc_to_mesh):
+        """
+        Test that simplify keeps about point_budget points, all taken from the input cloud.
+        """
+        points = pv.Sphere(theta_resolution=120, phi_resolution=120).points
+        pc_to_mesh.set_point_cloud(points)
+        simplified = pc_to_mesh.simplify(2000)
+        assert abs(len(simplified) - 2000) <= 0.05 * 2000
+        original = set(map(tuple, points.tolist()))
+        assert all(tuple(point) in original for point in simplified.tolist())
+
+    def test_simplify_leaves_cloud_within_budget_unchanged(self, pc_to_mesh, sample_points):
+        """
+        Test that simplify does nothing when the cloud already fits the budget.
+        """
+        pc_to_mesh.set_point_cloud(sample_points)
+        np.testing.assert_array_equal(pc_to_mesh.simplify(10), sample_points)
+
+    def test_generate_mesh_raises_error_for_unknown_engine(self, pc_to_mesh, sample_points):
+        """
+        Test that generate_mesh raises a ValueError for an unregistered engine.
+        """
+        pc_to_mesh.set_point_cloud(sample_points)
+        with pytest.raises(ValueError, match="Unknown reconstruction engine"):
+            pc_to_mesh.generate_mesh(engine='marching_squares')
+
+    @pytest.mark.parametrize('engine', ['poisson', 'ball_pivoting'])
+    def test_open3d_engines_mesh_a_sphere(self, pc_to_mesh, engine):
+        """
+        Test that the Open3D engines produce a triangle surface from a sampled sphere.
+        """
+        pc_to_mesh.set_point_cloud(pv.Sphere(theta_resolution=40, phi_resolution=40).points)
+        mesh = pc_to_mesh.generate_mesh(engine=engine)
+        assert pc_to_mesh.engine == engine
+        assert isinstance(mesh, pv.PolyData)
+        assert mesh.n_cells > 0
+        assert mesh.is_all_triangles
+
+    def test_tsdf_engine_meshes_a_closed_surface_independent_of_block_size(self, pc_to_mesh):
+        """
+        Test that the TSDF engine meshes a sampled sphere as a closed surface near the sphere,
+        and that small blocks stitch into the same surface as large ones.
+        """
+        pc_to_mesh.set_point_cloud(pv.Sphere(radius=0.5, theta_resolution=80, phi_resolution=80).points)
+        mesh = pc_to_mesh.generate_mesh(engine='tsdf')
+        assert pc_to_mesh.engine == 'tsdf'
+        assert mesh.is_all_triangles
+        open_edges = mesh.extract_feature_edges(boundary_edges=True, non_manifold_edges=True,
+                                                feature_edges=False, manifold_edges=False)
+        assert open_edges.n_cells == 0
+        assert np.abs(np.linalg.norm(mesh.points, axis=1) - 0.5).max() < 0.02
+
+        small_blocks = pc_to_mesh.generate_mesh(engine='tsdf', block_size=8)
+        assert small_blocks.n_cells == mesh.n_cells
+        assert small_blocks.area == pytest.approx(mesh.area, rel=1e-4)
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_generate_mesh_tiled_stitches_tiles_like_a_single_mesh(self, pc_to_mesh, workers):
+        """
+        Test that meshing overlapping tiles and stitching them matches meshing the cloud whole.
+        """
+        points = pv.Sphere(theta_resolution=60, phi_resolution=60).points
+        points = points + np.random.default_rng(0).normal(0, 0.002, points.shape)
+        pc_to_mesh.set_point_cloud(points)
+        whole = pc_to_mesh.generate_mesh(engine='ball_pivoting')
+
+        tiled = pc_to_mesh.generate_mesh_tiled(0.5, workers=workers, engine='ball_pivoting')
+        assert tiled.is_all_triangles
+        assert abs(tiled.n_cells - whole.n_cells) <= 0.02 * whole.n_cells
+        assert abs(tiled.area - whole.area) <= 0.02 * whole.area
+        # Vertices shared by neighboring tiles are merged, not duplicated
+        assert tiled.n_points <= len(points)
+
+    def test_generate_mesh_tiled_meshes_small_cloud_whole(self, pc_to_mesh, sample_points):
+        """
+        Test that a cloud fitting in one tile is meshed by generate_mesh.
+        """
+        pc_to_mesh.set_point_cloud(sample_points)
+        with patch.object(pc_to_mesh, 'generate_mesh', return_value=pv.PolyData()) as generate_mesh:
+            pc_to_mesh.generate_mesh_tiled(10.0, engine='delaunay')
+        generate_mesh.assert_called_once()
+
+    def test_generate_mesh_tiled_meshes_whole_when_overlap_exceeds_tiles(self, pc_to_mesh):
+        """
+        Test that a tile overlap wider than the tiles falls back to meshing the cloud whole.
+        """
+        pc_to_mesh.set_point_cloud(pv.Sphere().points)
+        with patch.object(pc_to_mesh, 'generate_mesh', return_value=pv.PolyData()) as generate_mesh:
+            pc_to_mesh.generate_mesh_tiled(0.4, overlap=0.5, engine='ball_pivoting')
+        generate_mesh.assert_called_once_with(engine='ball_pivoting')
+
+    def test_auto_engine_picks_engine_by_shape_class(self, pc_to_mesh):
+        """
+        Test that the 'auto' engine resolves through the shape class mapping.
+        """
+        pc_to_mesh.set_point_cloud(np.random.default_rng(0).random((200, 3)) * [1, 1, 0.05])
+        assert pc_to_mesh.shape_class() == 'flat'
+        assert pc_to_mesh.resolve_engine('auto', {'flat': 'ball_pivoting'}) == 'ball_pivoting'
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_select_candidate_prefers_a_closed_faithful_surface(self, pc_to_mesh, workers):
+        """
+        Test that candidate selection scores every candidate on the proxy and picks the
+        closed surface over a Delaunay alpha too small to close it.
+        """
+        pc_to_mesh.set_point_cloud(pv.Sphere(radius=0.5, theta_resolution=80, phi_resolution=80).points)
+        best, scores = pc_to_mesh.select_candidate('delaunay:0.5,tsdf', proxy_points=3000, workers=workers)
+
+        assert best == {'engine': 'tsdf'}
+        assert [score['candidate'] for score in scores] == [{'engine': 'delaunay', 'alpha_scale': 0.5},
+                                                            {'engine': 'tsdf'}]
+        assert scores[1]['holes'] == 0 and scores[1]['non_manifold_edges'] == 0
+        assert scores[0]['holes'] + scores[0]['non_manifold_edges'] > 0
+        # Only the proxy was meshed; the cloud itself is left for the full-resolution run
+        assert pc_to_mesh.mesh is None and len(pc_to_mesh.point_cloud) > 3000
+
+    def test_candidate_rank_puts_failed_and_unfaithful_surfaces_last(self):
+        """
+        Test that surfaces far from their points rank after faithful ones, however tidy,
+        and that failed candidates rank last.
+        """
+        faithful = {'distance': 0.1, 'non_manifold_edges': 3, 'holes': 2, 'quality': 0.6}
+        hull = {'distance': 5.0, 'non_manifold_edges': 0, 'holes': 0, 'quality': 0.9}
+        failed = {'error': 'no surface'}
+        ranked = sorted([failed, hull, faithful], key=PointCloudToMesh.candidate_rank)
+        assert ranked == [faithful, hull, failed]
+
+    def test_parse_candidates_validates_engines_and_alpha_scales(self):
+        """
+        Test that candidates are parsed into engine parameters and invalid ones are rejected.
+        """
+        assert PointCloudToMesh.parse_candidates('delaunay:2.2, poisson') == [
+            {'engine': 'delaunay', 'alpha_scale': 2.2}, {'engine': 'poisson'}]
+        assert PointCloudToMesh.parse_candidates('') == []
+        with pytest.raises(ValueError, match="Unknown reconstruction engine"):
+            PointCloudToMesh.parse_candidates('marching_squares')
+        with pytest.raises(ValueError, match="Only the delaunay engine"):
+            PointCloudToMesh.parse_candidates('tsdf:2.0')
+
+    def test_stored_normals_are_reused_and_follow_simplification(self, pc_to_mesh):
+        """
+        Test that normals given with the points are oriented outward instead of estimated again,
+        and that simplify keeps the normals of the points it keeps.
+        """
+        points = pv.Sphere(theta_resolution=60, phi_resolution=60).points
+        outward = points / np.linalg.norm(points, axis=1, keepdims=True)
+        # Stored normals may point either way
+        signs = np.where(np.random.default_rng(0).random(len(points)) < 0.5, -1.0, 1.0)
+        pc_to_mesh.set_point_cloud(points, outward * signs[:, None])
+
+        np.testing.assert_allclose(np.asarray(pc_to_mesh._to_open3d().normals), outward, atol=1e-6)
+
+        simplified = pc_to_mesh.simplify(500)
+        assert len(pc_to_mesh.normals) == len(simplified)
+        np.testing.assert_allclose(np.abs(pc_to_mesh.normals),
+                                   np.abs(simplified / np.linalg.norm(simplified, axis=1, keepdims=True)), atol=1e-6)
+
+        with pytest.raises(ValueError, match="one row per point"):
+            pc_to_mesh.set_point_cloud(points, outward[:10])
+
+    def test_mesh_quality_is_computed_in_debug_mode_only(self):
+        """
+        Test that the default 'production' diagnostics level skips the cell quality pass
+        and that 'debug' keeps the quality statistics.
+        """
+        sphere = pv.Sphere(theta_resolution=20, phi_resolution=20)
+        quality = sphere.copy()
+        quality.cell_data['CellQuality'] = np.linspace(0.25, 0.75, sphere.n_cells)
+
+        production = PointCloudToMesh()
+        production.set_point_cloud(sphere.points)
+        with patch.object(pv.PolyData, 'compute_cell_quality', create=True) as compute_cell_quality:
+            production.generate_mesh()
+        compute_cell_quality.assert_not_called()
+        assert production.mesh_quality is None
+
+        debug = PointCloudToMesh(diagnostics='debug')
+        debug.set_point_cloud(sphere.points)
+        with patch.object(pv.PolyData, 'compute_cell_quality', create=True, return_value=quality):
+            debug.generate_mesh()
+        assert debug.mesh_quality == pytest.approx({'min': 0.25, 'max': 0.75, 'avg': 0.5})
+
+        with pytest.raises(ValueError, match="Unknown diagnostics level"):
+            PointCloudToMesh(diagnostics='verbose')
+
+class TestMeshRefiner:
+    """Tests for the MeshRefiner class."""
+
+    @pytest.fixture
+    def open_mesh(self):
+        """Fixture to provide a dense hemisphere with an open boundary."""
+        sphere = pv.Sphere(theta_resolution=80, phi_resolution=80)
+        return sphere.clip(normal='z', origin=(0, 0, 0.01))
+
+    def test_decimate_reaches_target_faces(self, open_mesh):
+        """
+        Test that decimate reduces the mesh to the requested face count.
+        """
+        decimated = MeshRefiner(open_mesh.extract_surface()).decimate(target_faces=1000)
+        assert decimated.n_cells == 1000
+
+    def test_decimate_keeps_boundary_in_place(self, open_mesh):
+        """
+        Test that decimate keeps the open border of the mesh at the same height.
+        """
+        surface = open_mesh.extract_surface()
+        border_height = surface.extract_feature_edges(boundary_edges=True, feature_edges=False,
+                                                      manifold_edges=False, non_manifold_edges=False).points[:, 2].max()
+        decimated = MeshRefiner(surface).decimate(target_faces=500)
+        edges = decimated.extract_feature_edges(boundary_edges=True, feature_edges=False,
+                                                manifold_edges=False, non_manifold_edges=False)
+        assert edges.n_points > 0
+        np.testing.assert_allclose(edges.points[:, 2], border_height, atol=1e-3)
+
+    def test_decimate_without_budget_leaves_mesh_unchanged(self, open_mesh):
+        """
+        Test that decimate is a no-op without a face budget or error bound.
+        """
+        surface = open_mesh.extract_surface()
+        assert MeshRefiner(surface).decimate().n_cells == surface.n_cells
+
+    def test_fill_holes_closes_boundary_loops(self, open_mesh):
+        """
+        Test that fill_holes caps the open border so the mesh has no open edges left.
+        """
+        filled = MeshRefiner(open_mesh.extract_surface().clean().triangulate()).fill_holes()
+        assert filled.n_open_edges == 0
+
+    def test_fill_holes_skips_loops_above_max_perimeter(self, open_mesh):
+        """
+        Test that loops longer than max_perimeter are left open.
+        """
+        surface = open_mesh.extract_surface().clean().triangulate()
+        filled = MeshRefiner(surface).fill_holes(max_perimeter=1.0)
+        assert filled.n_open_edges == surface.n_open_edges
+        assert len(MeshRefiner.boundary_loops(filled.faces.reshape(-1, 4)[:, 1:])) == 1
+
+    def test_refine_skips_no_op_steps_on_a_closed_mesh(self):
+        """
+        Test that refine records every step and skips the watertight pass and the final clean on a closed mesh.
+        """
+        mesh_refiner = MeshRefiner(pv.Sphere(theta_resolution=40, phi_resolution=40))
+        refined = mesh_refiner.refine()
+
+        assert [step['step'] for step in mesh_refiner.steps] == [
+            'clean', 'remove_small_components', 'fill_holes', 'smooth', 'ensure_watertight', 'decimate', 'clean']
+        skipped = {step['step'] for step in mesh_refiner.steps[4:] if step['skipped']}
+        assert skipped == {'ensure_watertight', 'decimate', 'clean'}
+        assert all(step['seconds'] >= 0 for step in mesh_refiner.steps)
+        assert mesh_refiner.steps[1]['cells_removed'] == 0
+        assert refined.n_open_edges == 0
+
+    def test_refine_records_holes_filled(self, open_mesh):
+        """
+        Test that refine reports the holes it filled and the resulting change in cells.
+        """
+        surface = open_mesh.extract_surface().clean().triangulate()
+        mesh_refiner = MeshRefiner(surface)
+        refined = mesh_refiner.refine(target_faces=1000)
+
+        steps = {step['step']: step for step in mesh_refiner.steps}
+        assert steps['fill_holes']['holes_filled'] == 1
+        assert steps['fill_holes']['cells_change'] > 0
+        assert not steps['decimate']['skipped']
+        # Decimation can leave unused points, so the final clean runs
+        assert not mesh_refiner.steps[-1]['skipped']
+        assert refined.n_open_edges == 0
+
 class TestTextureMapper:
     """Tests for the TextureMapper class."""
 
@@ -226,6 +711,164 @@ class TestTextureMapper:
         mock_smooth.assert_called_once()
         mock_apply_uv.assert_called_once()
 
+    def test_smooth_texture_diffuses_colors_without_moving_points(self, texture_mapper):
+        """
+        Test that smooth_texture blends vertex colors and leaves the geometry untouched.
+        """
+        mesh = pv.Sphere(theta_resolution=20, phi_resolution=20)
+        colors = np.random.default_rng(0).random((mesh.n_points, 3))
+        mesh.point_data['RGB'] = colors
+        points = mesh.points.copy()
+        texture_mapper.load_mesh(mesh)
+        texture_mapper.smooth_texture(iterations=5)
+
+        np.testing.assert_array_equal(mesh.points, points)
+        assert mesh.point_data['RGB'].std() < colors.std()
+        np.testing.assert_allclose(mesh.point_data['RGB'].mean(axis=0), colors.mean(axis=0), atol=0.02)
+
+    def test_smooth_texture_keeps_uniform_colors(self, texture_mapper):
+        """
+        Test that smoothing a uniformly colored mesh does not change its color.
+        """
+        mesh = pv.Sphere(theta_resolution=20, phi_resolution=20)
+        mesh.point_data['RGB'] = np.full((mesh.n_points, 3), 0.25)
+        texture_mapper.load_mesh(mesh)
+        texture_mapper.smooth_texture()
+        np.testing.assert_allclose(mesh.point_data['RGB'], 0.25)
+
+    def test_generate_texture_image_interpolates_inside_triangles(self):
+        """
+        Test that texels inside a face get the barycentric blend of the vertex colors.
+        """
+        quad = pv.PolyData(np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=float),
+                           np.array([3, 0, 1, 3, 3, 0, 3, 2]))
+        quad.point_data['RGB'] = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=float)
+        texture_mapper = TextureMapper(texture_resolution=101)
+        texture_mapper.load_mesh(quad)
+        texture_mapper.apply_planar_uv_mapping()
+        texture_image = texture_mapper.generate_texture_image()
+
+        assert texture_image.shape == (101, 101, 3)
+        np.testing.assert_allclose(texture_image[50, 50], [0.5, 0.5, 0], atol=1e-5)
+        np.testing.assert_allclose(texture_image[100, 50], [0.5, 0, 0], atol=1e-5)
+        np.testing.assert_allclose(texture_image[25, 75], [0.75, 0.75, 0], atol=1e-5)
+
+    def test_load_mesh_restores_whether_saved_uvs_wrap(self, texture_mapper, tmp_path):
+        """
+        Test that a textured mesh read back from disk keeps whether its UVs wrap around.
+
+        This test saves a planar-mapped plane and reloads it, then loads a sphere
+        whose UVs were saved without the record.
+        """
+        plane = pv.Plane(i_resolution=4, j_resolution=4)
+        texture_mapper.load_mesh(plane)
+        texture_mapper.apply_smart_uv_mapping()
+        assert texture_mapper.uv_wraps is False
+        plane.save(str(tmp_path / 'plane.vtp'))
+
+        resumed = TextureMapper()
+        resumed.load_mesh(pv.read(str(tmp_path / 'plane.vtp')))
+        assert resumed.uv_wraps is False
+
+        sphere = pv.Sphere(theta_resolution=10, phi_resolution=10)
+        sphere.point_data['UV'] = np.zeros((sphere.n_points, 2))
+        resumed.load_mesh(sphere)
+        assert resumed.uv_wraps is True
+
+    def test_generate_texture_image_fills_texels_without_faces(self, texture_mapper, sample_mesh):
+        """
+        Test that a mesh without faces still yields a fully colored texture from its vertices.
+        """
+        sample_mesh.point_data['RGB'] = np.eye(3)
+        sample_mesh.point_data['UV'] = np.array([[0, 0], [0.5, 0.5], [1, 1]])
+        texture_mapper.texture_resolution = 64
+        texture_mapper.load_mesh(sample_mesh)
+        texture_image = texture_mapper.generate_texture_image()
+
+        np.testing.assert_array_equal(texture_image[63, 0], [1, 0, 0])
+        np.testing.assert_array_equal(texture_image[0, 63], [0, 0, 1])
+        assert np.all(texture_image.sum(axis=2) == 1)
+
+class TestMeshToOBJConverter:
+    """Tests for the MeshToOBJConverter class."""
+
+    @pytest.mark.parametrize('mesh', [pv.Sphere(theta_resolution=12, phi_resolution=12), pv.Plane(i_resolution=4, j_resolution=3)])
+    def test_convert_to_obj_matches_per_line_formatting(self, tmp_path, mesh):
+        """
+        Test that the bulk OBJ writer produces the same bytes as formatting every line with an f-string.
+        """
+        mesh.point_data['UV'] = np.random.default_rng(0).random((mesh.n_points, 2))
+        obj_filename = str(tmp_path / 'model.obj')
+        MeshToOBJConverter(mesh, None).convert_to_obj(obj_filename)
+
+        expected = ["# OBJ file", "mtllib model.mtl"]
+        expected += [f"v {v[0]} {v[1]} {v[2]}" for v in mesh.points]
+        expected += [f"vt {vt[0]} {vt[1]}" for vt in mesh.point_data['UV']]
+        expected += ["g TexturedMesh", "usemtl material0"]
+        faces, face_index = mesh.faces, 0
+        while face_index < len(faces):
+            n_vertices = faces[face_index]
+            expected.append("f " + " ".join(f"{vi + 1}/{vi + 1}" for vi in faces[face_index + 1:face_index + 1 + n_vertices]))
+            face_index += n_vertices + 1
+        with open(obj_filename) as f:
+            assert f.read() == "\n".join(expected) + "\n"
+
+    def test_convert_to_glb_writes_interleaved_buffers_and_embedded_texture(self, tmp_path):
+        """
+        Test that the GLB file holds float32 position/UV records, uint32 indices and the PNG texture.
+        """
+        mesh = pv.Plane(i_resolution=4, j_resolution=3)
+        mesh.point_data['UV'] = np.random.default_rng(0).random((mesh.n_points, 2))
+        texture_filename = str(tmp_path / 'model.png')
+        Image.new('RGB', (4, 4), (255, 0, 0)).save(texture_filename)
+        glb_filename = str(tmp_path / 'model.glb')
+
+        MeshToOBJConverter(mesh, None).convert_to_glb(glb_filename, texture_filename)
+
+        with open(glb_filename, 'rb') as f:
+            data = f.read()
+        magic, version, length = struct.unpack_from('<III', data, 0)
+        assert (magic, version, length) == (MeshToOBJConverter.GLB_MAGIC, 2, len(data))
+        json_length, _ = struct.unpack_from('<II', data, 12)
+        gltf = json.loads(data[20:20 + json_length])
+        binary = data[20 + json_length + 8:]
+
+        position_view, index_view, image_view = gltf['bufferViews']
+        vertices = np.frombuffer(binary, np.float32, mesh.n_points * 5, position_view['byteOffset']).reshape(-1, 5)
+        np.testing.assert_allclose(vertices[:, :3], mesh.points, atol=1e-6)
+        np.testing.assert_allclose(vertices[:, 3], mesh.point_data['UV'][:, 0], atol=1e-6)
+        np.testing.assert_allclose(vertices[:, 4], 1 - mesh.point_data['UV'][:, 1], atol=1e-6)
+
+        indices = np.frombuffer(binary, np.uint32, gltf['accessors'][2]['count'], index_view['byteOffset'])
+        assert len(indices) == 2 * mesh.n_cells * 3
+        with open(texture_filename, 'rb') as f:
+            assert binary[image_view['byteOffset']:image_view['byteOffset'] + image_view['byteLength']] == f.read()
+
+    def test_convert_to_vertex_color_glb_writes_positions_and_colors(self, tmp_path):
+        """
+        Test that the vertex-colored GLB file holds float32 positions, normalized RGBA colors and no texture.
+        """
+        mesh = pv.Plane(i_resolution=4, j_resolution=3).triangulate()
+        mesh.point_data['RGB'] = np.random.default_rng(0).integers(0, 256, (mesh.n_points, 3)).astype(np.uint8)
+        glb_filename = str(tmp_path / 'preview.glb')
+
+        MeshToOBJConverter(mesh, None).convert_to_vertex_color_glb(glb_filename)
+
+        with open(glb_filename, 'rb') as f:
+            data = f.read()
+        json_length, _ = struct.unpack_from('<II', data, 12)
+        gltf = json.loads(data[20:20 + json_length])
+        binary = data[20 + json_length + 8:]
+
+        assert 'textures' not in gltf
+        assert gltf['meshes'][0]['primitives'][0]['attributes'] == {'POSITION': 0, 'COLOR_0': 1}
+        position_view, color_view, _ = gltf['bufferViews']
+        positions = np.frombuffer(binary, np.float32, mesh.n_points * 3, position_view['byteOffset']).reshape(-1, 3)
+        colors = np.frombuffer(binary, np.uint8, mesh.n_points * 4, color_view['byteOffset']).reshape(-1, 4)
+        np.testing.assert_allclose(positions, mesh.points, atol=1e-6)
+        np.testing.assert_array_equal(colors[:, :3], mesh.point_data['RGB'])
+        assert np.all(colors[:, 3] == 255)
+
 class TestReconstructionUtils:
     """Tests for the reconstruction_utils module."""
 
@@ -267,6 +910,30 @@ class TestReconstructionUtils:
         with pytest.raises(ValueError, match="Unknown color generation method"):
             generate_colors(sample_points, method='unknown')
 
+    def test_as_point_array_returns_float32_without_copying(self, sample_points):
+        """
+        Test that as_point_array converts to float32 once and passes float32 arrays through.
+        """
+        points = as_point_array(sample_points.tolist())
+        assert points.dtype == np.float32 and points.flags['C_CONTIGUOUS']
+        assert as_point_array(points) is points
+        with pytest.raises(ValueError, match="3 columns"):
+            as_point_array(np.zeros((3, 2)))
+
+    def test_as_color_array_scales_unit_colors_to_uint8(self):
+        """
+        Test that as_color_array scales [0, 1] colors, keeps [0, 255] colors and passes uint8 arrays through.
+
+        A dark cloud stored in [0, 255] as floats keeps its values when its scale is given.
+        """
+        np.testing.assert_array_equal(as_color_array([[0.0, 0.5, 1.0]]), [[0, 128, 255]])
+        np.testing.assert_array_equal(as_color_array([[0, 128, 255]]), [[0, 128, 255]])
+        np.testing.assert_array_equal(as_color_array([[0.0, 1.0, 2.0]], scale=255), [[0, 1, 2]])
+        dark_document = {'points': [[0, 0, 0]], 'colors': [[0.0, 1.0, 1.0]]}
+        np.testing.assert_array_equal(ReconstructionService.load_point_arrays(dark_document)[1], [[0, 1, 1]])
+        colors = np.array([[1, 2, 3]], dtype=np.uint8)
+        assert as_color_array(colors) is colors
+
 
 
 def test_reconstruct_api_endpoint(client, mongo, point_cloud_data):
@@ -283,4 +950,30 @@ def test_reconstruct_api_endpoint(client, mongo, point_cloud_data):
     assert response.status_code == 200
     data = json.loads(response.data)
     assert "model_id" in data
-    mock_reconstruct.assert_called_once_with(str(point_cloud_data['_id']))
\ No newline at end of file
+    mock_reconstruct.assert_called_once_with(str(point_cloud_data['_id']))
+
+
+def test_reconstruct_api_endpoint_returns_fast_preview_and_reconstructs_in_background(client, mongo, point_cloud_data):
+    """
+    Test that /api/reconstruct with fast_preview returns the preview model at once and replaces it in the background.
+    """
+    mongo.point_clouds.insert_one(point_cloud_data)
+    point_cloud_id = str(point_cloud_data['_id'])
+    preview_id = str(ObjectId())
+
+    with patch.object(ReconstructionService, 'start_fast_preview', return_value=preview_id), \
+            patch.object(ReconstructionService, 'start_reconstruction', return_value=preview_id) as mock_reconstruct:
+        response = client.post(f'/api/reconstruct/{point_cloud_id}?fast_preview=true&target_faces=100')
+        assert response.status_code == 202
+        data = json.loads(response.data)
+        assert data['model_id'] == preview_id
+
+        for _ in range(100):
+            status = json.loads(client.get(f"/api/reconstruct/status/{data['task_id']}").data)
+            if status['status'] in ('SUCCESS', 'ERROR'):
+                break
+            time.sleep(0.05)
+
+    assert status['status'] == 'SUCCESS'
+    assert status['result'] == {'model_id': preview_id}
+    mock_reconstruct.assert_called_once_with(point_cloud_id, model_id=preview_id, target_faces=100)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+import pyvista as pv
+from app.reconstruction.stage_store import StageStore
+
+
+@pytest.fixture
+def textured_mesh():
+    """Fixture to provide a small mesh with vertex colors and UV coordinates."""
+    mesh = pv.Sphere(theta_resolution=8, phi_resolution=8)
+    mesh.point_data['RGB'] = np.random.default_rng(0).random((mesh.n_points, 3))
+    mesh.point_data['UV'] = np.random.default_rng(1).random((mesh.n_points, 2))
+    return mesh
+
+
+def test_stage_round_trip_keeps_geometry_and_point_data(tmp_path, textured_mesh):
+    """
+    Test that a saved stage is loaded back with the same geometry, colors and UVs.
+    """
+    store = StageStore(str(tmp_path), 'model')
+    path = store.save('stage_3_textured_mesh', textured_mesh)
+    assert path.endswith('model.stage_3_textured_mesh.vtp')
+
+    loaded = store.load('stage_3_textured_mesh')
+    np.testing.assert_allclose(loaded.points, textured_mesh.points)
+    np.testing.assert_array_equal(loaded.faces, textured_mesh.faces)
+    np.testing.assert_allclose(loaded.point_data['RGB'], textured_mesh.point_data['RGB'])
+    np.testing.assert_allclose(loaded.point_data['UV'], textured_mesh.point_data['UV'])
+
+
+def test_missing_stage_loads_as_none(tmp_path):
+    """
+    Test that a stage that was never saved loads as None.
+    """
+    store = StageStore(str(tmp_path), 'model')
+    assert store.load('stage_1_mesh') is None
+    assert len(store.paths()) == len(StageStore.STAGES) + 1
+
+
+def test_failed_save_does_not_raise(tmp_path, textured_mesh):
+    """
+    Test that a stage that cannot be written is skipped instead of failing the reconstruction.
+    """
+    store = StageStore(str(tmp_path / 'missing_folder'), 'model')
+    assert store.save('stage_1_mesh', textured_mesh) is None
+
+
+def test_unknown_stage_raises(tmp_path):
+    """
+    Test that an unknown stage name raises a ValueError.
+    """
+    with pytest.raises(ValueError, match="Unknown reconstruction stage"):
+        StageStore(str(tmp_path), 'model').path('stage_4')
+
+
+def test_checkpoint_is_valid_only_for_same_input_and_intact_files(tmp_path, textured_mesh):
+    """
+    Test that a checkpoint is reused only while its input hash matches and its file is unchanged.
+    """
+    store = StageStore(str(tmp_path), 'model')
+    store.save('stage_1_mesh', textured_mesh, input_hash='points-a')
+
+    assert store.resume('stage_1_mesh', 'points-a').n_points == textured_mesh.n_points
+    assert store.resume('stage_1_mesh', 'points-b') is None
+    assert store.artifact_hash('stage_1_mesh') is not None
+
+    with open(store.path('stage_1_mesh'), 'ab') as f:
+        f.write(b'corrupted')
+    assert store.resume('stage_1_mesh', 'points-a') is None
+
+
+def test_save_without_input_hash_drops_checkpoint(tmp_path, textured_mesh):
+    """
+    Test that saving a stage without an input hash removes its previous checkpoint.
+    """
+    store = StageStore(str(tmp_path), 'model')
+    store.save('stage_2_refined_mesh', textured_mesh, input_hash='mesh-a')
+    store.save('stage_2_refined_mesh', textured_mesh)
+
+    assert store.artifact_hash('stage_2_refined_mesh') is None
+    assert not store.is_valid('stage_2_refined_mesh', 'mesh-a')
@@ -0,0 +1,134 @@
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+from app.services.thread_budget import ThreadBudget
+
+
+@pytest.fixture
+def eight_cores():
+    """Fixture to pretend the process may run on eight cores."""
+    with patch.object(ThreadBudget, 'available_cores', return_value=list(range(8))), \
+            patch.object(ThreadBudget, '_apply_limits'):
+        yield
+
+
+def test_concurrent_jobs_get_disjoint_allotments(eight_cores):
+    """
+    Scenario: Two jobs run at the same time
+        Given the process may run on eight cores
+        When a second job starts while the first is running
+        Then both jobs should share the cores evenly without overlap
+        And the first job should get every core back when the second ends
+        And the metrics should show both jobs
+    """
+    with ThreadBudget.allocate('job-1', 'preprocess') as first:
+        assert first['cores'] == list(range(8))
+        assert ThreadBudget.threads() == 8
+
+        with ThreadBudget.allocate('job-2', 'reconstruct') as second:
+            assert second['threads'] == 4
+            assert ThreadBudget.threads() == 4
+            assert first['threads'] == 4
+            assert not set(first['cores']) & set(second['cores'])
+            snapshot = ThreadBudget.snapshot()
+            assert {job['job_id'] for job in snapshot['active_jobs']} == {'job-1', 'job-2'}
+            assert snapshot['oversubscription'] == 1.0
+
+        assert first['cores'] == list(range(8))
+        assert ThreadBudget.threads() == 8
+
+    snapshot = ThreadBudget.snapshot()
+    assert snapshot['active_jobs'] == []
+    assert snapshot['completed_jobs']['reconstruct'] >= 1
+
+
+def test_least_used_cores_are_assigned_first(eight_cores):
+    """
+    Scenario: Jobs in different threads
+        Given a job holds half of the cores
+        When another job starts in another thread
+        Then it should be assigned the free half
+    """
+    result = {}
+
+    def run_job():
+        with ThreadBudget.allocate('job-b', 'reconstruct') as allocation:
+            result['cores'] = allocation['cores']
+
+    with ThreadBudget.allocate('job-a', 'preprocess', max_cores=4) as allocation:
+        assert allocation['cores'] == [0, 1, 2, 3]
+        worker = threading.Thread(target=run_job)
+        worker.start()
+        worker.join()
+
+    assert result['cores'] == [4, 5, 6, 7]
+
+
+@pytest.mark.skipif(not hasattr(os, 'sched_setaffinity'), reason="CPU affinity is not supported")
+def test_affinity_is_restored_after_job():
+    """
+    Scenario: Pin a job to its cores
+        Given I run a job within a core allotment
+        When the job finishes
+        Then the thread's CPU affinity should be restored
+    """
+    before = os.sched_getaffinity(0)
+    with ThreadBudget.allocate('job-pinned', 'preprocess', max_cores=1) as allocation:
+        assert os.sched_getaffinity(0) == set(allocation['cores'])
+        assert 'affinity' in allocation['controls']
+    assert os.sched_getaffinity(0) == before
+
+
+def test_library_thread_counts_follow_the_smallest_allotment_and_are_restored():
+    """
+    Scenario: Limit the process-wide library thread pools
+        Given the process may run on four cores
+        When a one-core job starts while a job holding every core runs
+        Then the VTK thread count should follow the smallest allotment of the running jobs
+        And it should be restored once no job is running
+    """
+    vtk_smp = MagicMock()
+    vtk_smp.GetEstimatedNumberOfThreads.return_value = 16
+    with patch.object(ThreadBudget, 'available_cores', return_value=list(range(4))), \
+            patch('os.sched_setaffinity', create=True), \
+            patch('app.services.thread_budget.vtkSMPTools', vtk_smp), \
+            patch('app.services.thread_budget.cv2', None), \
+            patch('app.services.thread_budget.threadpool_limits', None):
+        with ThreadBudget.allocate('job-wide', 'preprocess') as wide:
+            assert vtk_smp.Initialize.call_args[0] == (4,)
+            with ThreadBudget.allocate('job-narrow', 'reconstruct', max_cores=1):
+                assert vtk_smp.Initialize.call_args[0] == (1,)
+                assert 'vtk_smp' in wide['controls']
+            assert vtk_smp.Initialize.call_args[0] == (4,)
+    assert vtk_smp.Initialize.call_args[0] == (16,)
+
+
+@pytest.mark.parametrize('openmp_path, limited', [
+    ('/usr/lib/x86_64-linux-gnu/libgomp.so.1', True),
+    ('/site-packages/torch/lib/libgomp.so.1', False),
+    (None, False),
+])
+def test_open3d_is_reported_as_limited_only_with_its_openmp_runtime(openmp_path, limited):
+    """
+    Scenario: Report whether Open3D's thread count is limited
+        Given Open3D is loaded, with or without an OpenMP runtime it can use
+        When a job starts
+        Then Open3D should be listed under the job's controls only if that runtime was limited
+        And under the job's unlimited libraries otherwise
+    """
+    pools = [{'user_api': 'openmp', 'filepath': openmp_path}] if openmp_path else []
+    open3d = MagicMock(__file__='/site-packages/open3d/__init__.py')
+    with patch.object(ThreadBudget, 'available_cores', return_value=list(range(4))), \
+            patch('os.sched_setaffinity', create=True), \
+            patch.dict('sys.modules', {'open3d': open3d}), \
+            patch('app.services.thread_budget.vtkSMPTools', None), \
+            patch('app.services.thread_budget.cv2', None), \
+            patch('app.services.thread_budget.threadpool_limits', MagicMock()), \
+            patch('app.services.thread_budget.threadpool_info', return_value=pools):
+        with ThreadBudget.allocate('job-open3d', 'preprocess') as allocation:
+            assert ('open3d' in allocation['controls']) == limited
+            assert ('open3d' in allocation['unlimited']) != limited
+            assert 'blas_openmp' in allocation['controls']
+            assert {'vtk_smp', 'opencv'} <= set(allocation['unlimited'])
@@ -187,6 +187,46 @@ def test_get_model_obj_success(client, mongo):
         assert response.status_code == 200
         assert response.data == b"Test OBJ content"
 
+def test_get_model_glb_success(client, mongo):
+    """
+    Test serving a 3D model's GLB file.
+
+    Scenario:
+    - A model with a GLB file is added to the database
+    - A GET request is made to '/api/models/{model_id}/glb'
+    - The GLB file should be served as binary glTF
+    """
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        glb_filename = "test_model.glb"
+        with open(os.path.join(tmpdirname, glb_filename), 'wb') as f:
+            f.write(b"glTF test content")
+
+        model = ThreeDModel("Test Model", tmpdirname, "pc_id", "obj_file", "mtl_file", "texture_file", glb_file=glb_filename)
+        model_id = model.save()
+
+        response = client.get(f'/api/models/{model_id}/glb')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'model/gltf-binary'
+        assert response.data == b"glTF test content"
+
+def test_get_model_glb_not_found(client, mongo):
+    """
+    Test serving the GLB file of a model exported before GLB export existed.
+
+    Scenario:
+    - A model without a GLB file is added to the database
+    - A GET request is made to '/api/models/{model_id}/glb'
+    - The response should be a 404 error
+    """
+    model = ThreeDModel("Test Model", "test_folder", "pc_id", "obj_file", "mtl_file", "texture_file")
+    model_id = model.save()
+
+    response = client.get(f'/api/models/{model_id}/glb')
+
+    assert response.status_code == 404
+    assert "GLB file not found" in json.loads(response.data)['error']
+
 def test_download_texture_success(client, mongo):
     """
     Test downloading a 3D model's texture file.